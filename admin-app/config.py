@@ -4,6 +4,10 @@ import os
 UPLOAD_FOLDER = r"F:\pipline_output"
 MAX_FILE_SIZE_GB = 200
 SYSTEM_NAME = "System A"
+CRAWL_WORKERS = 8  # Folders stat'ed and read at once for the home page; more hides network share latency
+COMPRESS_MIN_BYTES = 1024  # Pages and JSON at least this large are gzipped for clients that accept it; 0 disables
+CATALOG_DB_PATH = None  # The client app's upload catalog, searched by the home page; defaults to <UPLOAD_FOLDER>/.sessions/catalog.db
+CHUNK_STATUS_DB_PATH = None  # Chunk bitmaps behind check-status, shared with the client app; defaults to <UPLOAD_FOLDER>/.sessions/chunk_status.db
 STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
 
 # Derived settings
@@ -13,6 +17,10 @@ class Config:
     UPLOAD_FOLDER = UPLOAD_FOLDER
     MAX_FILE_SIZE = MAX_FILE_SIZE
     SYSTEM_NAME = SYSTEM_NAME
+    CRAWL_WORKERS = CRAWL_WORKERS
+    COMPRESS_MIN_BYTES = COMPRESS_MIN_BYTES
+    CATALOG_DB_PATH = CATALOG_DB_PATH
+    CHUNK_STATUS_DB_PATH = CHUNK_STATUS_DB_PATH
     STATIC_FOLDER = STATIC_FOLDER
 
 class DevelopmentConfig(Config):
@@ -29,8 +37,9 @@ config = {
 }
 
 # Allow overriding settings with environment variables
-for key in ['UPLOAD_FOLDER', 'MAX_FILE_SIZE', 'SYSTEM_NAME', 'STATIC_FOLDER']:
+for key in ['UPLOAD_FOLDER', 'MAX_FILE_SIZE', 'SYSTEM_NAME', 'CRAWL_WORKERS', 'COMPRESS_MIN_BYTES', 'CATALOG_DB_PATH',
+            'CHUNK_STATUS_DB_PATH', 'STATIC_FOLDER']:
     if os.environ.get(key):
         setattr(Config, key, os.environ.get(key))
-        if key == 'MAX_FILE_SIZE':
-            Config.MAX_FILE_SIZE = int(Config.MAX_FILE_SIZE)
\ No newline at end of file
+        if key in ('MAX_FILE_SIZE', 'CRAWL_WORKERS', 'COMPRESS_MIN_BYTES'):
+            setattr(Config, key, int(getattr(Config, key)))
\ No newline at end of file
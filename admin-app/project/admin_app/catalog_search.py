@@ -0,0 +1,107 @@
+"""
+Indexed search and facet counts over the client app's upload catalog.
+
+The client app keeps <UPLOAD_FOLDER>/.sessions/catalog.db (see
+client-app/project/client_app/operations/upload_catalog.py) current with
+every upload folder, including an FTS5 index of all metadata values. It
+publishes what searches need as the upload_facets view (id, folder, then one
+column per facet) and records the version of that contract in catalog_info,
+so the facets are defined once, on the client. This module only reads the
+catalog: open_catalog() returns None when it is missing or publishes another
+version, and the caller falls back to scanning folders.
+"""
+import os
+import sqlite3
+from flask import current_app
+
+# The UploadCatalog.SEARCH_API this module speaks; any other version is refused
+SEARCH_API = 1
+
+FACET_LIMIT = 50
+
+
+def catalog_path():
+    return current_app.config.get('CATALOG_DB_PATH') or os.path.join(
+        current_app.config['UPLOAD_FOLDER'], '.sessions', 'catalog.db'
+    )
+
+
+def open_catalog():
+    """A read-only connection to the catalog, or None if it can't be used."""
+    path = catalog_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT value FROM catalog_info WHERE key = 'search_api'").fetchone()
+        if row is None or row['value'] != str(SEARCH_API):
+            current_app.logger.warning(
+                f"Upload catalog at {path} publishes search version {row['value'] if row else None}, "
+                f"not {SEARCH_API}; searching folder names only"
+            )
+            conn.close()
+            return None
+        return conn
+    except sqlite3.Error as e:
+        current_app.logger.warning(f"Upload catalog unavailable at {path}: {str(e)}")
+        return None
+
+
+def catalog_facets(conn):
+    """Facet names, as the columns of the catalog's upload_facets view."""
+    return [row['name'] for row in conn.execute('PRAGMA table_info(upload_facets)')
+            if row['name'] not in ('id', 'folder')]
+
+
+def catalog_generation(conn):
+    try:
+        row = conn.execute('SELECT epoch, generation FROM catalog_state WHERE id = 0').fetchone()
+    except sqlite3.Error:
+        return None
+    return (row['epoch'], row['generation']) if row else None
+
+
+def match_query(search):
+    """FTS5 query matching every word of search as a token prefix."""
+    # Quoted, so FTS5 operators typed into the search box are just text
+    return ' '.join('"' + term.replace('"', '""') + '"*' for term in search.split())
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def filter_sql(search, filters, exclude=None):
+    clauses = ['1']
+    params = []
+    for facet, value in filters.items():
+        if value and facet != exclude:
+            clauses.append(f"{quote(facet)} = ?")
+            params.append(value)
+    match = match_query(search)
+    if match:
+        clauses.append('id IN (SELECT rowid FROM uploads_fts WHERE uploads_fts MATCH ?)')
+        params.append(match)
+    return ' AND '.join(clauses), params
+
+
+def search_folders(conn, search, filters):
+    """Names of the upload folders matching the search words and facet filters."""
+    where, params = filter_sql(search, filters)
+    return {row['folder'] for row in conn.execute(f"SELECT folder FROM upload_facets WHERE {where}", params)}
+
+
+def facet_counts(conn, search, filters):
+    """{facet: [{value, count}]}, each facet counted without its own filter."""
+    result = {}
+    for facet in filters:
+        column = quote(facet)
+        where, params = filter_sql(search, filters, exclude=facet)
+        rows = conn.execute(
+            f"SELECT {column} AS value, COUNT(*) AS count FROM upload_facets "
+            f"WHERE {where} AND {column} IS NOT NULL AND {column} != '' "
+            f"GROUP BY {column} ORDER BY count DESC, value LIMIT ?", params + [FACET_LIMIT]
+        )
+        result[facet] = [dict(row) for row in rows]
+    return result
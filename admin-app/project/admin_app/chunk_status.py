@@ -0,0 +1,191 @@
+"""
+Chunk status from compact received/verified bitmaps.
+
+Bitmaps live in <UPLOAD_FOLDER>/.sessions/chunk_status.db (CHUNK_STATUS_DB_PATH),
+which the client app creates and owns the schema of
+(client-app/project/client_app/operations/chunk_status.py): one row per
+folder and source, bit i of byte i // 8 standing for chunk i.
+
+- "upload" rows are kept by the client as it acknowledges each chunk, so
+  uploads in progress show up too. Their chunks are blocks of chunk_size
+  bytes; a verified bit is clear once any part of that block arrived
+  without a checksum to verify.
+- "scan" rows are built here for folders with an inventory.csv (one chunk
+  file name per line). One directory listing replaces a stat per chunk, and
+  the row is reused until the folder or the inventory changes, so a repeat
+  check costs two stats however many chunks there are.
+
+connect() returns None while the database is missing or has another schema
+version; scans are then answered without being stored.
+
+Answers give missing and unverified chunks as [start, end) index ranges.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+# The ChunkStatusStore.SCHEMA_VERSION this module reads and writes
+SCHEMA_VERSION = 2
+
+SCAN = 'scan'
+UPLOAD = 'upload'
+INVENTORY_FILE = 'inventory.csv'
+
+# Ranges reported per kind; the counts always cover every chunk
+MAX_RANGES = 100
+
+_local = threading.local()
+
+
+def store_path(config):
+    return config.get('CHUNK_STATUS_DB_PATH') or os.path.join(
+        config['UPLOAD_FOLDER'], '.sessions', 'chunk_status.db'
+    )
+
+
+def connect(config):
+    """This thread's connection to the chunk status store, or None if it can't be used."""
+    path = store_path(config)
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    # Keyed by process too: a connection must not cross a fork
+    key = (path, os.getpid())
+    if key in connections:
+        return connections[key]
+    if not os.path.exists(path):
+        return None
+    try:
+        # Every statement commits on its own
+        conn = sqlite3.connect(f"file:{path}?mode=rw", uri=True, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            conn.close()
+            return None
+    except sqlite3.Error:
+        return None
+    connections[key] = conn
+    return conn
+
+
+def bitmap_of(flags):
+    """Pack an iterable of booleans into a bitmap."""
+    bitmap = bytearray()
+    for index, flag in enumerate(flags):
+        if index % 8 == 0:
+            bitmap.append(0)
+        if flag:
+            bitmap[-1] |= 1 << (index % 8)
+    return bytes(bitmap)
+
+
+def runs(bitmap, total, value):
+    """[start, end) runs of chunks whose bit equals value, skipping whole bytes where it can."""
+    skip = 0xff if not value else 0x00
+    result = []
+    start = None
+    for byte_index, byte in enumerate(bitmap):
+        if byte == skip and start is None:
+            continue
+        for bit in range(8):
+            index = byte_index * 8 + bit
+            if index >= total:
+                break
+            if bool(byte & (1 << bit)) == value:
+                if start is None:
+                    start = index
+            elif start is not None:
+                result.append([start, index])
+                start = None
+    if start is not None:
+        result.append([start, total])
+    return result
+
+
+def count(bitmap, total):
+    return sum(bin(byte).count('1') for byte in bitmap[:(total + 7) // 8])
+
+
+def scan_key(folder_path, inventory_path):
+    """Folder and inventory stats: chunks arriving move the folder mtime."""
+    inventory_stat = os.stat(inventory_path)
+    return f"{os.stat(folder_path).st_mtime_ns}:{inventory_stat.st_size}:{inventory_stat.st_mtime_ns}"
+
+
+def scan_folder(conn, folder, folder_path, inventory_path, key):
+    """Build and store the scan row from the inventory and one directory listing."""
+    with open(inventory_path, 'r') as f:
+        chunks = [line.strip() for line in f.read().splitlines() if line.strip()]
+    present = set(os.listdir(folder_path))
+    row = {'folder': folder, 'source': SCAN, 'source_key': key, 'total': len(chunks),
+           'received': bitmap_of(chunk in present for chunk in chunks), 'verified': None,
+           'chunk_size': None, 'updated_at': time.time()}
+    if conn is not None:
+        conn.execute(
+            'INSERT OR REPLACE INTO chunk_status '
+            '(folder, source, source_key, total, received, verified, chunk_size, updated_at) '
+            'VALUES (:folder, :source, :source_key, :total, :received, :verified, :chunk_size, :updated_at)', row
+        )
+    return row
+
+
+def load_bitmaps(conn, folder_path):
+    """
+    The bitmap row for a folder, refreshing its scan if needed; None if the
+    folder has neither an inventory.csv nor a recorded upload.
+    """
+    folder = os.path.basename(folder_path)
+    inventory_path = os.path.join(folder_path, INVENTORY_FILE)
+    try:
+        key = scan_key(folder_path, inventory_path)
+    except FileNotFoundError:
+        if conn is None:
+            return None
+        row = conn.execute('SELECT * FROM chunk_status WHERE folder = ? AND source = ?',
+                           (folder, UPLOAD)).fetchone()
+        return dict(row) if row else None
+    if conn is not None:
+        row = conn.execute('SELECT * FROM chunk_status WHERE folder = ? AND source = ?', (folder, SCAN)).fetchone()
+        if row is not None and row['source_key'] == key:
+            return dict(row)
+    return scan_folder(conn, folder, folder_path, inventory_path, key)
+
+
+def describe(bitmaps, file_complete):
+    """The check-status answer for one folder's bitmaps."""
+    total = bitmaps['total']
+    received = count(bitmaps['received'], total)
+    missing = runs(bitmaps['received'], total, False)
+    status = {
+        'source': bitmaps['source'],
+        'totalChunks': total,
+        'receivedChunks': received,
+        'missingChunks': total - received,
+        'missingRanges': missing[:MAX_RANGES],
+        'fileComplete': file_complete,
+    }
+    if bitmaps.get('chunk_size'):
+        status['chunkSize'] = bitmaps['chunk_size']
+    if len(missing) > MAX_RANGES:
+        status['missingRangesTruncated'] = True
+    if bitmaps['verified'] is not None:
+        # Received, but some of their bytes came without a checksum to check
+        bad = bytes(got & ~ok & 0xff for got, ok in zip(bitmaps['received'], bitmaps['verified']))
+        status['unverifiedRanges'] = runs(bad, total, True)[:MAX_RANGES]
+
+    details = f"Received {received} out of {total} chunks"
+    if received == total:
+        details += ". All chunks received."
+        details += " File is complete." if file_complete else " But final file is missing."
+    else:
+        details += f". Missing {total - received} chunks."
+    if status.get('unverifiedRanges'):
+        details += " Some chunks were not verified."
+    status['details'] = details
+    return status
+
+
+def remove_folder(conn, folder):
+    if conn is not None:
+        conn.execute('DELETE FROM chunk_status WHERE folder = ?', (folder,))
@@ -0,0 +1,75 @@
+"""
+Conditional GET and gzip for admin pages and status responses.
+
+Same rules as client-app/project/client_app/utils/http_cache.py: routes derive
+an ETag from what versions the data (folder mtimes, metadata ETags), check it
+with not_modified() before doing any work, and pass the full response through
+cacheable(), which gzips it and gives the gzipped body its own ETag.
+"""
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from flask import Response, current_app, request
+
+GZIP_SUFFIX = '-gz'
+
+
+def make_etag(*parts):
+    raw = '|'.join(str(part) for part in parts).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+def _as_datetime(last_modified):
+    if last_modified is None or isinstance(last_modified, datetime):
+        return last_modified
+    return datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+
+
+def not_modified(etag, last_modified=None):
+    """A 304 response if the client already has this version, else None."""
+    if_none_match = request.if_none_match
+    if if_none_match:
+        for candidate in (etag, etag + GZIP_SUFFIX):
+            if if_none_match.contains_weak(candidate):
+                response = Response(status=304)
+                response.set_etag(candidate)
+                return _validators(response, last_modified)
+        return None
+
+    last_modified = _as_datetime(last_modified)
+    if_modified_since = request.if_modified_since
+    if last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return _validators(response, last_modified)
+    return None
+
+
+def cacheable(response, etag, last_modified=None):
+    """Add the validators to a full response, gzip-compressing it when worthwhile."""
+    if compress(response):
+        etag += GZIP_SUFFIX
+    response.set_etag(etag)
+    return _validators(response, last_modified)
+
+
+def compress(response):
+    min_bytes = current_app.config.get('COMPRESS_MIN_BYTES', 1024)
+    if (not min_bytes or response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or not request.accept_encodings['gzip']):
+        return False
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return False
+    response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    return True
+
+
+def _validators(response, last_modified):
+    last_modified = _as_datetime(last_modified)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
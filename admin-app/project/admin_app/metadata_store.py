@@ -0,0 +1,198 @@
+"""
+Admin side of the upload metadata store.
+
+The client app writes each upload's *_metadata.json through
+client-app/project/client_app/operations/metadata_store.py; this module reads
+and updates the same files by the same rules, so an approval can't tear a file
+or interleave with a client save:
+
+- writes replace the file with a fully written temp file in one rename
+- writers hold <UPLOAD_FOLDER>/.sessions/locks/<folder>.lock (OS file lock),
+  <folder> being the folder's path relative to UPLOAD_FOLDER with "/" escaped;
+  lock files are never deleted, since another process may hold one
+- each write bumps metadataVersion, which is part of the ETag
+- parsed files are cached until their inode, size or mtime change
+"""
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import quote
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+VERSION_KEY = 'metadataVersion'
+LOCK_DIR = os.path.join('.sessions', 'locks')
+LOCK_TIMEOUT = 10
+CACHE_SIZE = 4096
+
+_cache = OrderedDict()
+_folders = {}
+_cache_lock = threading.Lock()
+_thread_locks = {}
+
+
+class MetadataConflictError(Exception):
+    """The metadata file changed since the caller read it."""
+
+
+def _stat_key(stat):
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def etag_for(metadata, stat):
+    return f'"{metadata.get(VERSION_KEY, 0)}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _remember(path, key, metadata, etag):
+    with _cache_lock:
+        _cache[path] = (key, metadata, etag)
+        _cache.move_to_end(path)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def read_metadata(path):
+    """(metadata, etag) for a metadata file; the dict is the caller's to change."""
+    stat = os.stat(path)
+    key = _stat_key(stat)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == key:
+            _cache.move_to_end(path)
+            return copy.deepcopy(cached[1]), cached[2]
+
+    with open(path, 'r') as f:
+        metadata = json.load(f)
+    etag = etag_for(metadata, stat)
+    _remember(path, key, metadata, etag)
+    return copy.deepcopy(metadata), etag
+
+
+def find_metadata(folder_path):
+    """
+    The metadata file of an upload folder: the completed upload's if there is
+    one, then any *_metadata.json, then any other JSON that isn't a resend
+    request. Reused until the folder's entries change.
+    """
+    try:
+        mtime = os.stat(folder_path).st_mtime_ns
+    except OSError:
+        return None
+    with _cache_lock:
+        cached = _folders.get(folder_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    names = sorted(os.listdir(folder_path))
+    metadata_files = [f for f in names if f.endswith('_metadata.json')]
+    chosen = (next((f for f in metadata_files if '_complete_metadata.json' in f), None)
+              or next(iter(metadata_files), None)
+              or next((f for f in names if f.endswith('.json') and '_resend' not in f), None))
+    path = os.path.join(folder_path, chosen) if chosen else None
+    with _cache_lock:
+        _folders[folder_path] = (mtime, path)
+    return path
+
+
+def load_folder_metadata(folder_path):
+    """(path, metadata, etag) for an upload folder, or None if it has no metadata."""
+    for _ in range(2):
+        path = find_metadata(folder_path)
+        if path is None:
+            return None
+        try:
+            metadata, etag = read_metadata(path)
+            return path, metadata, etag
+        except FileNotFoundError:
+            # Renamed by the client since the folder was listed
+            with _cache_lock:
+                _folders.pop(folder_path, None)
+    return None
+
+
+def update_metadata(path, changes, if_match=None):
+    """Merge changes into a metadata file under its folder lock; returns (metadata, etag)."""
+    with folder_lock(path):
+        try:
+            current, etag = read_metadata(path)
+        except FileNotFoundError:
+            current, etag = {}, None
+        if if_match is not None and if_match != etag:
+            raise MetadataConflictError(f"Metadata {path} was changed by someone else")
+
+        metadata = {**current, **changes}
+        metadata[VERSION_KEY] = current.get(VERSION_KEY, 0) + 1
+        _replace(path, metadata)
+        stat = os.stat(path)
+        etag = etag_for(metadata, stat)
+        _remember(path, _stat_key(stat), metadata, etag)
+        return copy.deepcopy(metadata), etag
+
+
+def _replace(path, metadata):
+    temp_path = f"{path}.tmp.{uuid.uuid4().hex}"
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(metadata, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(5):
+            try:
+                os.replace(temp_path, path)
+                break
+            except PermissionError:
+                # Windows refuses while a reader has the file open
+                if os.name != 'nt' or attempt == 4:
+                    raise
+                time.sleep(0.05)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def folder_lock(path):
+    """Hold the write lock of the upload folder a metadata file lives in."""
+    base_upload_folder = current_app.config['UPLOAD_FOLDER']
+    folder = os.path.relpath(os.path.dirname(os.path.abspath(path)), os.path.abspath(base_upload_folder))
+    lock_name = quote(folder.replace(os.sep, '/'), safe='')
+    lock_path = os.path.join(base_upload_folder, LOCK_DIR, f"{lock_name}.lock")
+    with _cache_lock:
+        thread_lock = _thread_locks.setdefault(lock_path, threading.Lock())
+    with thread_lock:
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, 'a+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                deadline = time.monotonic() + LOCK_TIMEOUT
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError(f"Timed out waiting for the metadata lock {lock_path}")
+                        time.sleep(0.05)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
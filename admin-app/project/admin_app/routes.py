@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, abort
+from flask import Blueprint, render_template, request, jsonify, current_app, abort, make_response
 import os
-import json
+import shutil
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from .metadata_store import load_folder_metadata, update_metadata, MetadataConflictError
+from .http_cache import cacheable, compress, make_etag, not_modified
+from .catalog_search import catalog_facets, catalog_generation, facet_counts, open_catalog, search_folders
+from .chunk_status import connect, describe, load_bitmaps, remove_folder
 
 admin_app = Blueprint('admin_app', __name__, template_folder='../templates')
 
@@ -10,83 +16,143 @@ admin_app = Blueprint('admin_app', __name__, template_folder='../templates')
 def home():
     current_app.logger.info("Accessed admin home route")
     upload_folder = current_app.config['UPLOAD_FOLDER']
-    search_query = request.args.get('search', '').lower()
+    search_query = request.args.get('search', '').strip()
     
     if not os.path.exists(upload_folder):
         current_app.logger.warning(f"Upload folder does not exist: {upload_folder}")
         return render_template('admin/home.html', folder_data=[], error="Upload folder does not exist")
     
-    folders = [f for f in os.listdir(upload_folder) if os.path.isdir(os.path.join(upload_folder, f))]
+    # Dot folders (.sessions) hold the client app's internal state, not uploads
+    entries = [entry for entry in os.scandir(upload_folder)
+               if not entry.name.startswith('.') and entry.is_dir()]
     
-    folder_data = []
-    for folder in folders:
-        if search_query and search_query not in folder.lower():
-            continue
+    # Each stat and metadata read is a round trip on a network share, so a
+    # bounded pool keeps CRAWL_WORKERS of them in flight instead of one
+    with ThreadPoolExecutor(max_workers=current_app.config.get('CRAWL_WORKERS', 8)) as pool:
+        folders = {entry.name: mtime for entry, mtime in zip(entries, pool.map(folder_mtime, entries))
+                   if mtime is not None}
         
-        folder_path = os.path.join(upload_folder, folder)
-        json_file = next((f for f in os.listdir(folder_path) if f.endswith('.json')), None)
+        # Metadata writes, renames and new files all move a folder's mtime, so the
+        # folder mtimes version the rows without opening any file; the catalog
+        # generation versions the search results and facet counts
+        catalog = open_catalog()
+        filters = {facet: request.args.get(facet, '') for facet in (catalog_facets(catalog) if catalog else ())}
+        template_path = os.path.join(admin_app.root_path, admin_app.template_folder, 'admin', 'home.html')
+        etag = make_etag('home', sorted(folders.items()), request.query_string,
+                         catalog_generation(catalog) if catalog else None, os.stat(template_path).st_mtime_ns)
+        last_modified = max(folders.values(), default=0) / 1e9
+        cached = not_modified(etag, last_modified)
+        if cached:
+            if catalog:
+                catalog.close()
+            return cached
         
-        if json_file:
-            with open(os.path.join(folder_path, json_file), 'r') as f:
-                metadata = json.load(f)
-            
-            # Extract timestamp from folder name
-            try:
-                # Assuming the format is now "Operation_ItemNumber-SubNumber_DeviceType_YYYY-MM-DD_HHMM"
-                parts = folder.split('_')
-                date_part = parts[-2]
-                time_part = parts[-1]
-                timestamp_str = f"{date_part}_{time_part}"
-                timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d_%H%M")
-            except (ValueError, IndexError):
-                # If parsing fails, use the folder's creation time as a fallback
-                timestamp = datetime.fromtimestamp(os.path.getctime(folder_path))
-            
-            folder_data.append({
-                'folder_name': folder,
-                'timestamp': timestamp,
-                'operation': metadata.get('operation', 'N/A'),
-                'date_of_collection': metadata.get('dateOfCollection', 'N/A'),
-                'collection': metadata.get('collection', 'N/A'),
-                'platform': metadata.get('platform', 'N/A'),
-                'device_type': metadata.get('deviceType', 'N/A'),
-                'serial': metadata.get('serialNumber', 'N/A'),
-                'item_number': metadata.get('itemNumber', 'N/A'),
-                'sub_number': metadata.get('subNumber', 'N/A'),
-                'from_system': metadata.get('system', 'N/A'),
-                'approved': metadata.get('approved', 'No'),
-                'chunk_status': 'FILE UPLOAD COMPLETE' if os.path.exists(os.path.join(folder_path, metadata.get('new_filename', ''))) else 'UPLOAD FAIL',
-                'known_passwords': metadata.get('knownPasswords', 'N/A'),
-                'notes': metadata.get('notes', 'N/A'),
-                'new_filename': metadata.get('new_filename', 'N/A'),
-                'original_filename': metadata.get('original_filename', 'N/A'),
-                'processing_method': metadata.get('processingMethod', 'Normal'),
-            })
+        facets, found = search_catalog(catalog, search_query, filters)
+        if found is not None:
+            matching = [os.path.join(upload_folder, folder) for folder in folders if folder in found]
+        else:
+            # No usable catalog: only folder names can be searched
+            matching = [os.path.join(upload_folder, folder) for folder in folders
+                        if not search_query or search_query.lower() in folder.lower()]
+        folder_data = [row for row in pool.map(describe_folder, matching) if row is not None]
     
     # Sort folder_data by timestamp in descending order (newest first)
     folder_data.sort(key=lambda x: x['timestamp'], reverse=True)
     
-    return render_template('admin/home.html', folder_data=folder_data)
+    return cacheable(make_response(render_template('admin/home.html', folder_data=folder_data,
+                                                   facets=facets, filters=filters)),
+                     etag, last_modified)
+
+def search_catalog(catalog, search_query, filters):
+    """
+    (facet counts, matching folder names) from the upload catalog; the names
+    are None when nothing is searched for, both are None without a catalog.
+    """
+    if catalog is None:
+        return None, None
+    try:
+        facets = facet_counts(catalog, search_query, filters)
+        if not search_query and not any(filters.values()):
+            return facets, None
+        return facets, search_folders(catalog, search_query, filters)
+    except sqlite3.Error as e:
+        current_app.logger.warning(f"Upload catalog search failed: {str(e)}")
+        return None, None
+    finally:
+        catalog.close()
+
+def folder_mtime(entry):
+    try:
+        return entry.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def describe_folder(folder_path):
+    """The home table row for one upload folder, or None if it has no metadata."""
+    found = load_folder_metadata(folder_path)
+    if not found:
+        return None
+    _, metadata, _ = found
+    folder = os.path.basename(folder_path)
+    
+    # Extract timestamp from folder name
+    try:
+        # Assuming the format is now "Operation_ItemNumber-SubNumber_DeviceType_YYYY-MM-DD_HHMM"
+        parts = folder.split('_')
+        date_part = parts[-2]
+        time_part = parts[-1]
+        timestamp_str = f"{date_part}_{time_part}"
+        timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d_%H%M")
+    except (ValueError, IndexError):
+        # If parsing fails, use the folder's creation time as a fallback
+        try:
+            timestamp = datetime.fromtimestamp(os.path.getctime(folder_path))
+        except FileNotFoundError:
+            return None
+    
+    return {
+        'folder_name': folder,
+        'timestamp': timestamp,
+        'operation': metadata.get('operation', 'N/A'),
+        'date_of_collection': metadata.get('dateOfCollection', 'N/A'),
+        'collection': metadata.get('collection', 'N/A'),
+        'platform': metadata.get('platform', 'N/A'),
+        'device_type': metadata.get('deviceType', 'N/A'),
+        'serial': metadata.get('serialNumber', 'N/A'),
+        'item_number': metadata.get('itemNumber', 'N/A'),
+        'sub_number': metadata.get('subNumber', 'N/A'),
+        'from_system': metadata.get('system', 'N/A'),
+        'approved': metadata.get('approved', 'No'),
+        'chunk_status': 'FILE UPLOAD COMPLETE' if os.path.exists(os.path.join(folder_path, metadata.get('new_filename', ''))) else 'UPLOAD FAIL',
+        'known_passwords': metadata.get('knownPasswords', 'N/A'),
+        'notes': metadata.get('notes', 'N/A'),
+        'new_filename': metadata.get('new_filename', 'N/A'),
+        'original_filename': metadata.get('original_filename', 'N/A'),
+        'processing_method': metadata.get('processingMethod', 'Normal'),
+        'durability': metadata.get('durability', 'N/A'),
+    }
 
 @admin_app.route('/approve/<folder_name>', methods=['POST'])
 def approve_folder(folder_name):
     upload_folder = current_app.config['UPLOAD_FOLDER']
     folder_path = os.path.join(upload_folder, folder_name)
-    json_file = next((f for f in os.listdir(folder_path) if f.endswith('.json')), None)
-    
-    if json_file:
-        with open(os.path.join(folder_path, json_file), 'r+') as f:
-            metadata = json.load(f)
-            metadata['approved'] = 'Yes'
-            f.seek(0)
-            json.dump(metadata, f, indent=4)
-            f.truncate()
+    found = load_folder_metadata(folder_path)
+    
+    if found:
+        # Atomic, locked against client-side saves; If-Match makes it conditional
+        try:
+            _, etag = update_metadata(found[0], {'approved': 'Yes'},
+                                      if_match=request.headers.get('If-Match'))
+        except MetadataConflictError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 412
         
         # Here you would trigger the quincy process
         # For now, we'll just log it
         current_app.logger.info(f"Quincy process triggered for folder: {folder_name}")
         
-        return jsonify({'status': 'success', 'message': 'Folder approved and quincy process triggered'})
+        response = jsonify({'status': 'success', 'message': 'Folder approved and quincy process triggered'})
+        response.headers['ETag'] = etag
+        return response
     
     return jsonify({'status': 'error', 'message': 'JSON file not found'}), 404
 
@@ -99,6 +165,7 @@ def delete_folder(folder_name):
         try:
             current_app.logger.info(f"Folder deleted: {folder_name}")
             shutil.rmtree(folder_path)
+            remove_folder(connect(current_app.config), folder_name)
             return jsonify({'status': 'success', 'message': 'Folder deleted'})
         except Exception as e:
             current_app.logger.error(f"Error deleting folder {folder_name}: {str(e)}")
@@ -111,37 +178,78 @@ def check_status(folder_name):
     upload_folder = current_app.config['UPLOAD_FOLDER']
     folder_path = os.path.join(upload_folder, folder_name)
     
-    if os.path.exists(folder_path):
-        json_file = next((f for f in os.listdir(folder_path) if f.endswith('.json')), None)
-        if json_file:
-            with open(os.path.join(folder_path, json_file), 'r') as f:
-                metadata = json.load(f)
-            
-            inventory_file = os.path.join(folder_path, 'inventory.csv')
-            if os.path.exists(inventory_file):
-                with open(inventory_file, 'r') as f:
-                    inventory = f.read().splitlines()
-                
-                total_chunks = len(inventory)
-                received_chunks = sum(1 for chunk in inventory if os.path.exists(os.path.join(folder_path, chunk)))
-                
-                status = f"Received {received_chunks} out of {total_chunks} chunks"
-                if received_chunks == total_chunks:
-                    status += ". All chunks received."
-                    if os.path.exists(os.path.join(folder_path, metadata.get('new_filename', ''))):
-                        status += " File is complete."
-                    else:
-                        status += " But final file is missing."
-                else:
-                    status += f". Missing {total_chunks - received_chunks} chunks."
-                
-                return jsonify({'status': 'success', 'message': 'Status checked', 'details': status})
-            else:
-                return jsonify({'status': 'error', 'message': 'Inventory file not found'}), 404
-        else:
-            return jsonify({'status': 'error', 'message': 'Metadata file not found'}), 404
+    try:
+        bitmaps, metadata, metadata_etag = load_chunk_status(connect(current_app.config), folder_path)
+    except LookupError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
     
-    return jsonify({'status': 'error', 'message': 'Folder not found'}), 404
+    # A rescan or a newly recorded upload changes the bitmap row's key or timestamp
+    etag = make_etag('status', bitmaps['source'], bitmaps['source_key'], bitmaps['updated_at'], metadata_etag)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    status = describe(bitmaps, file_complete(folder_path, metadata))
+    return cacheable(jsonify({'status': 'success', 'message': 'Status checked', **status}), etag)
+
+# Folders one batch check-status call may ask about
+MAX_STATUS_BATCH = 500
+
+@admin_app.route('/check-status', methods=['POST'])
+def check_status_batch():
+    """
+    Chunk status of many folders in one call: {"folders": [names]} gets
+    {"results": {name: status}}, each status as /check-status/<name> returns it.
+    """
+    data = request.get_json(silent=True) or {}
+    folders = data.get('folders')
+    if not isinstance(folders, list) or not all(isinstance(name, str) for name in folders):
+        return jsonify({'status': 'error', 'message': 'Expected {"folders": [folder names]}'}), 400
+    if len(folders) > MAX_STATUS_BATCH:
+        return jsonify({'status': 'error', 'message': f'At most {MAX_STATUS_BATCH} folders per request'}), 400
+    
+    config = current_app.config
+    upload_folder = config['UPLOAD_FOLDER']
+    
+    def check(folder_name):
+        if not folder_name or folder_name.startswith('.') or os.path.basename(folder_name) != folder_name:
+            return {'status': 'error', 'message': 'Invalid folder name'}
+        folder_path = os.path.join(upload_folder, folder_name)
+        try:
+            # Each pool thread opens its own connection
+            bitmaps, metadata, _ = load_chunk_status(connect(config), folder_path)
+        except LookupError as e:
+            return {'status': 'error', 'message': str(e)}
+        return {'status': 'success', **describe(bitmaps, file_complete(folder_path, metadata))}
+    
+    # The stats and listings are network round trips, so several folders are checked at once
+    names = list(dict.fromkeys(folders))
+    with ThreadPoolExecutor(max_workers=config.get('CRAWL_WORKERS', 8)) as pool:
+        results = dict(zip(names, pool.map(check, names)))
+    
+    response = jsonify({'status': 'success', 'results': results})
+    compress(response)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def load_chunk_status(conn, folder_path):
+    """(bitmaps, metadata, metadata ETag) of an upload folder; LookupError says what is missing."""
+    if not os.path.exists(folder_path):
+        raise LookupError('Folder not found')
+    found = load_folder_metadata(folder_path)
+    if not found:
+        raise LookupError('Metadata file not found')
+    bitmaps = load_bitmaps(conn, folder_path)
+    if bitmaps is None:
+        raise LookupError('Inventory file not found')
+    _, metadata, metadata_etag = found
+    return bitmaps, metadata, metadata_etag
+
+def file_complete(folder_path, metadata):
+    # The client records final_filename once the file is renamed; uploads still
+    # in progress have neither name yet
+    new_filename = metadata.get('new_filename') or metadata.get('final_filename')
+    return bool(new_filename) and os.path.exists(os.path.join(folder_path, new_filename))
 
 # Error handlers
 @admin_app.errorhandler(404)
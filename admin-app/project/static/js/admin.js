@@ -59,7 +59,13 @@ $(document).ready(function() {
         
         $.get(`/check-status/${folderName}`, function(response) {
             if (response.status === 'success') {
-                $('#statusModal .modal-body').html(`<p>${response.details}</p>`);
+                const $body = $('#statusModal .modal-body').empty().append($('<p>').text(response.details));
+                if (response.missingRanges.length) {
+                    $body.append($('<p>').text('Missing chunks: ' + formatRanges(response.missingRanges, response.missingRangesTruncated)));
+                }
+                if (response.unverifiedRanges && response.unverifiedRanges.length) {
+                    $body.append($('<p>').text('Unverified chunks: ' + formatRanges(response.unverifiedRanges)));
+                }
                 $('#statusModal').modal('show');
             } else {
                 alert('Error: ' + response.message);
@@ -122,18 +128,38 @@ $(document).ready(function() {
         $(`tr[data-folder="${folderName}"] .chunk-status`).text(status);
     }
 
-    // Periodically check chunk status for incomplete uploads
+    // [start, end) chunk ranges as "3-5, 9"
+    function formatRanges(ranges, truncated) {
+        const text = ranges.map(function(range) {
+            return range[1] - range[0] > 1 ? `${range[0]}-${range[1] - 1}` : `${range[0]}`;
+        }).join(', ');
+        return truncated ? text + ', ...' : text;
+    }
+
+    // Periodically check chunk status for incomplete uploads, all folders in one request
     setInterval(function() {
-        $('.check-status-btn:not(:disabled)').each(function() {
-            const folderName = $(this).data('folder');
-            $.get(`/check-status/${folderName}`, function(response) {
-                if (response.status === 'success') {
-                    updateChunkStatus(folderName, response.details);
-                    if (response.details.includes('All chunks received') && response.details.includes('File is complete')) {
-                        $(`button.check-status-btn[data-folder="${folderName}"]`).prop('disabled', true).remove();
+        const folders = $('.check-status-btn:not(:disabled)').map(function() {
+            return $(this).data('folder');
+        }).get();
+        if (folders.length === 0) {
+            return;
+        }
+
+        $.ajax({
+            url: '/check-status',
+            method: 'POST',
+            contentType: 'application/json',
+            data: JSON.stringify({ folders: folders }),
+            success: function(response) {
+                $.each(response.results, function(folderName, status) {
+                    if (status.status === 'success') {
+                        updateChunkStatus(folderName, status.details);
+                        if (status.missingChunks === 0 && status.fileComplete) {
+                            $(`button.check-status-btn[data-folder="${folderName}"]`).prop('disabled', true).remove();
+                        }
                     }
-                }
-            });
+                });
+            }
         });
     }, 60000); // Check every minute
 
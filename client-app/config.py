@@ -4,15 +4,76 @@ import os
 UPLOAD_FOLDER = r"H:\Upload_test"
 MAX_FILE_SIZE_GB = 100
 SYSTEM_NAME = "System A"
+CLIENT_HASH_MODE = "local"  # "local": browser hashes the file; "server": legacy hash-upload pass
+CHUNK_CHECKSUM_ALGORITHM = "crc32"  # Manifest checksum for chunks sent without one
+UPLOAD_SESSION_TIMEOUT = 24 * 60 * 60  # Seconds an idle upload session stays resumable
+SESSION_STORE = "memory"  # "memory": single worker; "sqlite": shared by every worker on the host
+SESSION_DB_PATH = None  # SQLite session database; defaults to <UPLOAD_FOLDER>/.sessions/sessions.db
+DURABILITY_MODE = "per-chunk"  # "per-chunk", "batched" (group commit) or "on-finalize"
+DURABILITY_BATCH_MB = 64  # batched: fsync once this much data is pending...
+DURABILITY_BATCH_MS = 50  # ...or once the oldest pending chunk has waited this long
+MIN_CHUNK_SIZE_MB = 1  # Chunk size range advertised to clients, which adapt within it
+DEFAULT_CHUNK_SIZE_MB = 10
+MAX_CHUNK_SIZE_MB = 256
+PARALLEL_STREAMS = 4  # In-flight chunks per file a client starts with...
+MAX_PARALLEL_STREAMS = 8  # ...and may grow to
+TARGET_CHUNK_MS = 2000  # Round-trip time per chunk that clients size chunks toward
+FINALIZE_WORKERS = 2  # Completed uploads finalized at once per worker process; 0 finalizes inline
+HASH_BLOCK_MB = 8  # Read size when hashing whole files
+HASH_READ_MODE = "auto"  # "read", "threaded" (read-ahead double buffering), "mmap" or "auto"
+HASH_ALGORITHMS = "md5"  # Digests stored for every file, from one read; md5 is always included (e.g. "md5,sha256")
+HASH_CACHE_SIZE = 4096  # Files whose digests are remembered by identity (0 disables the cache)
+HASH_CACHE_PATH = None  # Defaults to <UPLOAD_FOLDER>/.sessions/hash_cache.json
+CATALOG_DB_PATH = None  # SQLite upload catalog; defaults to <UPLOAD_FOLDER>/.sessions/catalog.db
+CATALOG_REFRESH_SECONDS = 30  # How often listings re-check UPLOAD_FOLDER for changes made elsewhere
+CRAWL_WORKERS = 8  # Folders read at once when (re)building the catalog; more hides network share latency
+CRAWL_MAX_RATE = 0  # Folders started per second by those rebuilds (0 = no limit)
+CRAWL_THROTTLE_HOURS = None  # e.g. "08-18": apply CRAWL_MAX_RATE only between these local hours
+CHANGE_FEED = "auto"  # "inotify", "poll", "off" or "auto" (inotify on local Linux filesystems, else polling)
+CHANGE_FEED_POLL_SECONDS = 5  # How often the polling change feed compares folder mtimes
+CHUNK_STATUS_DB_PATH = None  # Chunk bitmaps of uploads, in progress or finished, updated as ranges are acknowledged, for the admin check-status; defaults to <UPLOAD_FOLDER>/.sessions/chunk_status.db
+COMPRESS_MIN_BYTES = 1024  # JSON responses at least this large are gzipped for clients that accept it; 0 disables
 STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
 
 # Derived settings
 MAX_FILE_SIZE = MAX_FILE_SIZE_GB * 1024 * 1024 * 1024  # Convert GB to bytes
+MIN_CHUNK_SIZE = MIN_CHUNK_SIZE_MB * 1024 * 1024
+DEFAULT_CHUNK_SIZE = DEFAULT_CHUNK_SIZE_MB * 1024 * 1024
+MAX_CHUNK_SIZE = MAX_CHUNK_SIZE_MB * 1024 * 1024
 
 class Config:
     UPLOAD_FOLDER = UPLOAD_FOLDER
     MAX_FILE_SIZE = MAX_FILE_SIZE
     SYSTEM_NAME = SYSTEM_NAME
+    CLIENT_HASH_MODE = CLIENT_HASH_MODE
+    CHUNK_CHECKSUM_ALGORITHM = CHUNK_CHECKSUM_ALGORITHM
+    UPLOAD_SESSION_TIMEOUT = UPLOAD_SESSION_TIMEOUT
+    SESSION_STORE = SESSION_STORE
+    SESSION_DB_PATH = SESSION_DB_PATH
+    DURABILITY_MODE = DURABILITY_MODE
+    DURABILITY_BATCH_MB = DURABILITY_BATCH_MB
+    DURABILITY_BATCH_MS = DURABILITY_BATCH_MS
+    MIN_CHUNK_SIZE = MIN_CHUNK_SIZE
+    DEFAULT_CHUNK_SIZE = DEFAULT_CHUNK_SIZE
+    MAX_CHUNK_SIZE = MAX_CHUNK_SIZE
+    PARALLEL_STREAMS = PARALLEL_STREAMS
+    MAX_PARALLEL_STREAMS = MAX_PARALLEL_STREAMS
+    TARGET_CHUNK_MS = TARGET_CHUNK_MS
+    FINALIZE_WORKERS = FINALIZE_WORKERS
+    HASH_BLOCK_MB = HASH_BLOCK_MB
+    HASH_READ_MODE = HASH_READ_MODE
+    HASH_ALGORITHMS = HASH_ALGORITHMS
+    HASH_CACHE_SIZE = HASH_CACHE_SIZE
+    HASH_CACHE_PATH = HASH_CACHE_PATH
+    CATALOG_DB_PATH = CATALOG_DB_PATH
+    CATALOG_REFRESH_SECONDS = CATALOG_REFRESH_SECONDS
+    CRAWL_WORKERS = CRAWL_WORKERS
+    CRAWL_MAX_RATE = CRAWL_MAX_RATE
+    CRAWL_THROTTLE_HOURS = CRAWL_THROTTLE_HOURS
+    CHANGE_FEED = CHANGE_FEED
+    CHANGE_FEED_POLL_SECONDS = CHANGE_FEED_POLL_SECONDS
+    CHUNK_STATUS_DB_PATH = CHUNK_STATUS_DB_PATH
+    COMPRESS_MIN_BYTES = COMPRESS_MIN_BYTES
     STATIC_FOLDER = STATIC_FOLDER
 
 class DevelopmentConfig(Config):
@@ -29,8 +90,18 @@ config = {
 }
 
 # Allow overriding settings with environment variables
-for key in ['UPLOAD_FOLDER', 'MAX_FILE_SIZE', 'SYSTEM_NAME', 'STATIC_FOLDER']:
+for key in ['UPLOAD_FOLDER', 'MAX_FILE_SIZE', 'SYSTEM_NAME', 'CLIENT_HASH_MODE', 'CHUNK_CHECKSUM_ALGORITHM',
+            'UPLOAD_SESSION_TIMEOUT', 'SESSION_STORE', 'SESSION_DB_PATH', 'DURABILITY_MODE', 'DURABILITY_BATCH_MB',
+            'DURABILITY_BATCH_MS', 'MIN_CHUNK_SIZE', 'DEFAULT_CHUNK_SIZE', 'MAX_CHUNK_SIZE',
+            'PARALLEL_STREAMS', 'MAX_PARALLEL_STREAMS', 'TARGET_CHUNK_MS', 'FINALIZE_WORKERS', 'HASH_BLOCK_MB',
+            'HASH_READ_MODE', 'HASH_ALGORITHMS', 'HASH_CACHE_SIZE', 'HASH_CACHE_PATH', 'CATALOG_DB_PATH',
+            'CATALOG_REFRESH_SECONDS', 'CRAWL_WORKERS', 'CRAWL_MAX_RATE', 'CRAWL_THROTTLE_HOURS', 'CHANGE_FEED',
+            'CHANGE_FEED_POLL_SECONDS', 'CHUNK_STATUS_DB_PATH', 'COMPRESS_MIN_BYTES', 'STATIC_FOLDER']:
     if os.environ.get(key):
         setattr(Config, key, os.environ.get(key))
-        if key == 'MAX_FILE_SIZE':
-            Config.MAX_FILE_SIZE = int(Config.MAX_FILE_SIZE)
\ No newline at end of file
+        if key in ('MAX_FILE_SIZE', 'UPLOAD_SESSION_TIMEOUT', 'DURABILITY_BATCH_MB', 'DURABILITY_BATCH_MS',
+                   'MIN_CHUNK_SIZE', 'DEFAULT_CHUNK_SIZE', 'MAX_CHUNK_SIZE', 'PARALLEL_STREAMS', 'MAX_PARALLEL_STREAMS',
+                   'TARGET_CHUNK_MS', 'FINALIZE_WORKERS', 'HASH_BLOCK_MB', 'HASH_CACHE_SIZE',
+                   'CATALOG_REFRESH_SECONDS', 'CRAWL_WORKERS', 'CRAWL_MAX_RATE', 'CHANGE_FEED_POLL_SECONDS',
+                   'COMPRESS_MIN_BYTES'):
+            setattr(Config, key, int(getattr(Config, key)))
\ No newline at end of file
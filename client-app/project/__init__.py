@@ -27,4 +27,33 @@ def create_app(config_name='default'):
     from .client_app import client_app
     app.register_blueprint(client_app)
 
+    # Pick up upload sessions that were in flight when the server last stopped
+    if app.config.get('UPLOAD_FOLDER'):
+        from .client_app.operations import FileOperations
+        with app.app_context():
+            try:
+                FileOperations.restore_sessions()
+            except Exception as e:
+                app.logger.error(f"Could not restore upload sessions: {str(e)}")
+
+        # Keep the upload catalog and metadata caches in step with changes
+        # made outside this app, without rescanning UPLOAD_FOLDER
+        from .client_app.operations import ChangeFeed, MetadataStore, UploadCatalog
+        ChangeFeed.subscribe(MetadataStore.apply_change)
+        ChangeFeed.subscribe(UploadCatalog.apply_change)
+        ChangeFeed.start(app)
+
+    @app.cli.command('rebuild-catalog')
+    def rebuild_catalog():
+        """Re-index every upload folder into the upload catalog."""
+        from .client_app.operations import UploadCatalog
+
+        def progress(stats):
+            total = f"/{stats['total']}" if stats['total'] is not None else ''
+            print(f"  {stats['done']}{total} folders read, {stats['errors']} error(s), "
+                  f"{stats['rate']:.0f}/s", flush=True)
+
+        updated = UploadCatalog.from_config().rebuild(progress=progress)
+        print(f"Indexed {updated} upload folder(s)")
+
     return app
\ No newline at end of file
@@ -1,7 +1,19 @@
 # project/client_app/file_utils/__init__.py
 """File utilities package providing file operation capabilities."""
 
-from .hash_utils import calculate_file_hash, verify_file_integrity
+from .hash_engine import HashEngine
+from .hash_cache import HashCache
+from .hash_utils import (
+    MultiHasher,
+    PRIMARY_HASH_ALGORITHM,
+    calculate_file_hash,
+    calculate_file_hashes,
+    configured_hash_algorithms,
+    verify_file_integrity,
+    new_chunk_digest,
+    parse_chunk_checksum,
+    supported_chunk_algorithms
+)
 from .file_handlers import (
     check_existing_file,
     get_final_filename,
@@ -13,8 +25,17 @@ from .file_handlers import (
 )
 
 __all__ = [
+    'HashEngine',
+    'HashCache',
+    'MultiHasher',
+    'PRIMARY_HASH_ALGORITHM',
     'calculate_file_hash',
+    'calculate_file_hashes',
+    'configured_hash_algorithms',
     'verify_file_integrity',
+    'new_chunk_digest',
+    'parse_chunk_checksum',
+    'supported_chunk_algorithms',
     'check_existing_file',
     'get_final_filename',
     'handle_file_processing',
@@ -3,10 +3,10 @@
 
 import os
 import time
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 from flask import current_app
 from werkzeug.utils import secure_filename
-from .hash_utils import calculate_file_hash, verify_file_integrity
+from .hash_utils import calculate_file_hash, calculate_file_hashes, verify_file_integrity, PRIMARY_HASH_ALGORITHM
 
 def check_existing_file(filepath: str) -> bool:
     """
@@ -44,7 +44,8 @@ def handle_file_processing(
     final_path: str,
     metadata: Dict,
     rename_checked: bool = False,
-    rename_preview: str = ""
+    rename_preview: str = "",
+    file_hash: Optional[str] = None
 ) -> Tuple[bool, str, Dict]:
     """
     Process file with integrity checks and proper renaming.
@@ -55,6 +56,8 @@ def handle_file_processing(
         metadata (Dict): File metadata dictionary
         rename_checked (bool): Whether rename option is checked
         rename_preview (str): Preview of new filename if rename is checked
+        file_hash (Optional[str]): Digest already computed while the file was written,
+            used instead of hashing the file before the rename
         
     Returns:
         Tuple[bool, str, Dict]: (success, error_message, updated_metadata)
@@ -65,8 +68,11 @@ def handle_file_processing(
         if not os.path.exists(filepath):
             return False, f"Source file not found: {filepath}", metadata
 
-        current_app.logger.info("Calculating original file hash...")
-        original_hash = calculate_file_hash(filepath)
+        if file_hash:
+            original_hash = file_hash
+        else:
+            current_app.logger.info("Calculating original file hash...")
+            original_hash = calculate_file_hash(filepath)
         metadata['originalFileHash'] = original_hash
         current_app.logger.info(f"Original file hash: {original_hash}")
 
@@ -88,9 +94,11 @@ def handle_file_processing(
         except OSError as e:
             return False, f"Error renaming file: {str(e)}", metadata
 
-        current_app.logger.info("Calculating final file hash...")
-        final_hash = calculate_file_hash(final_path)
+        current_app.logger.info("Calculating final file hashes...")
+        file_hashes = calculate_file_hashes(final_path)
+        final_hash = file_hashes[PRIMARY_HASH_ALGORITHM]
         metadata['finalFileHash'] = final_hash
+        metadata['fileHashes'] = file_hashes
         current_app.logger.info(f"Final file hash: {final_hash}")
 
         if original_hash != final_hash:
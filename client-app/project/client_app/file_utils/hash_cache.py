@@ -0,0 +1,134 @@
+# project/client_app/file_utils/hash_cache.py
+"""LRU cache of file digests keyed by file identity, persisted across restarts."""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+from flask import current_app
+
+class HashCache:
+    """
+    Maps (device, inode, size, mtime_ns) to the digests of that file, so bytes
+    that have already been hashed are not read again: a same-filesystem rename
+    keeps all four, and repeated verification of an unchanged file is a lookup.
+    Any write changes size or mtime_ns, which simply misses the old entry.
+
+    Bounded to HASH_CACHE_SIZE entries (0 disables it), least recently used
+    evicted first, and saved to HASH_CACHE_PATH (default
+    <UPLOAD_FOLDER>/.sessions/hash_cache.json) after every new entry. Another
+    worker's saves are picked up on the next miss.
+    """
+    DEFAULT_PATH = os.path.join('.sessions', 'hash_cache.json')
+
+    _instances: Dict[str, 'HashCache'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Dict[str, str]]' = OrderedDict()
+        self._loaded_mtime = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> Optional['HashCache']:
+        """The cache for the configured upload folder, or None when disabled."""
+        max_entries = int(current_app.config.get('HASH_CACHE_SIZE', 4096))
+        if max_entries <= 0:
+            return None
+        path = current_app.config.get('HASH_CACHE_PATH') or os.path.join(
+            current_app.config['UPLOAD_FOLDER'], cls.DEFAULT_PATH
+        )
+        with cls._instances_lock:
+            cache = cls._instances.get(path)
+            if cache is None or cache.max_entries != max_entries:
+                cache = cls._instances[path] = cls(path, max_entries)
+            return cache
+
+    @staticmethod
+    def file_key(stat: os.stat_result) -> str:
+        return f"{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def get(self, filepath: str, algorithms: Sequence[str]) -> Optional[Dict[str, str]]:
+        """Cached digests of the file as it is now, if every algorithm asked for is there."""
+        try:
+            key = self.file_key(os.stat(filepath))
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None or not all(algorithm in entry for algorithm in algorithms):
+                # Another worker may have hashed it since we last read the file
+                if not self._reload():
+                    return None
+                entry = self._lookup(key)
+                if entry is None or not all(algorithm in entry for algorithm in algorithms):
+                    return None
+            return {algorithm: entry[algorithm] for algorithm in algorithms}
+
+    def put(self, filepath: str, digests: Dict[str, str], stat: Optional[os.stat_result] = None) -> None:
+        """
+        Remember digests for the file. Pass the stat taken before hashing: if the
+        file changed while it was being read, nothing is stored.
+        """
+        try:
+            current = os.stat(filepath)
+        except OSError:
+            return
+        key = self.file_key(current)
+        if stat is not None and self.file_key(stat) != key:
+            return
+        with self._lock:
+            self._reload()
+            entry = self._entries.pop(key, {})
+            entry.update(digests)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def _lookup(self, key: str) -> Optional[Dict[str, str]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _reload(self) -> bool:
+        """Merge in the saved cache if it changed since we last read it; True if it did."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._loaded_mtime:
+            return False
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            current_app.logger.warning(f"Ignoring unreadable hash cache {self.path}: {str(e)}")
+            return False
+        # Saved order is oldest first; entries used here since then stay newest
+        saved_entries = OrderedDict(saved.get('entries', []))
+        merged = OrderedDict((key, entry) for key, entry in saved_entries.items()
+                             if key not in self._entries)
+        for key, entry in self._entries.items():
+            merged[key] = {**saved_entries.get(key, {}), **entry}
+        while len(merged) > self.max_entries:
+            merged.popitem(last=False)
+        self._entries = merged
+        self._loaded_mtime = mtime
+        return True
+
+    def _save(self) -> None:
+        temp_path = f"{self.path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_path, 'w') as f:
+                json.dump({'entries': list(self._entries.items())}, f, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            # The cache only saves work; losing it costs a re-hash
+            current_app.logger.warning(f"Could not save hash cache {self.path}: {str(e)}")
@@ -3,35 +3,150 @@
 
 import os
 import hashlib
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 from flask import current_app
+from .hash_engine import HashEngine
+from .hash_cache import HashCache
 
-def calculate_file_hash(filepath: str, chunk_size: int = 8192) -> str:
+# MD5 is what uploads are verified against, so it is always computed
+PRIMARY_HASH_ALGORITHM = 'md5'
+
+class MultiHasher:
     """
-    Calculate MD5 hash of a file in chunks with enhanced progress tracking
+    Several hashlib digests of the same data, fed by a single read. hashlib
+    releases the GIL on large updates, so for big blocks every algorithm but
+    the first runs on a shared pool thread while the caller does the first.
+    Behaves like a hashlib object whose hexdigest() is the first algorithm's.
     """
-    md5_hash = hashlib.md5()
-    total_size = os.path.getsize(filepath)
-    bytes_processed = 0
+    PARALLEL_MIN_BYTES = 64 * 1024
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, algorithms: Sequence[str], _hashers: Optional[Dict[str, object]] = None):
+        self.algorithms = list(algorithms)
+        self._hashers = _hashers or {algorithm: hashlib.new(algorithm) for algorithm in self.algorithms}
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=max(2, os.cpu_count() or 2), thread_name_prefix='multi-hash'
+                )
+            return cls._executor
+
+    def update(self, data) -> None:
+        hashers = [self._hashers[algorithm] for algorithm in self.algorithms]
+        if len(hashers) == 1 or len(data) < self.PARALLEL_MIN_BYTES:
+            for hasher in hashers:
+                hasher.update(data)
+            return
+
+        # The caller must not reuse the buffer before every update is done,
+        # so wait for all of them even if one fails
+        executor = self._get_executor()
+        futures = [executor.submit(hasher.update, data) for hasher in hashers[1:]]
+        try:
+            hashers[0].update(data)
+        finally:
+            for future in futures:
+                future.exception()
+        for future in futures:
+            future.result()
+
+    def copy(self) -> 'MultiHasher':
+        return MultiHasher(self.algorithms, {a: h.copy() for a, h in self._hashers.items()})
+
+    def hexdigest(self) -> str:
+        return self._hashers[self.algorithms[0]].hexdigest()
+
+    def hexdigests(self) -> Dict[str, str]:
+        return {algorithm: self._hashers[algorithm].hexdigest() for algorithm in self.algorithms}
+
+def configured_hash_algorithms() -> List[str]:
+    """
+    Digests to compute for every stored file, from HASH_ALGORITHMS (a list or a
+    comma-separated string of hashlib names, e.g. "md5,sha256,blake2b").
+    MD5 always comes first since verification uses it.
+    """
+    configured = current_app.config.get('HASH_ALGORITHMS', [PRIMARY_HASH_ALGORITHM])
+    if isinstance(configured, str):
+        configured = configured.split(',')
+
+    algorithms = [PRIMARY_HASH_ALGORITHM]
+    for algorithm in configured:
+        algorithm = algorithm.strip().lower()
+        if not algorithm or algorithm in algorithms:
+            continue
+        if algorithm.startswith('shake_') or algorithm not in hashlib.algorithms_available:
+            raise ValueError(f"Unsupported hash algorithm in HASH_ALGORITHMS: {algorithm}")
+        algorithms.append(algorithm)
+    return algorithms
+
+def calculate_file_hash(filepath: str, chunk_size: Optional[int] = None,
+                        progress_callback: Optional[Callable[[float], None]] = None,
+                        use_cache: bool = True) -> str:
+    """
+    Calculate MD5 hash of a file with the HashEngine (large reusable buffers and
+    read-ahead, per HASH_BLOCK_MB and HASH_READ_MODE; chunk_size overrides the
+    block size). progress_callback, if given, receives the percentage at every 5% step.
+    An unchanged file that was hashed before is answered from the HashCache
+    unless use_cache is False.
+    """
+    return calculate_file_hashes(
+        filepath, [PRIMARY_HASH_ALGORITHM], chunk_size, progress_callback, use_cache
+    )[PRIMARY_HASH_ALGORITHM]
+
+def calculate_file_hashes(filepath: str, algorithms: Optional[Sequence[str]] = None,
+                          chunk_size: Optional[int] = None,
+                          progress_callback: Optional[Callable[[float], None]] = None,
+                          use_cache: bool = True) -> Dict[str, str]:
+    """
+    Calculate several digests of a file from one read of it.
+    algorithms defaults to configured_hash_algorithms(); returns {algorithm: hex digest}.
+    Results are cached by file identity (see HashCache), so renaming or
+    re-verifying an unchanged file does not read it again.
+    """
+    algorithms = list(algorithms or configured_hash_algorithms())
+    cache = HashCache.from_config()
+    if cache is not None and use_cache:
+        cached = cache.get(filepath, algorithms)
+        if cached is not None:
+            current_app.logger.info(f"Using cached hashes for unchanged file: {filepath}")
+            return cached
+
+    hasher = MultiHasher(algorithms)
+    file_stat = os.stat(filepath)
+    total_size = file_stat.st_size
     last_progress = 0
-    
-    current_app.logger.info(f"Starting MD5 hash calculation for file: {filepath}")
-    
-    with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(chunk_size), b""):
-            md5_hash.update(byte_block)
-            bytes_processed += len(byte_block)
-            
-            # Calculate progress percentage
-            progress = int((bytes_processed / total_size) * 100)
-            
-            # Log progress every 5% change
-            if progress >= last_progress + 5:
-                current_app.logger.info(f"Hash calculation progress: {progress}%")
-                last_progress = progress
-                
-    hash_result = md5_hash.hexdigest()
-    current_app.logger.info(f"MD5 hash calculation completed: {hash_result}")
-    return hash_result
+
+    def report(bytes_processed: int) -> None:
+        nonlocal last_progress
+        progress = int((bytes_processed / total_size) * 100)
+
+        # Log progress every 5% change
+        if progress >= last_progress + 5:
+            current_app.logger.info(f"Hash calculation progress: {progress}%")
+            last_progress = progress
+            if progress_callback:
+                progress_callback(float(progress))
+
+    names = ', '.join(hasher.algorithms)
+    current_app.logger.info(f"Starting {names} hash calculation for file: {filepath}")
+
+    # Progress is reported about every 1% of the file, not on every block
+    engine = HashEngine.from_config(block_size=chunk_size, progress_bytes=total_size // 100)
+    engine.digest_file(filepath, [hasher.update], progress=report)
+
+    hash_results = hasher.hexdigests()
+    current_app.logger.info(f"Hash calculation completed: {hash_results}")
+    if cache is not None:
+        cache.put(filepath, hash_results, file_stat)
+    return hash_results
 
 def verify_file_integrity(src_hash: str, dst_path: str) -> bool:
     """
@@ -49,4 +164,61 @@ def verify_file_integrity(src_hash: str, dst_path: str) -> bool:
         return src_hash == dst_hash
     except Exception as e:
         current_app.logger.error(f"Error verifying file integrity: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+class Crc32Digest:
+    """hashlib-style wrapper around zlib.crc32 for cheap per-chunk checksums."""
+    name = 'crc32'
+
+    def __init__(self, value: int = 0):
+        self._value = value
+
+    def update(self, data) -> None:
+        self._value = zlib.crc32(data, self._value)
+
+    def copy(self) -> 'Crc32Digest':
+        return Crc32Digest(self._value)
+
+    def hexdigest(self) -> str:
+        return f"{self._value & 0xffffffff:08x}"
+
+def supported_chunk_algorithms() -> List[str]:
+    """
+    Checksum algorithms accepted for chunks, as advertised to clients.
+    SHAKE variants are left out because their hexdigest needs a length.
+    """
+    algorithms = sorted(a for a in hashlib.algorithms_guaranteed if not a.startswith('shake_'))
+    return ['crc32'] + algorithms
+
+def new_chunk_digest(algorithm: str):
+    """
+    Create a digest object for a per-chunk checksum algorithm.
+    
+    Args:
+        algorithm (str): "crc32" or any hashlib algorithm name
+        
+    Returns:
+        A digest object with update/copy/hexdigest
+    """
+    algorithm = algorithm.lower()
+    if algorithm == 'crc32':
+        return Crc32Digest()
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+
+def parse_chunk_checksum(value: str) -> Tuple[str, str]:
+    """
+    Split a chunk checksum of the form "<algorithm>:<hex digest>".
+    
+    Args:
+        value (str): Checksum sent with the chunk, e.g. "crc32:1a2b3c4d"
+        
+    Returns:
+        Tuple[str, str]: (algorithm, lowercase hex digest)
+    """
+    algorithm, separator, digest = value.strip().partition(':')
+    if not separator or not algorithm or not digest:
+        raise ValueError(f"Invalid chunk checksum: {value}")
+    return algorithm.lower(), digest.lower()
\ No newline at end of file
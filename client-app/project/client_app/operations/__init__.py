@@ -4,13 +4,39 @@
 from .file_operations import FileOperations
 from .cleanup_operations import CleanupOperations
 from .upload_handler import UploadHandler
+from .chunk_writer import ChunkWriter
+from .durability import Durability
+from .chunk_manifest import ChunkManifest
+from .chunk_status import ChunkStatusStore
+from .upload_ranges import ReceivedRanges
+from .upload_journal import UploadJournal
+from .session_store import SessionStore, MemorySessionStore, SqliteSessionStore
 from .metadata_handler import MetadataHandler
-from .processing import FileProcessor  # Updated import path
+from .metadata_store import MetadataStore, MetadataConflictError
+from .change_feed import ChangeFeed
+from .folder_crawler import FolderCrawler
+from .upload_catalog import UploadCatalog
+from .processing import FileProcessor, FinalizationQueue  # Updated import path
 
 __all__ = [
     'FileOperations',
     'CleanupOperations', 
     'UploadHandler',
+    'ChunkWriter',
+    'Durability',
+    'ChunkManifest',
+    'ChunkStatusStore',
+    'ReceivedRanges',
+    'UploadJournal',
+    'SessionStore',
+    'MemorySessionStore',
+    'SqliteSessionStore',
     'MetadataHandler',
-    'FileProcessor'
+    'MetadataStore',
+    'MetadataConflictError',
+    'ChangeFeed',
+    'FolderCrawler',
+    'UploadCatalog',
+    'FileProcessor',
+    'FinalizationQueue'
 ]
\ No newline at end of file
@@ -0,0 +1,432 @@
+# project/client_app/operations/change_feed.py
+"""Per-folder change events for UPLOAD_FOLDER, from inotify or an mtime poller."""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from flask import current_app
+
+class FolderWatcher:
+    """
+    Reports changes under one base folder as events on its upload folders
+    (direct subfolders, dot folders excluded):
+
+        {'type': 'created' | 'modified' | 'deleted', 'folder': name}
+        {'type': 'renamed', 'folder': new name, 'previous': old name}
+        {'type': 'resync'}   events were lost; re-check everything
+
+    read() waits up to timeout seconds and returns what has happened since
+    the last call; flush() returns events held back waiting for a partner
+    (the other half of a rename).
+    """
+    CREATED = 'created'
+    MODIFIED = 'modified'
+    DELETED = 'deleted'
+    RENAMED = 'renamed'
+    RESYNC = 'resync'
+
+    def __init__(self, base_folder: str):
+        self.base_folder = base_folder
+
+    @staticmethod
+    def is_upload_folder(name: str) -> bool:
+        # Dot folders (.sessions) hold internal state, not uploads
+        return not name.startswith('.')
+
+    def read(self, timeout: float) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def pending(self) -> bool:
+        """Whether flush() has events to give."""
+        return False
+
+    def flush(self) -> List[Dict[str, Any]]:
+        return []
+
+    def close(self) -> None:
+        pass
+
+class InotifyWatcher(FolderWatcher):
+    """
+    Linux inotify through ctypes: one watch on the base folder for folders
+    appearing, disappearing and being renamed, plus one per upload folder for
+    files created, closed after writing, deleted or moved inside it.
+    """
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    BASE_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    FOLDER_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ATTRIB | IN_ONLYDIR
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, base_folder: str):
+        super().__init__(base_folder)
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._libc = libc
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1 failed: {os.strerror(error)}")
+        # Watch descriptor <-> upload folder name; renames keep the descriptor
+        self._names: Dict[int, str] = {}
+        self._watches: Dict[str, int] = {}
+        # IN_MOVED_FROM halves waiting for their IN_MOVED_TO, by cookie
+        self._moves: Dict[int, str] = {}
+        try:
+            self._base_wd = self._add_watch(base_folder, self.BASE_MASK)
+            for entry in os.scandir(base_folder):
+                if self.is_upload_folder(entry.name) and entry.is_dir():
+                    self._watch_folder(entry.name)
+        except BaseException:
+            self.close()
+            raise
+
+    def _add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            # ENOSPC here means fs.inotify.max_user_watches is exhausted
+            raise OSError(error, f"inotify_add_watch failed: {os.strerror(error)}", path)
+        return wd
+
+    def _watch_folder(self, name: str) -> None:
+        try:
+            wd = self._add_watch(os.path.join(self.base_folder, name), self.FOLDER_MASK)
+        except OSError as e:
+            if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                return  # Gone again already; its delete event follows
+            raise
+        self._names[wd] = name
+        self._watches[name] = wd
+
+    def _forget_folder(self, name: str, remove_watch: bool = False) -> None:
+        wd = self._watches.pop(name, None)
+        if wd is not None:
+            self._names.pop(wd, None)
+            if remove_watch:
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+    def read(self, timeout: float) -> List[Dict[str, Any]]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(sys.getfilesystemencoding(), 'surrogateescape')
+            offset += length
+            events.extend(self._translate(wd, mask, cookie, name))
+        return events
+
+    def _translate(self, wd: int, mask: int, cookie: int, name: str) -> List[Dict[str, Any]]:
+        if mask & self.IN_Q_OVERFLOW:
+            return [{'type': self.RESYNC}]
+
+        if wd == self._base_wd:
+            if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                raise OSError(errno.ENOENT, "Upload folder was removed or moved", self.base_folder)
+            if not (mask & self.IN_ISDIR) or not self.is_upload_folder(name):
+                return []
+            if mask & self.IN_CREATE:
+                self._watch_folder(name)
+                return [{'type': self.CREATED, 'folder': name}]
+            if mask & self.IN_DELETE:
+                self._forget_folder(name)
+                return [{'type': self.DELETED, 'folder': name}]
+            if mask & self.IN_MOVED_FROM:
+                self._moves[cookie] = name
+                return []
+            if mask & self.IN_MOVED_TO:
+                previous = self._moves.pop(cookie, None)
+                if previous is None:
+                    # Moved in from outside the upload folder
+                    self._watch_folder(name)
+                    return [{'type': self.CREATED, 'folder': name}]
+                wd = self._watches.pop(previous, None)
+                if wd is not None:
+                    self._names[wd] = name
+                    self._watches[name] = wd
+                return [{'type': self.RENAMED, 'folder': name, 'previous': previous}]
+            return []
+
+        folder = self._names.get(wd)
+        if folder is None:
+            return []
+        if mask & self.IN_IGNORED:
+            # The kernel dropped the watch (folder deleted); the base watch reports it
+            self._names.pop(wd, None)
+            if self._watches.get(folder) == wd:
+                del self._watches[folder]
+            return []
+        return [{'type': self.MODIFIED, 'folder': folder}]
+
+    def pending(self) -> bool:
+        return bool(self._moves)
+
+    def flush(self) -> List[Dict[str, Any]]:
+        # A move whose other half never came went outside the upload folder
+        events = []
+        for name in self._moves.values():
+            self._forget_folder(name, remove_watch=True)
+            events.append({'type': self.DELETED, 'folder': name})
+        self._moves.clear()
+        return events
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class PollingWatcher(FolderWatcher):
+    """
+    Compares (inode, mtime) of every upload folder every poll_seconds. Used
+    where inotify is unavailable or blind: Windows, and network mounts (NFS,
+    SMB), whose changes made by other hosts never reach the local kernel.
+    A folder that comes back under a new name with the same inode is a rename.
+    """
+    def __init__(self, base_folder: str, poll_seconds: float):
+        super().__init__(base_folder)
+        self.poll_seconds = poll_seconds
+        self._next_poll = time.monotonic() + poll_seconds
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for entry in os.scandir(self.base_folder):
+            if not self.is_upload_folder(entry.name):
+                continue
+            try:
+                if entry.is_dir():
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_ino, stat.st_mtime_ns)
+            except FileNotFoundError:
+                continue
+        return snapshot
+
+    def read(self, timeout: float) -> List[Dict[str, Any]]:
+        wait = self._next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        if wait > 0:
+            time.sleep(wait)
+        self._next_poll = time.monotonic() + self.poll_seconds
+
+        previous, current = self._snapshot, self._scan()
+        self._snapshot = current
+        gone = {name: previous[name] for name in previous.keys() - current.keys()}
+        # st_ino is 0 on some filesystems, which can't be told apart that way
+        gone_by_inode = {key[0]: name for name, key in gone.items() if key[0]}
+
+        events = []
+        for name in sorted(current.keys() - previous.keys()):
+            old_name = gone_by_inode.pop(current[name][0], None)
+            if old_name is not None:
+                del gone[old_name]
+                events.append({'type': self.RENAMED, 'folder': name, 'previous': old_name})
+            else:
+                events.append({'type': self.CREATED, 'folder': name})
+        for name in sorted(gone):
+            events.append({'type': self.DELETED, 'folder': name})
+        for name in sorted(current.keys() & previous.keys()):
+            if current[name] != previous[name]:
+                events.append({'type': self.MODIFIED, 'folder': name})
+        return events
+
+class ChangeFeed:
+    """
+    A background thread per worker process that watches UPLOAD_FOLDER and
+    hands batches of folder events (see FolderWatcher) to its subscribers,
+    so the upload catalog and the metadata caches follow changes made by
+    anyone (the admin portal, the external inventory tool, folders moved by
+    hand) without rescanning the tree.
+
+    CHANGE_FEED picks the watcher: 'inotify', 'poll' (every
+    CHANGE_FEED_POLL_SECONDS), 'off', or 'auto' (default), which uses inotify
+    on local Linux filesystems and polling elsewhere. Events within DEBOUNCE
+    seconds are coalesced, so a burst of chunk writes is one 'modified'. If
+    inotify fails (e.g. the watch limit is reached) the feed falls back to
+    polling. Subscribers get a 'resync' event first, and again whenever
+    events may have been lost.
+    """
+    DEBOUNCE = 0.25
+
+    # Filesystems whose remote changes inotify never sees
+    NETWORK_FILESYSTEMS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', 'afs', '9p', 'ceph',
+                           'glusterfs', 'fuse.glusterfs', 'fuse.sshfs', 'lustre', 'gpfs')
+
+    _subscribers: List[Callable[[Dict[str, Any]], None]] = []
+    _thread: Optional[threading.Thread] = None
+    _stop: Optional[threading.Event] = None
+    _pid: Optional[int] = None
+    _backend: Optional[str] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def subscribe(cls, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Call callback(event) for every event, inside an app context, on the feed thread."""
+        with cls._lock:
+            if callback not in cls._subscribers:
+                cls._subscribers.append(callback)
+
+    @classmethod
+    def running(cls) -> bool:
+        """Whether this process has a live feed, i.e. subscribers are being kept current."""
+        return cls._thread is not None and cls._pid == os.getpid() and cls._thread.is_alive()
+
+    @classmethod
+    def start(cls, app=None) -> bool:
+        """Start the feed for the app's UPLOAD_FOLDER unless it runs already; returns running()."""
+        app = app or current_app._get_current_object()
+        mode = app.config.get('CHANGE_FEED', 'auto')
+        base_folder = app.config.get('UPLOAD_FOLDER')
+        if mode == 'off' or not base_folder or not os.path.isdir(base_folder):
+            return False
+        with cls._lock:
+            # A thread started before a fork (gunicorn --preload) doesn't exist in the child
+            if cls._thread is not None and cls._pid == os.getpid() and cls._thread.is_alive():
+                return True
+            cls._stop = threading.Event()
+            cls._pid = os.getpid()
+            cls._thread = threading.Thread(target=cls._run, args=(app, base_folder, mode, cls._stop),
+                                           name='change-feed', daemon=True)
+            cls._thread.start()
+        return True
+
+    @classmethod
+    def stop(cls) -> None:
+        with cls._lock:
+            thread, stop = cls._thread, cls._stop
+            cls._thread = None
+        if thread is not None:
+            stop.set()
+            thread.join(timeout=5)
+
+    @classmethod
+    def backend(cls) -> Optional[str]:
+        """'inotify' or 'poll' while the feed runs."""
+        return cls._backend if cls.running() else None
+
+    @classmethod
+    def is_network_mount(cls, path: str) -> bool:
+        """Whether path is on a network filesystem, from /proc/mounts (False if unknown)."""
+        try:
+            with open('/proc/mounts', 'r') as f:
+                mounts = [line.split()[:3] for line in f]
+        except OSError:
+            return False
+        path = os.path.realpath(path)
+        best, fstype = '', None
+        for _, mount_point, mount_type in mounts:
+            mount_point = mount_point.replace('\\040', ' ')
+            if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) > len(best):
+                best, fstype = mount_point, mount_type
+        return fstype in cls.NETWORK_FILESYSTEMS
+
+    @classmethod
+    def _watcher(cls, app, base_folder: str, mode: str) -> FolderWatcher:
+        poll_seconds = app.config.get('CHANGE_FEED_POLL_SECONDS', 5)
+        use_inotify = mode == 'inotify' or (
+            mode == 'auto' and sys.platform.startswith('linux') and not cls.is_network_mount(base_folder)
+        )
+        if use_inotify:
+            try:
+                cls._backend = 'inotify'
+                return InotifyWatcher(base_folder)
+            except (OSError, AttributeError) as e:
+                app.logger.warning(f"inotify unavailable for {base_folder}, polling instead: {str(e)}")
+        cls._backend = 'poll'
+        return PollingWatcher(base_folder, poll_seconds)
+
+    @classmethod
+    def _run(cls, app, base_folder: str, mode: str, stop: threading.Event) -> None:
+        watcher = None
+        while not stop.is_set():
+            try:
+                if watcher is None:
+                    watcher = cls._watcher(app, base_folder, mode)
+                    app.logger.info(f"Change feed watching {base_folder} ({cls._backend})")
+                    # Whatever changed before the watch existed is found by a rescan
+                    cls._dispatch(app, [{'type': FolderWatcher.RESYNC}])
+
+                events = watcher.read(1.0)
+                if not events and not watcher.pending():
+                    continue
+                deadline = time.monotonic() + cls.DEBOUNCE
+                while not stop.is_set():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    events.extend(watcher.read(remaining))
+                events.extend(watcher.flush())
+                cls._dispatch(app, cls.coalesce(events))
+
+            except Exception as e:
+                app.logger.error(f"Change feed for {base_folder} failed, restarting with polling: {str(e)}")
+                if watcher is not None:
+                    watcher.close()
+                    watcher = None
+                mode = 'poll'
+                stop.wait(app.config.get('CHANGE_FEED_POLL_SECONDS', 5))
+        if watcher is not None:
+            watcher.close()
+
+    @staticmethod
+    def coalesce(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop repeats: one resync replaces everything, and a folder already
+        created, renamed or modified in the batch needs no further 'modified'.
+        """
+        if any(event['type'] == FolderWatcher.RESYNC for event in events):
+            return [{'type': FolderWatcher.RESYNC}]
+        result, seen = [], set()
+        for event in events:
+            if event['type'] == FolderWatcher.MODIFIED and event['folder'] in seen:
+                continue
+            seen.add(event['folder'])
+            if event['type'] == FolderWatcher.DELETED:
+                seen.discard(event['folder'])
+            result.append(event)
+        return result
+
+    @classmethod
+    def _dispatch(cls, app, events: List[Dict[str, Any]]) -> None:
+        with cls._lock:
+            subscribers = list(cls._subscribers)
+        with app.app_context():
+            for event in events:
+                for callback in subscribers:
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        app.logger.error(f"Change feed subscriber failed on {event}: {str(e)}")
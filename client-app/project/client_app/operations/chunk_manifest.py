@@ -0,0 +1,56 @@
+# project/client_app/operations/chunk_manifest.py
+"""Per-chunk manifest written next to a completed upload."""
+
+import csv
+import os
+from typing import Dict, List, Tuple
+from flask import current_app
+
+class ChunkManifest:
+    FIELDS = ['filename', 'chunk', 'offset', 'size', 'hash', 'algorithm']
+
+    @staticmethod
+    def get_manifest_path(upload_folder: str, filename: str) -> str:
+        """Manifest path, in the *_inventory.csv shape the history views read."""
+        return os.path.join(upload_folder, f"{filename}_inventory.csv")
+
+    @classmethod
+    def write(cls, upload_folder: str, filename: str,
+              chunks: Dict[int, Tuple[int, str, str]]) -> str:
+        """
+        Write one row per verified chunk (offset -> (size, algorithm, digest)).
+        Rows are numbered in offset order so "Resend" can refer to them by chunk.
+        """
+        manifest_path = cls.get_manifest_path(upload_folder, filename)
+        temp_path = f"{manifest_path}.tmp"
+        with open(temp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(cls.FIELDS)
+            for index, offset in enumerate(sorted(chunks)):
+                size, algorithm, digest = chunks[offset]
+                writer.writerow([filename, index, offset, size, digest, algorithm])
+        os.replace(temp_path, manifest_path)
+        current_app.logger.info(f"Wrote chunk manifest with {len(chunks)} entries: {manifest_path}")
+        return manifest_path
+
+    @staticmethod
+    def read(manifest_path: str) -> List[Dict[str, str]]:
+        """
+        Rows of any *_inventory.csv, ours or the external tool's, as
+        {file, chunk, hash, size} for the history views.
+        """
+        with open(manifest_path, 'r') as f:
+            # Skip empty lines and handle potential BOM
+            csv_content = f.read().strip()
+        if csv_content.startswith('\ufeff'):
+            csv_content = csv_content[1:]
+        if not csv_content:
+            return []
+
+        # Map CSV columns to expected names
+        return [{
+            'file': row.get('filename', row.get('file', '')),
+            'chunk': row.get('chunk', ''),
+            'hash': row.get('hash', ''),
+            'size': row.get('size', '0')
+        } for row in csv.DictReader(csv_content.splitlines())]
@@ -0,0 +1,139 @@
+# project/client_app/operations/chunk_status.py
+"""Received/verified chunk bitmaps the admin portal's check-status answers from."""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict
+from flask import current_app
+from .session_store import _ImmediateTransaction
+from .upload_journal import UploadJournal
+from .upload_ranges import ReceivedRanges
+
+class ChunkStatusStore:
+    """
+    One row per upload folder and source in <UPLOAD_FOLDER>/.sessions/chunk_status.db
+    (CHUNK_STATUS_DB_PATH): how many chunks the upload has, and two bitmaps
+    (bit i of byte i // 8 is chunk i) of those received and those verified.
+
+    The schema is defined here only; the admin portal
+    (admin-app/project/admin_app/chunk_status.py) uses the database while its
+    user_version is the SCHEMA_VERSION it expects, and adds "scan" rows for
+    folders with an external inventory.csv.
+
+    The upload path keeps an "upload" row per folder as it acknowledges each
+    range, so uploads in progress show up too. Its chunks are blocks of
+    chunk_size (MIN_CHUNK_SIZE) bytes, since the client varies the size of
+    what it sends: a block is received once all of its bytes are, whichever
+    requests brought them, and its verified bit is cleared if any of them
+    arrived without a checksum the server could check.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chunk_status (
+            folder TEXT NOT NULL,
+            source TEXT NOT NULL,
+            source_key TEXT,
+            total INTEGER NOT NULL,
+            received BLOB NOT NULL,
+            verified BLOB,
+            chunk_size INTEGER,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (folder, source)
+        );
+    """
+    # Stored as the database's user_version; bump it whenever SCHEMA changes
+    SCHEMA_VERSION = 2
+
+    UPLOAD = 'upload'
+
+    _instances: Dict[str, 'ChunkStatusStore'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path: str, base_upload_folder: str, chunk_size: int):
+        self.db_path = db_path
+        self.base_upload_folder = base_upload_folder
+        self.chunk_size = chunk_size
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._connect()
+        if conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+            # The rows are derived state, so an old layout is simply dropped
+            conn.execute('DROP TABLE IF EXISTS chunk_status')
+            conn.executescript(self.SCHEMA)
+            conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+    @classmethod
+    def from_config(cls) -> 'ChunkStatusStore':
+        base_upload_folder = current_app.config.get('UPLOAD_FOLDER')
+        if not base_upload_folder:
+            raise ValueError("UPLOAD_FOLDER not set in configuration")
+        db_path = current_app.config.get('CHUNK_STATUS_DB_PATH') or os.path.join(
+            UploadJournal.get_journal_dir(base_upload_folder), 'chunk_status.db'
+        )
+        with cls._instances_lock:
+            store = cls._instances.get(db_path)
+            if store is None:
+                chunk_size = current_app.config.get('MIN_CHUNK_SIZE', 1024 * 1024)
+                store = cls._instances[db_path] = cls(db_path, base_upload_folder, chunk_size)
+            return store
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, reopened after a fork (gunicorn workers)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def mark_range(self, folder: str, upload_id: str, file_size: int, start: int, end: int,
+                   received: ReceivedRanges, verified: bool) -> None:
+        """
+        Update the blocks [start, end) touches; received is the upload's merged
+        ranges after this one. A row left by an earlier upload into the folder
+        is started over.
+        """
+        chunk_size = self.chunk_size
+        total = -(-file_size // chunk_size)
+        with _ImmediateTransaction(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT source_key, received, verified, chunk_size FROM chunk_status WHERE folder = ? AND source = ?',
+                (folder, self.UPLOAD)
+            ).fetchone()
+            if row is not None and row[0] == upload_id and row[3] == chunk_size:
+                received_bits, verified_bits = bytearray(row[1]), bytearray(row[2])
+            else:
+                received_bits, verified_bits = bytearray((total + 7) // 8), bytearray(b'\xff' * ((total + 7) // 8))
+
+            for index in range(start // chunk_size, -(-end // chunk_size)):
+                if received.covers(index * chunk_size, min((index + 1) * chunk_size, file_size)):
+                    received_bits[index // 8] |= 1 << (index % 8)
+                if not verified:
+                    verified_bits[index // 8] &= ~(1 << (index % 8)) & 0xff
+
+            conn.execute(
+                'INSERT OR REPLACE INTO chunk_status '
+                '(folder, source, source_key, total, received, verified, chunk_size, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (folder, self.UPLOAD, upload_id, total, bytes(received_bits), bytes(verified_bits),
+                 chunk_size, time.time())
+            )
+
+    @classmethod
+    def record_range(cls, session: Dict[str, Any], start: int, end: int,
+                     received: ReceivedRanges, verified: bool) -> None:
+        """
+        Record an acknowledged range of an upload; verified when the client's
+        checksum for it matched. Like UploadCatalog.touch, a failure is logged
+        and never fails the upload.
+        """
+        try:
+            store = cls.from_config()
+            folder = os.path.relpath(os.path.abspath(session['upload_folder']),
+                                     os.path.abspath(store.base_upload_folder))
+            store.mark_range(folder, session['upload_id'], session['file_size'], start, end, received, verified)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            current_app.logger.warning(f"Could not record chunk status for {session['upload_folder']}: {str(e)}")
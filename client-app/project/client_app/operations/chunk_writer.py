@@ -0,0 +1,109 @@
+# project/client_app/operations/chunk_writer.py
+"""Positional chunk writes into a preallocated target file."""
+
+import os
+import threading
+from typing import Callable, Optional
+from ..file_utils import HashEngine
+
+class ChunkWriter:
+    _OPEN_FLAGS = getattr(os, 'O_BINARY', 0)
+    _BUFFER_SIZE = 1024 * 1024
+    _local = threading.local()
+
+    @classmethod
+    def _buffer(cls) -> memoryview:
+        """Per-thread copy buffer, allocated once and reused for every chunk."""
+        buffer = getattr(cls._local, 'buffer', None)
+        if buffer is None:
+            buffer = cls._local.buffer = memoryview(bytearray(cls._BUFFER_SIZE))
+        return buffer
+
+    @classmethod
+    def preallocate(cls, filepath: str, file_size: int) -> None:
+        """
+        Create the target file at its final size so chunks can land at any offset.
+        Uses posix_fallocate where the filesystem supports it to avoid fragmentation,
+        falling back to a sparse ftruncate (e.g. on SMB mounts or Windows).
+        """
+        fd = os.open(filepath, os.O_RDWR | os.O_CREAT | cls._OPEN_FLAGS, 0o644)
+        try:
+            os.ftruncate(fd, file_size)
+            if file_size > 0 and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, 0, file_size)
+                except OSError:
+                    pass  # Filesystem can't reserve blocks; the sparse file still works
+        finally:
+            os.close(fd)
+
+    @classmethod
+    def write_at(cls, filepath: str, data: bytes, offset: int, fsync: bool = True) -> int:
+        """Write data at an absolute offset of an existing file and return bytes written."""
+        fd = os.open(filepath, os.O_WRONLY | cls._OPEN_FLAGS)
+        try:
+            view = memoryview(data)
+            written = 0
+            while written < len(view):
+                written += cls._pwrite(fd, view[written:], offset + written)
+            if fsync:
+                os.fsync(fd)
+            return written
+        finally:
+            os.close(fd)
+
+    @classmethod
+    def copy_to(cls, filepath: str, stream, offset: int, length: int, fsync: bool = True,
+                digest: Optional[Callable] = None) -> int:
+        """
+        Copy up to `length` bytes from a readable stream into filepath at offset.
+        Data moves through the fixed per-thread buffer with readinto, so no chunk-sized
+        bytes objects are created and memory per in-flight chunk stays bounded.
+        If digest is given it is called with every block written (e.g. hasher.update).
+        Returns the number of bytes copied, which is short if the stream ends early.
+        """
+        buffer = cls._buffer()
+        readinto = getattr(stream, 'readinto', None)
+        fd = os.open(filepath, os.O_WRONLY | cls._OPEN_FLAGS)
+        try:
+            copied = 0
+            while copied < length:
+                want = min(len(buffer), length - copied)
+                if readinto is not None:
+                    count = readinto(buffer[:want]) or 0
+                else:
+                    data = stream.read(want)
+                    count = len(data)
+                    buffer[:count] = data
+                if not count:
+                    break
+
+                view = buffer[:count]
+                if digest is not None:
+                    digest(view)
+                written = 0
+                while written < count:
+                    written += cls._pwrite(fd, view[written:], offset + copied + written)
+                copied += count
+
+            if fsync:
+                os.fsync(fd)
+            return copied
+        finally:
+            os.close(fd)
+
+    @classmethod
+    def digest_range(cls, filepath: str, start: int, end: int, digest: Callable) -> None:
+        """
+        Feed bytes [start, end) of a file to digest. Uses the HashEngine, so a long
+        read-back (e.g. a whole file at finalization) gets read-ahead buffering.
+        """
+        HashEngine.from_config().digest_range(filepath, start, end, [digest])
+
+    @staticmethod
+    def _pwrite(fd: int, data, offset: int) -> int:
+        """Positional write; emulated with lseek on platforms without os.pwrite."""
+        if hasattr(os, 'pwrite'):
+            return os.pwrite(fd, data, offset)
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.write(fd, data)
@@ -2,6 +2,7 @@
 from flask import current_app
 import os
 import shutil
+from .file_operations import FileOperations
 
 class CleanupOperations:
     @staticmethod
@@ -12,6 +13,9 @@ class CleanupOperations:
 
         folder_path = os.path.join(base_upload_folder, folder_name)
         current_app.logger.info(f"Attempting to delete folder: {folder_path}")
+
+        # Forget any session still writing here so it can't be resumed into a deleted folder
+        FileOperations.discard_sessions(folder_path)
         
         if not os.path.exists(folder_path):
             current_app.logger.info(f"Folder not found: {folder_path}")
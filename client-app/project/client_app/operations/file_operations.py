@@ -3,207 +3,575 @@
 from flask import current_app, request
 import json
 import os
+import re
 import sys
-from threading import Lock
+from threading import Condition, Lock
 import time
-from typing import Dict, Any, Optional
-from ..utils import get_metadata_path, find_metadata_file, ensure_dir_exists
-from ..file_utils import handle_file_processing
+import uuid
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+from ..utils import get_metadata_path, find_metadata_file
+from ..file_utils import (
+    handle_file_processing, new_chunk_digest, parse_chunk_checksum,
+    MultiHasher, configured_hash_algorithms
+)
 from .upload_handler import UploadHandler
 from .metadata_handler import MetadataHandler
-from .processing import FileProcessor
+from .chunk_writer import ChunkWriter
+from .chunk_manifest import ChunkManifest
+from .chunk_status import ChunkStatusStore
+from .session_store import SessionStore
+from .durability import Durability
+from .upload_catalog import UploadCatalog
+from .processing import FileProcessor, FinalizationQueue, FinalizationJournal
 
 class FileOperations:
-    _processing_lock = Lock()
-    _active_uploads: Dict[str, Dict[str, Any]] = {}
-    _chunk_locks: Dict[str, Lock] = {}
+    # Session state lives in the SessionStore picked by SESSION_STORE, so with the
+    # shared backend any worker can take any request. This process only keeps what
+    # can't be shared: per-file locks and the running MD5 of each upload's received
+    # prefix. _sessions_lock guards those two tables only. The per-file locks are
+    # held just long enough to check for duplicates and claim the MD5; chunk bodies
+    # are received and written with no lock held, so one file can take many
+    # concurrent streams.
+    _sessions_lock = Lock()
+    # Serializes opening multipart sessions, so a retried chunk 0 finds the
+    # session its first attempt opened
+    _open_lock = Lock()
+    # Client-chosen upload ids end up in journal file names
+    UPLOAD_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{8,64}')
+    # Requests sweep the store for idle sessions at most this often
+    EXPIRY_SWEEP_SECONDS = 600
+    _last_expiry_sweep = 0.0
+    _digests: Dict[str, Dict[str, Any]] = {}
+    _chunk_locks: Dict[str, Condition] = {}
     
     @classmethod
-    def _get_chunk_lock(cls, filepath: str) -> Lock:
-        """Get or create a lock for a specific file."""
-        if filepath not in cls._chunk_locks:
-            cls._chunk_locks[filepath] = Lock()
-        return cls._chunk_locks[filepath]
+    def _get_chunk_lock(cls, filepath: str) -> Condition:
+        """Get or create the lock (a Condition, to wait for the MD5 claim) for a file."""
+        with cls._sessions_lock:
+            if filepath not in cls._chunk_locks:
+                cls._chunk_locks[filepath] = Condition()
+            return cls._chunk_locks[filepath]
+
+    @classmethod
+    def _get_digest(cls, upload_id: str) -> Dict[str, Any]:
+        """
+        This process's digests (MD5 plus any other HASH_ALGORITHMS, fed together)
+        of the contiguous prefix [0, hashed_offset) of an upload.
+        A worker that has not seen the upload before starts from byte 0.
+        Only the request that set 'busy' (under the file's chunk lock) may touch the
+        hasher, which lets it hash outside the lock while other chunks are written.
+        """
+        with cls._sessions_lock:
+            if upload_id not in cls._digests:
+                cls._digests[upload_id] = {
+                    'hasher': MultiHasher(configured_hash_algorithms()), 'hashed_offset': 0, 'busy': False
+                }
+            return cls._digests[upload_id]
+
+    @classmethod
+    def _release_digest(cls, lock: Condition, digest: Dict[str, Any]) -> None:
+        with lock:
+            digest['busy'] = False
+            lock.notify_all()
 
     @classmethod
     def _release_resources(cls, upload_id: str, filepath: Optional[str] = None):
-        """Release all resources associated with an upload."""
+        """Release all resources associated with an upload, including its stored state."""
         try:
-            if upload_id in cls._active_uploads:
-                cls._active_uploads.pop(upload_id)
-            if filepath and filepath in cls._chunk_locks:
-                cls._chunk_locks.pop(filepath)
+            with cls._sessions_lock:
+                cls._digests.pop(upload_id, None)
+                if filepath and filepath in cls._chunk_locks:
+                    cls._chunk_locks.pop(filepath)
+            SessionStore.from_config().remove(upload_id)
         except Exception as e:
             current_app.logger.error(f"Error releasing resources: {str(e)}")
 
     @classmethod
-    def _ensure_upload_dir(cls, filepath: str) -> None:
-        """Ensure the upload directory exists."""
+    def _expire_session(cls, session: Dict[str, Any]) -> None:
+        """Drop a timed-out session together with its journal and its partly written file."""
+        cls._release_resources(session['upload_id'], session['filepath'])
+        # A later upload of the same name into the same folder writes the same path
+        if any(other['filepath'] == session['filepath'] for other in SessionStore.from_config().list_sessions()):
+            return
         try:
-            directory = os.path.dirname(filepath)
-            if not os.path.exists(directory):
-                ensure_dir_exists(directory)
-                current_app.logger.info(f"Created directory: {directory}")
-        except Exception as e:
-            current_app.logger.error(f"Error creating directory: {str(e)}")
-            raise
+            os.remove(session['filepath'])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current_app.logger.warning(f"Could not remove expired upload {session['filepath']}: {str(e)}")
+
+    @classmethod
+    def expire_sessions(cls) -> int:
+        """Drop every session idle for longer than UPLOAD_SESSION_TIMEOUT; returns how many."""
+        timeout = current_app.config.get('UPLOAD_SESSION_TIMEOUT', 24 * 60 * 60)
+        with cls._sessions_lock:
+            cls._last_expiry_sweep = time.time()
+        expired = 0
+        for session in SessionStore.from_config().list_sessions():
+            if session['finalizing'] and FinalizationQueue.owner_alive(session['finalizer']):
+                continue
+            if time.time() - session['last_chunk_time'] > timeout:
+                current_app.logger.info(f"Expiring idle upload {session['upload_id']} of {session['filename']}")
+                cls._expire_session(session)
+                expired += 1
+        return expired
+
+    @classmethod
+    def _sweep_expired_sessions(cls) -> None:
+        """Run expire_sessions if the last sweep is EXPIRY_SWEEP_SECONDS old."""
+        with cls._sessions_lock:
+            if time.time() - cls._last_expiry_sweep < cls.EXPIRY_SWEEP_SECONDS:
+                return
+            cls._last_expiry_sweep = time.time()
+        cls.expire_sessions()
 
     @classmethod
-    def _write_chunk_safely(cls, file_path: str, chunk_data: bytes, chunk_number: int, chunk_size: int = None) -> bool:
-        """Write chunk data to file with proper error handling and initial file creation."""
+    def _get_session(cls, upload_id: str) -> Dict[str, Any]:
+        """Look up an upload session, expiring it if it has timed out."""
+        cls._sweep_expired_sessions()
+        timeout = current_app.config.get('UPLOAD_SESSION_TIMEOUT', 24 * 60 * 60)
+        session = SessionStore.from_config().get(upload_id)
+        if session is None:
+            raise ValueError("Upload not properly initialized")
+
+        if time.time() - session['last_chunk_time'] > timeout:
+            cls._expire_session(session)
+            raise ValueError("Upload timeout - session expired")
+
+        return session
+
+    @classmethod
+    def restore_sessions(cls) -> int:
+        """
+        Pick up sessions left over from before a restart or worker recycle.
+        The MD5 state itself can't be persisted, so a restored upload re-hashes
+        its received prefix from disk when it finalizes. Finalizations cut off
+        by the restart are completed if they had reached the final rename, or
+        rolled back if their file is gone; ones cut off earlier are started
+        again. Sessions idle for longer than UPLOAD_SESSION_TIMEOUT are expired
+        rather than restored.
+        """
+        base_upload_folder = current_app.config['UPLOAD_FOLDER']
+        recovered = FinalizationJournal.recover(base_upload_folder)
+        if recovered:
+            current_app.logger.info(f"Recovered {recovered} interrupted finalization(s)")
+        store = SessionStore.from_config()
+        live = store.restore()
+        # A claim whose process has gone would keep the session from
+        # finalizing or expiring ever again
+        for session in store.list_sessions():
+            if session['finalizing']:
+                cls._release_dead_claim(session)
+        restored = live - cls.expire_sessions()
+        if restored:
+            current_app.logger.info(f"Restored {restored} upload session(s)")
+
+        for job in FinalizationQueue.orphaned(base_upload_folder):
+            session = store.get(job['jobId'])
+            if (session is None or not FinalizationQueue.enabled()
+                    or not session['received'].is_complete(session['file_size'])):
+                # The client's retry of the last range starts an inline finalization
+                FinalizationQueue.fail_orphaned(base_upload_folder, job)
+            elif store.claim_finalize(session['upload_id'], FinalizationQueue.owner()):
+                current_app.logger.info(f"Restarting interrupted finalization of {session['upload_id']}")
+                cls._start_finalization(session)
+        FinalizationQueue.prune(
+            base_upload_folder,
+            current_app.config.get('UPLOAD_SESSION_TIMEOUT', 86400)
+        )
+        return restored
+
+    @classmethod
+    def _release_dead_claim(cls, session: Dict[str, Any]) -> None:
+        """Drop a finalization claim held by a process that is no longer running."""
+        if FinalizationQueue.owner_alive(session['finalizer']):
+            return
+        if SessionStore.from_config().release_finalize(session['upload_id'], session['finalizer']):
+            current_app.logger.warning(
+                f"Released finalization of {session['upload_id']} claimed by {session['finalizer'] or 'an unknown process'}"
+            )
+
+    @classmethod
+    def get_status(cls, upload_id: str) -> Dict[str, Any]:
+        """Progress of a session, with the byte ranges still missing."""
+        session = cls._get_session(upload_id)
+        received = session['received']
+        return {
+            'uploadId': upload_id,
+            'filename': session['filename'],
+            'fileSize': session['file_size'],
+            'uploadFolder': session['upload_folder'],
+            'bytesReceived': received.total(),
+            'missing': received.missing(session['file_size']),
+            'complete': received.is_complete(session['file_size'])
+        }
+
+    @classmethod
+    def discard_sessions(cls, upload_folder: str) -> None:
+        """Drop every session writing into upload_folder, e.g. when it is cancelled."""
+        for session in SessionStore.from_config().list_sessions():
+            if os.path.normpath(session['upload_folder']) == os.path.normpath(upload_folder):
+                cls._release_resources(session['upload_id'], session['filepath'])
+
+    @classmethod
+    def _write_chunk_safely(cls, file_path: str, stream, offset: int, length: int,
+                            digests: Sequence[Any] = ()) -> Tuple[int, List[Any]]:
+        """
+        Stream a chunk body straight into its offset of the preallocated file with retries.
+        Syncing is left to Durability.commit.
+        Copies of the given digests are updated inline and returned with the byte count,
+        so a failed attempt never leaves a session digest half-updated.
+        """
         max_retries = 3
         retry_delay = 1
-        temp_path = f"{file_path}.tmp{chunk_number}"
-        
+        start = stream.tell() if stream.seekable() else None
+
+        for attempt in range(max_retries):
+            try:
+                pending = [digest.copy() for digest in digests]
+
+                def update(block):
+                    for digest in pending:
+                        digest.update(block)
+
+                written = ChunkWriter.copy_to(file_path, stream, offset, length, fsync=False, digest=update)
+                return written, pending
+            except OSError as e:
+                current_app.logger.warning(f"Write attempt {attempt + 1} failed: {str(e)}")
+                # A retry has to replay the body, which only a spooled stream allows
+                if attempt < max_retries - 1 and start is not None:
+                    time.sleep(retry_delay)
+                    retry_delay *= 2
+                    stream.seek(start)
+                else:
+                    current_app.logger.error(f"Failed to write chunk after {attempt + 1} attempts")
+                    raise
+
+    @classmethod
+    def create_session(cls, upload_id: str, filename: str, file_size: int,
+                       metadata: Dict[str, Any], base_upload_folder: str) -> Dict[str, Any]:
+        """Open an upload session: create its folder, preallocate the target and save metadata."""
+        if not base_upload_folder:
+            raise ValueError("UPLOAD_FOLDER not set in configuration")
+        if file_size < 0:
+            raise ValueError("Invalid file size")
+
+        current_app.logger.info(f"Initializing new upload for {filename}")
+        cls._sweep_expired_sessions()
+        folder_name = metadata.get('folder_name', '')
+        upload_folder = UploadHandler.create_upload_folder(base_upload_folder, folder_name)
+        metadata['upload_folder'] = upload_folder
+        metadata['uploadId'] = upload_id
+        # Recorded with the file so admins can see how it was persisted
+        metadata['durability'] = Durability.get_mode()
+        filepath = os.path.join(upload_folder, filename)
+
+        # Reserve the final size up front so data can arrive in any order
+        ChunkWriter.preallocate(filepath, file_size)
+
+        session = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'filepath': filepath,
+            'file_size': file_size,
+            'metadata': metadata,
+            'upload_folder': upload_folder,
+            'durability': metadata['durability']
+        }
+        SessionStore.from_config().create(upload_id, session)
+        with cls._sessions_lock:
+            cls._digests.pop(upload_id, None)
+
+        MetadataHandler.save_metadata(metadata, upload_folder, filename)
+        return session
+
+    @classmethod
+    def write_range(cls, upload_id: str, stream, offset: int, length: int,
+                    total_size: Optional[int] = None, checksum: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Write bytes [offset, offset + length) of an upload from a stream.
+        Shared by the multipart chunk endpoint and the raw Content-Range endpoint;
+        the request that completes the byte range queues finalization and gets
+        the job status back (status "Finalizing", keyed by the upload id).
+        checksum ("<algorithm>:<hex>") is verified before the range is acknowledged;
+        a mismatch fails only this request, so the client can resend the chunk.
+        An empty range writes nothing and just finalizes a session that is already
+        complete, e.g. one restored from its journal.
+        """
+        store = SessionStore.from_config()
+        session = cls._get_session(upload_id)
+        filepath = session['filepath']
+        file_size = session['file_size']
+        durability = session.get('durability', Durability.PER_CHUNK)
+
+        if total_size is not None and total_size != file_size:
+            raise ValueError(f"Declared total size {total_size} does not match session size {file_size}")
+        if offset < 0 or length < 0 or offset + length > file_size:
+            raise ValueError(f"Range {offset}-{offset + length} is outside the declared file size")
+        max_chunk_size = current_app.config.get('MAX_CHUNK_SIZE', 256 * 1024 * 1024)
+        if length > max_chunk_size:
+            raise ValueError(f"Range of {length} bytes exceeds the maximum chunk size of {max_chunk_size}")
+
+        if checksum:
+            algorithm, expected = parse_chunk_checksum(checksum)
+        else:
+            algorithm = current_app.config.get('CHUNK_CHECKSUM_ALGORITHM', 'crc32')
+            expected = None
+        chunk_digest = new_chunk_digest(algorithm)
+
+        lock = cls._get_chunk_lock(filepath)
+        digest = cls._get_digest(upload_id)
+        with lock:
+            if length and session['received'].covers(offset, offset + length):
+                current_app.logger.warning(f"Duplicate range received: {offset}-{offset + length}")
+                return {'status': 'Chunk already processed'}
+
+            # Hash inline when this range extends the hashed prefix and no other
+            # request owns the MD5 right now
+            inline = length > 0 and offset == digest['hashed_offset'] and not digest['busy']
+            if inline:
+                digest['busy'] = True
+
+        try:
+            # Stream the body into place with no lock held and make sure it
+            # matches the range
+            digests = [chunk_digest, digest['hasher']] if inline else [chunk_digest]
+            write_started = time.perf_counter()
+            written, digests = cls._write_chunk_safely(filepath, stream, offset, length, digests)
+            write_seconds = time.perf_counter() - write_started
+            if written != length or stream.read(1):
+                raise ValueError(f"Received body does not match range {offset}-{offset + length}")
+
+            actual = digests[0].hexdigest()
+            if expected is not None and actual != expected:
+                raise ValueError(
+                    f"Chunk checksum mismatch at offset {offset}: expected {algorithm}:{expected}, got {actual}"
+                )
+
+            # Wait for the fsync the durability mode requires before the range
+            # counts as received
+            sync_seconds = Durability.commit(filepath, length, durability)
+            received = store.record_range(upload_id, offset, offset + length, algorithm, actual)
+            bytes_received = received.total()
+            if length:
+                ChunkStatusStore.record_range(session, offset, offset + length, received,
+                                              verified=expected is not None)
+
+            if inline:
+                digest['hasher'] = digests[1]
+                digest['hashed_offset'] = offset + length
+
+            # Fold in ranges that arrived early and are now part of the prefix.
+            # With a shared store other workers hold parts of the prefix, so
+            # reading them back is left to whichever request finalizes.
+            if not store.shared:
+                cls._advance_digest(session, received.contiguous_end(), claimed=inline)
+                inline = False
+        finally:
+            if inline:
+                cls._release_digest(lock, digest)
+
+        # Finalize once every byte is present, whichever range happens to
+        # arrive last. Only one request, on any worker, may claim it; a claim
+        # left behind by a worker that died is given up first.
+        if session['finalizing']:
+            cls._release_dead_claim(session)
+        is_final = store.claim_finalize(upload_id, FinalizationQueue.owner())
+
+        # Process the final range outside every lock so other uploads keep moving
+        if is_final:
+            return cls._start_finalization(session)
+
+        # A retried last range, or a probe, after another request already queued
+        # finalization gets that job back rather than another "Chunk received"
+        if bytes_received == file_size:
+            job = FinalizationQueue.get(upload_id)
+            if job is not None:
+                return job
+
+        # Timing hints let the client tune chunk size and parallelism: writeMs
+        # includes receiving the body, so a slow link shows up there, and syncMs
+        # is the time spent waiting for stable storage
+        return {
+            'status': 'Chunk received',
+            'bytesReceived': bytes_received,
+            'timing': {
+                'writeMs': round(write_seconds * 1000, 1),
+                'syncMs': round(sync_seconds * 1000, 1)
+            }
+        }
+
+    @classmethod
+    def _start_finalization(cls, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Finalize a claimed session, as a FinalizationQueue job unless FINALIZE_WORKERS is 0."""
+        if not FinalizationQueue.enabled():
+            return cls._finalize(session)
+        return FinalizationQueue.submit(
+            session['upload_id'],
+            {'uploadId': session['upload_id'], 'filename': session['filename'],
+             'uploadFolder': session['upload_folder'], 'fileSize': session['file_size']},
+            lambda report: cls._finalize(session, report)
+        )
+
+    @classmethod
+    def _advance_digest(cls, session: Dict[str, Any], contiguous_end: int, claimed: bool = False,
+                        progress: Optional[Callable[[float], None]] = None) -> None:
+        """
+        Extend the session digest up to contiguous_end. Out-of-order ranges are
+        read back once when the gap before them closes (usually from page cache),
+        so the digest is complete the moment the last byte lands.
+        Pass claimed=True if the caller already owns the MD5; it is released here.
+        If another request owns it, that request will catch up instead.
+        progress, if given, receives the percentage of the file hashed so far.
+        """
+        lock = cls._get_chunk_lock(session['filepath'])
+        digest = cls._get_digest(session['upload_id'])
+        if not claimed:
+            with lock:
+                if digest['busy'] or contiguous_end <= digest['hashed_offset']:
+                    return
+                digest['busy'] = True
+
+        try:
+            start = digest['hashed_offset']
+            if contiguous_end > start:
+                update = digest['hasher'].update
+                if progress:
+                    hashed = [start]
+
+                    def update(data, _update=update):
+                        _update(data)
+                        hashed[0] += len(data)
+                        progress(100.0 * hashed[0] / session['file_size'])
+
+                ChunkWriter.digest_range(session['filepath'], start, contiguous_end, update)
+                digest['hashed_offset'] = contiguous_end
+        finally:
+            cls._release_digest(lock, digest)
+
+    @classmethod
+    def _finalize(cls, session: Dict[str, Any],
+                  report: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """
+        Run completed-upload processing and drop the session. report(stage, percent)
+        follows its progress when it runs as a FinalizationQueue job.
+        """
+        report = report or (lambda stage, percent=None: None)
         try:
-            # Ensure directory exists
-            cls._ensure_upload_dir(file_path)
-            
-            # For first chunk, create the file if it doesn't exist
-            if chunk_number == 0 and not os.path.exists(file_path):
-                open(file_path, 'wb').close()
-                current_app.logger.info(f"Created initial file: {file_path}")
-
-            for attempt in range(max_retries):
-                try:
-                    # Write chunk to temporary file
-                    with open(temp_path, 'wb') as temp_file:
-                        temp_file.write(chunk_data)
-                        temp_file.flush()
-                        os.fsync(temp_file.fileno())
-
-                    # Write to main file
-                    with open(file_path, 'r+b') as main_file:
-                        # Set position for this chunk
-                        if chunk_size is not None:
-                            position = chunk_number * chunk_size
-                            main_file.seek(position)
-                        else:
-                            main_file.seek(0, 2)  # Seek to end for append
-
-                        # Read from temp and write to main
-                        with open(temp_path, 'rb') as temp_file:
-                            main_file.write(temp_file.read())
-                        
-                        main_file.flush()
-                        os.fsync(main_file.fileno())
-
-                    # Success - remove temp file and return
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                    return True
-
-                except (IOError, OSError) as e:
-                    current_app.logger.warning(f"Write attempt {attempt + 1} failed: {str(e)}")
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                    else:
-                        current_app.logger.error(f"Failed to write chunk after {max_retries} attempts")
-                        raise
-
-            return False
+            report(FinalizationQueue.SYNCING)
+            Durability.finalize(session['filepath'], session.get('durability', Durability.PER_CHUNK))
+
+            # Wait for any request still hashing its range, then finish the prefix
+            lock = cls._get_chunk_lock(session['filepath'])
+            digest = cls._get_digest(session['upload_id'])
+            with lock:
+                lock.wait_for(lambda: not digest['busy'])
+                digest['busy'] = True
+            report(FinalizationQueue.HASHING, 0.0)
+            cls._advance_digest(
+                session, session['file_size'], claimed=True,
+                progress=lambda percent: report(FinalizationQueue.HASHING, percent)
+            )
+            file_hashes = digest['hasher'].hexdigests()
 
+            result = FileProcessor.process_completed_upload(
+                session['filepath'], session['upload_folder'], session['filename'],
+                session['metadata'], file_hash=digest['hasher'].hexdigest(),
+                file_hashes=file_hashes, progress=report
+            )
+            chunks = SessionStore.from_config().chunks(session['upload_id'])
+            if result.get('success') and chunks:
+                ChunkManifest.write(session['upload_folder'], result['newFilename'], chunks)
+            UploadCatalog.touch(session['upload_folder'])
+            return result
         except Exception as e:
-            current_app.logger.error(f"Error writing chunk: {str(e)}")
-            # Clean up temp file if it exists
-            if os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
+            current_app.logger.error(f"Error in final processing: {str(e)}")
             raise
+        finally:
+            cls._release_resources(session['upload_id'], session['filepath'])
+
+    @classmethod
+    def _open_chunk_session(cls, upload_id: Optional[str], filename: str, file_size: int,
+                            metadata: Dict[str, Any], base_upload_folder: str) -> str:
+        """
+        The session chunk 0 belongs to. A client-supplied upload id names the
+        session; without one, a live session for the same file name, size and
+        folder is taken to be this upload's, so a retried chunk 0 resumes it
+        instead of opening a second folder.
+        """
+        if upload_id is not None and not cls.UPLOAD_ID_PATTERN.fullmatch(upload_id):
+            raise ValueError("Invalid upload id")
+
+        timeout = current_app.config.get('UPLOAD_SESSION_TIMEOUT', 24 * 60 * 60)
+        store = SessionStore.from_config()
+        with cls._open_lock:
+            if upload_id is not None:
+                session = store.get(upload_id)
+                if session is None:
+                    cls.create_session(upload_id, filename, file_size, metadata, base_upload_folder)
+                elif session['filename'] != filename or session['file_size'] != file_size:
+                    raise ValueError(f"Upload id {upload_id} belongs to another file")
+                return upload_id
+
+            folder_name = metadata.get('folder_name', '')
+            for session in store.list_sessions():
+                if (session['filename'] == filename and session['file_size'] == file_size
+                        and session['metadata'].get('folder_name', '') == folder_name
+                        and not session['finalizing']
+                        and time.time() - session['last_chunk_time'] <= timeout):
+                    current_app.logger.info(f"Chunk 0 of {filename} resumes upload {session['upload_id']}")
+                    return session['upload_id']
+
+            upload_id = uuid.uuid4().hex
+            cls.create_session(upload_id, filename, file_size, metadata, base_upload_folder)
+            return upload_id
 
     @classmethod
     def process_chunk(cls, file, chunk: int, total_chunks: int, chunk_size: int, 
-                     filename: str, base_upload_folder: str) -> Dict[str, Any]:
-        """Handle file chunk processing with improved error handling."""
+                     filename: str, base_upload_folder: str,
+                     upload_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Handle a multipart file chunk by mapping its index onto a byte range.
+        Chunk 0 opens the session (see _open_chunk_session; it may carry an
+        uploadId of the client's choosing) and returns its uploadId, which every
+        later chunk has to send back.
+        """
         if not base_upload_folder:
             raise ValueError("UPLOAD_FOLDER not set in configuration")
 
-        upload_id = f"{filename}_{total_chunks}"
-        
-        with cls._processing_lock:
-            try:
-                # Initialize new upload
-                if chunk == 0:
-                    current_app.logger.info(f"Initializing new upload for {filename}")
-                    if upload_id in cls._active_uploads:
-                        current_app.logger.warning(f"Clearing existing upload state for {filename}")
-                        cls._release_resources(upload_id)
-                    
-                    metadata_str = request.form.get('metadata')
-                    if not metadata_str:
-                        raise ValueError("Missing metadata for initial chunk")
-                        
-                    try:
-                        metadata = json.loads(metadata_str)
-                    except json.JSONDecodeError as e:
-                        current_app.logger.error(f"Invalid metadata JSON: {metadata_str}")
-                        raise ValueError(f"Invalid metadata format: {str(e)}")
-                        
-                    folder_name = metadata.get('folder_name', '')
-                    upload_folder = UploadHandler.create_upload_folder(base_upload_folder, folder_name)
-                    metadata['upload_folder'] = upload_folder
-                    
-                    cls._active_uploads[upload_id] = {
-                        'chunks_received': set(),
-                        'metadata': metadata,
-                        'upload_folder': upload_folder,
-                        'last_chunk_time': time.time()
-                    }
-                    
-                    MetadataHandler.save_metadata(metadata, upload_folder, filename)
-                else:
-                    # Verify upload exists and hasn't timed out
-                    if upload_id not in cls._active_uploads:
-                        raise ValueError("Upload not properly initialized")
+        # Initialize new upload, or find the one a retried chunk 0 opened
+        if chunk == 0:
+            metadata_str = request.form.get('metadata')
+            if not metadata_str:
+                raise ValueError("Missing metadata for initial chunk")
                     
-                    if time.time() - cls._active_uploads[upload_id]['last_chunk_time'] > 300:
-                        cls._release_resources(upload_id)
-                        raise ValueError("Upload timeout - session expired")
+            try:
+                metadata = json.loads(metadata_str)
+            except json.JSONDecodeError as e:
+                current_app.logger.error(f"Invalid metadata JSON: {metadata_str}")
+                raise ValueError(f"Invalid metadata format: {str(e)}")
                     
-                    metadata = cls._active_uploads[upload_id]['metadata']
-                    upload_folder = cls._active_uploads[upload_id]['upload_folder']
+            file_size = request.form.get('fileSize', metadata.get('fileSize'))
+            if file_size is None:
+                raise ValueError("Missing declared file size for initial chunk")
+            if chunk_size <= 0:
+                raise ValueError("Invalid chunk size")
 
-                # Check for duplicate chunks
-                if chunk in cls._active_uploads[upload_id]['chunks_received']:
-                    current_app.logger.warning(f"Duplicate chunk received: {chunk}/{total_chunks}")
-                    return {'status': 'Chunk already processed'}
+            upload_id = cls._open_chunk_session(upload_id, filename, int(file_size), metadata, base_upload_folder)
 
-                filepath = os.path.join(upload_folder, filename)
-                chunk_lock = cls._get_chunk_lock(filepath)
+        if not upload_id:
+            raise ValueError("Missing upload id for chunk")
 
-                with chunk_lock:
-                    current_app.logger.info(f"Processing chunk {chunk+1}/{total_chunks} for file {filename}")
-                    
-                    # Read chunk data
-                    chunk_data = file.read()
-                    
-                    # Write chunk safely with retries
-                    if not cls._write_chunk_safely(filepath, chunk_data, chunk, chunk_size):
-                        raise IOError(f"Failed to write chunk {chunk+1}/{total_chunks}")
-
-                    # Update upload state
-                    cls._active_uploads[upload_id]['chunks_received'].add(chunk)
-                    cls._active_uploads[upload_id]['last_chunk_time'] = time.time()
-
-                # Process final chunk
-                if chunk == total_chunks - 1 and len(cls._active_uploads[upload_id]['chunks_received']) == total_chunks:
-                    try:
-                        result = FileProcessor.process_completed_upload(
-                            filepath, upload_folder, filename, metadata
-                        )
-                        cls._release_resources(upload_id, filepath)
-                        return result
-                    except Exception as e:
-                        current_app.logger.error(f"Error in final processing: {str(e)}")
-                        cls._release_resources(upload_id, filepath)
-                        raise
-
-                return {'status': 'Chunk received'}
-
-            except Exception as e:
-                current_app.logger.error(f"Error processing chunk: {str(e)}")
-                cls._release_resources(upload_id)
-                raise
\ No newline at end of file
+        # Verify upload exists and hasn't timed out
+        session = cls._get_session(upload_id)
+        if not 0 <= chunk < total_chunks:
+            raise ValueError(f"Chunk {chunk} is outside the declared file size")
+
+        offset = chunk * chunk_size
+        length = min(chunk_size, session['file_size'] - offset)
+        current_app.logger.info(f"Processing chunk {chunk+1}/{total_chunks} for file {filename}")
+        result = cls.write_range(
+            upload_id, file.stream, offset, length,
+            checksum=request.form.get('chunkChecksum')
+        )
+        return dict(result, uploadId=upload_id)
\ No newline at end of file
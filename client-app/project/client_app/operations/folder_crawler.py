@@ -0,0 +1,127 @@
+# project/client_app/operations/folder_crawler.py
+"""Bounded, throttled parallel reads of many upload folders."""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from flask import current_app
+
+class FolderCrawler:
+    """
+    Runs read(item) for every item (typically a folder's os.DirEntry) on
+    CRAWL_WORKERS threads and yields (item, result) pairs as they finish, so
+    a consumer can store results while later folders are still being read.
+    On a network share each listdir, stat and open is a round trip; keeping
+    several in flight hides most of that latency.
+
+    - at most CRAWL_WORKERS * 4 items are in flight, so memory stays flat
+      however many folders there are
+    - CRAWL_MAX_RATE caps how many items start per second (0 = no cap),
+      during CRAWL_THROTTLE_HOURS ("08-18", local time) if set, else always
+    - progress(stats) is called at most every PROGRESS_INTERVAL seconds and
+      once at the end with done, errors, total (None if items has no len),
+      elapsed and rate
+    - an exception from read() is logged and counted, and the item skipped
+    """
+    PROGRESS_INTERVAL = 2.0
+
+    def __init__(self, workers: Optional[int] = None, max_rate: Optional[float] = None,
+                 throttle_hours: Optional[str] = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        config = current_app.config
+        self.workers = max(1, workers if workers is not None else config.get('CRAWL_WORKERS', 8))
+        self.max_rate = max_rate if max_rate is not None else config.get('CRAWL_MAX_RATE', 0)
+        self.throttle_hours = self._parse_hours(
+            throttle_hours if throttle_hours is not None else config.get('CRAWL_THROTTLE_HOURS')
+        )
+        self.progress = progress
+        self._rate_lock = threading.Lock()
+        self._next_start = 0.0
+
+    @staticmethod
+    def _parse_hours(hours: Optional[str]) -> Optional[Tuple[int, int]]:
+        if not hours:
+            return None
+        try:
+            start, end = (int(part) for part in hours.split('-'))
+        except ValueError:
+            raise ValueError(f"Invalid CRAWL_THROTTLE_HOURS (expected e.g. 08-18): {hours}")
+        if not (0 <= start <= 24 and 0 <= end <= 24):
+            raise ValueError(f"Invalid CRAWL_THROTTLE_HOURS (expected e.g. 08-18): {hours}")
+        return start, end
+
+    def throttled(self) -> bool:
+        """Whether the rate cap applies right now."""
+        if not self.max_rate:
+            return False
+        if self.throttle_hours is None:
+            return True
+        start, end = self.throttle_hours
+        hour = datetime.now().hour
+        # A window like 22-06 wraps past midnight
+        return start <= hour < end if start <= end else (hour >= start or hour < end)
+
+    def _wait_turn(self) -> None:
+        if not self.throttled():
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 1.0 / self.max_rate
+        if start > now:
+            time.sleep(start - now)
+
+    def crawl(self, items: Iterable[Any], read: Callable[[Any], Any]) -> Iterator[Tuple[Any, Any]]:
+        """Yield (item, read(item)) in completion order; read runs inside the app context."""
+        app = current_app._get_current_object()
+        stats = {'done': 0, 'errors': 0, 'total': len(items) if hasattr(items, '__len__') else None,
+                 'elapsed': 0.0, 'rate': 0.0}
+        started = last_report = time.monotonic()
+
+        def run(item):
+            self._wait_turn()
+            with app.app_context():
+                return read(item)
+
+        items = iter(items)
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crawl') as pool:
+            try:
+                while True:
+                    for item in items:
+                        in_flight[pool.submit(run, item)] = item
+                        if len(in_flight) >= self.workers * 4:
+                            break
+                    if not in_flight:
+                        break
+
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        item = in_flight.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            stats['errors'] += 1
+                            app.logger.error(f"Crawler could not read {getattr(item, 'path', item)}: {str(e)}")
+                            continue
+                        stats['done'] += 1
+                        yield item, result
+
+                    now = time.monotonic()
+                    if self.progress and now - last_report >= self.PROGRESS_INTERVAL:
+                        last_report = now
+                        self._report(stats, started)
+            finally:
+                # A consumer that stops early leaves nothing queued behind it
+                for future in in_flight:
+                    future.cancel()
+
+        if self.progress:
+            self._report(stats, started)
+
+    def _report(self, stats: Dict[str, Any], started: float) -> None:
+        stats['elapsed'] = time.monotonic() - started
+        stats['rate'] = stats['done'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        self.progress(dict(stats))
@@ -2,14 +2,18 @@
 
 from flask import current_app
 import os
-import json
 from datetime import datetime
 from ..utils import get_metadata_path, find_metadata_file
+from .metadata_store import MetadataStore
+from .upload_catalog import UploadCatalog
 
 class MetadataHandler:
     @staticmethod
     def save_metadata(metadata: dict, upload_folder: str, filename: str) -> dict:
-        """Save metadata to file with enhanced error handling and proper file handling"""
+        """
+        Merge metadata into the file's current contents and write the result
+        atomically under the folder's lock (see MetadataStore).
+        """
         try:
             # Remove any _complete suffix from filename when creating metadata path
             base_filename = filename.replace('_complete', '')
@@ -19,23 +23,8 @@ class MetadataHandler:
             # Add timestamp using datetime
             metadata['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
-            
-            # Update existing metadata if it exists
-            if os.path.exists(metadata_path):
-                try:
-                    with open(metadata_path, 'r') as f:
-                        existing_metadata = json.load(f)
-                    # Merge existing metadata with new metadata
-                    existing_metadata.update(metadata)
-                    metadata = existing_metadata
-                except Exception as e:
-                    current_app.logger.error(f"Error reading existing metadata: {str(e)}")
-
-            # Write the metadata
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=4)
+            metadata, _ = MetadataStore.update(metadata_path, metadata)
+            UploadCatalog.touch(upload_folder)
             
             # If this is a completion update, ensure we're not creating a duplicate file
             if '_complete' in filename and not metadata_path.endswith('_complete.json'):
@@ -55,22 +44,27 @@ class MetadataHandler:
 
     @staticmethod
     def load_metadata(base_upload_folder: str, filename: str) -> dict:
-        """Load metadata from file with improved file searching"""
+        """
+        Load metadata for a file, located through the upload catalog; walking
+        the whole upload tree is the fallback for files it hasn't indexed yet.
+        """
         try:
-            # First try to find the metadata file without _complete suffix
-            base_filename = filename.replace('_complete', '')
-            metadata_path = find_metadata_file(base_upload_folder, base_filename)
-            
-            # If not found, try with _complete suffix
-            if not metadata_path and not filename.endswith('_complete'):
-                metadata_path = find_metadata_file(base_upload_folder, f"{base_filename}_complete")
-            
+            metadata_path = UploadCatalog.locate_metadata(base_upload_folder, filename)
             if not metadata_path:
-                raise ValueError(f"Metadata file not found for {filename}")
+                # First try to find the metadata file without _complete suffix
+                base_filename = filename.replace('_complete', '')
+                metadata_path = find_metadata_file(base_upload_folder, base_filename)
+                
+                # If not found, try with _complete suffix
+                if not metadata_path and not filename.endswith('_complete'):
+                    metadata_path = find_metadata_file(base_upload_folder, f"{base_filename}_complete")
+                
+                if not metadata_path:
+                    raise ValueError(f"Metadata file not found for {filename}")
+                UploadCatalog.touch(os.path.dirname(metadata_path))
                 
             current_app.logger.info(f"Found metadata file: {metadata_path}")
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            metadata, _ = MetadataStore.read(metadata_path)
                 
             # Ensure critical fields exist
             metadata.setdefault('originalFilename', 'Unknown File')
@@ -0,0 +1,253 @@
+# project/client_app/operations/metadata_store.py
+"""Locked, atomic and cached access to upload metadata files."""
+
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+from flask import current_app
+from .change_feed import FolderWatcher
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class MetadataConflictError(Exception):
+    """The metadata file changed since the caller read it (its ETag no longer matches)."""
+
+class MetadataStore:
+    """
+    The one way to read and write *_metadata.json files, shared with the admin
+    portal (admin-app/project/admin_app/metadata_store.py follows the same
+    on-disk protocol):
+
+    - writes go to a temp file that replaces the metadata file in one rename, so
+      a reader or a crash never sees half a file
+    - writers of one folder are serialized by a thread lock plus an OS file lock
+      on <UPLOAD_FOLDER>/.sessions/locks/<folder>.lock, which also excludes
+      other worker processes and the admin app; <folder> is the folder's path
+      relative to UPLOAD_FOLDER with "/" escaped, so nested folders of the same
+      name don't share a lock. Lock files are never deleted: another process
+      may hold one, and a lock on an unlinked file excludes no one.
+    - every write bumps metadataVersion; the ETag combines it with the file's
+      mtime and size, and a write given if_match fails with
+      MetadataConflictError when someone else wrote in between
+    - parsed files are cached per path and reused while (inode, size, mtime)
+      are unchanged, so repeat reads cost a stat instead of a JSON parse
+    """
+    VERSION_KEY = 'metadataVersion'
+    LOCK_DIR = os.path.join('.sessions', 'locks')
+    LOCK_TIMEOUT = 10
+    CACHE_SIZE = 4096
+
+    _cache: 'OrderedDict[str, Tuple[tuple, Dict[str, Any], str]]' = OrderedDict()
+    _folders: Dict[str, Tuple[int, Optional[str]]] = {}
+    _cache_lock = threading.Lock()
+    _thread_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _stat_key(stat: os.stat_result) -> tuple:
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def etag(cls, metadata: Dict[str, Any], stat: os.stat_result) -> str:
+        return f'"{metadata.get(cls.VERSION_KEY, 0)}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    @classmethod
+    def read(cls, path: str) -> Tuple[Dict[str, Any], str]:
+        """
+        The parsed metadata and its ETag. The dict is the caller's to change.
+        Raises FileNotFoundError if there is no such file.
+        """
+        stat = os.stat(path)
+        key = cls._stat_key(stat)
+        with cls._cache_lock:
+            cached = cls._cache.get(path)
+            if cached is not None and cached[0] == key:
+                cls._cache.move_to_end(path)
+                return copy.deepcopy(cached[1]), cached[2]
+
+        with open(path, 'r') as f:
+            metadata = json.load(f)
+        # A write landing between the stat and the open only means a re-parse next time
+        etag = cls.etag(metadata, stat)
+        cls._remember(path, key, metadata, etag)
+        return copy.deepcopy(metadata), etag
+
+    @classmethod
+    def find(cls, folder_path: str, listing: Optional[Tuple[int, List[str]]] = None) -> Optional[str]:
+        """
+        The metadata file of an upload folder, preferring the completed upload's.
+        The choice is reused until the folder's entries change. A caller that
+        has just listed the folder passes (mtime_ns, names) as listing.
+        """
+        if listing is not None:
+            mtime, names = listing
+        else:
+            try:
+                mtime = os.stat(folder_path).st_mtime_ns
+            except OSError:
+                return None
+            names = None
+        with cls._cache_lock:
+            cached = cls._folders.get(folder_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        if names is None:
+            names = os.listdir(folder_path)
+        metadata_files = sorted(f for f in names if f.endswith('_metadata.json'))
+        chosen = next((f for f in metadata_files if '_complete_metadata.json' in f),
+                      metadata_files[0] if metadata_files else None)
+        path = os.path.join(folder_path, chosen) if chosen else None
+        with cls._cache_lock:
+            cls._folders[folder_path] = (mtime, path)
+        return path
+
+    @classmethod
+    def apply_change(cls, event: Dict[str, Any]) -> None:
+        """ChangeFeed subscriber: forget what was cached for folders that were deleted or renamed."""
+        if event['type'] not in (FolderWatcher.DELETED, FolderWatcher.RENAMED):
+            # Modified folders revalidate by mtime and stat on the next read
+            return
+        base_upload_folder = current_app.config['UPLOAD_FOLDER']
+        folder_path = os.path.join(base_upload_folder, event.get('previous') or event['folder'])
+        prefix = folder_path + os.sep
+        with cls._cache_lock:
+            cls._folders.pop(folder_path, None)
+            for path in [path for path in cls._cache if path.startswith(prefix)]:
+                del cls._cache[path]
+
+    @classmethod
+    def load_folder(cls, folder_path: str, listing: Optional[Tuple[int, List[str]]] = None
+                    ) -> Optional[Tuple[str, Dict[str, Any], str]]:
+        """(path, metadata, etag) for an upload folder, or None if it has no metadata."""
+        path = cls.find(folder_path, listing)
+        if path is None:
+            return None
+        try:
+            metadata, etag = cls.read(path)
+        except FileNotFoundError:
+            # Renamed since the folder was listed
+            with cls._cache_lock:
+                cls._folders.pop(folder_path, None)
+            path = cls.find(folder_path)
+            if path is None:
+                return None
+            metadata, etag = cls.read(path)
+        return path, metadata, etag
+
+    @classmethod
+    def update(cls, path: str, changes: Dict[str, Any],
+               if_match: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """Merge changes into the metadata file (creating it if need be); returns the result and its ETag."""
+        return cls._commit(path, lambda current: {**current, **changes}, if_match)
+
+    @classmethod
+    def write(cls, path: str, metadata: Dict[str, Any],
+              if_match: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """Replace the metadata file's contents; returns them and the new ETag."""
+        return cls._commit(path, lambda current: dict(metadata), if_match)
+
+    @classmethod
+    def _commit(cls, path: str, build: Callable[[Dict[str, Any]], Dict[str, Any]],
+                if_match: Optional[str]) -> Tuple[Dict[str, Any], str]:
+        with cls.lock(path):
+            try:
+                current, etag = cls.read(path)
+            except FileNotFoundError:
+                current, etag = {}, None
+            except ValueError as e:
+                # An unreadable file is replaced rather than blocking every later write
+                current_app.logger.error(f"Error reading existing metadata {path}: {str(e)}")
+                current, etag = {}, None
+            if if_match is not None and if_match != etag:
+                raise MetadataConflictError(f"Metadata {path} was changed by someone else")
+
+            metadata = build(current)
+            metadata[cls.VERSION_KEY] = current.get(cls.VERSION_KEY, 0) + 1
+            cls._replace(path, metadata)
+            stat = os.stat(path)
+            etag = cls.etag(metadata, stat)
+            cls._remember(path, cls._stat_key(stat), metadata, etag)
+            return copy.deepcopy(metadata), etag
+
+    @classmethod
+    def _remember(cls, path: str, key: tuple, metadata: Dict[str, Any], etag: str) -> None:
+        with cls._cache_lock:
+            cls._cache[path] = (key, metadata, etag)
+            cls._cache.move_to_end(path)
+            while len(cls._cache) > cls.CACHE_SIZE:
+                cls._cache.popitem(last=False)
+
+    @staticmethod
+    def _replace(path: str, metadata: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp.{uuid.uuid4().hex}"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(metadata, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            for attempt in range(5):
+                try:
+                    os.replace(temp_path, path)
+                    break
+                except PermissionError:
+                    # Windows refuses while a reader has the file open; readers are brief
+                    if os.name != 'nt' or attempt == 4:
+                        raise
+                    time.sleep(0.05)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def _lock_path(cls, path: str) -> str:
+        base_upload_folder = current_app.config['UPLOAD_FOLDER']
+        folder = os.path.relpath(os.path.dirname(os.path.abspath(path)), os.path.abspath(base_upload_folder))
+        lock_name = quote(folder.replace(os.sep, '/'), safe='')
+        return os.path.join(base_upload_folder, cls.LOCK_DIR, f"{lock_name}.lock")
+
+    @classmethod
+    @contextmanager
+    def lock(cls, path: str) -> Iterator[None]:
+        """Hold the write lock of the folder a metadata file lives in."""
+        lock_path = cls._lock_path(path)
+        with cls._cache_lock:
+            thread_lock = cls._thread_locks.setdefault(lock_path, threading.Lock())
+        with thread_lock:
+            os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+            with open(lock_path, 'a+b') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                else:
+                    lock_file.seek(0)
+                    deadline = time.monotonic() + cls.LOCK_TIMEOUT
+                    while True:
+                        try:
+                            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                            break
+                        except OSError:
+                            if time.monotonic() >= deadline:
+                                raise TimeoutError(f"Timed out waiting for the metadata lock {lock_path}")
+                            time.sleep(0.05)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -7,6 +7,8 @@ from .status_tracker import ProcessingStatusTracker
 from .cleanup_handler import CleanupHandler
 from .completion_handler import CompletionHandler
 from .file_processor import FileProcessor  # Add FileProcessor to exports
+from .finalization_queue import FinalizationQueue
+from .finalization_journal import FinalizationJournal
 
 __all__ = [
     'CoreProcessor',
@@ -14,5 +16,7 @@ __all__ = [
     'ProcessingStatusTracker',
     'CleanupHandler',
     'CompletionHandler',
-    'FileProcessor'  # Export FileProcessor
+    'FileProcessor',  # Export FileProcessor
+    'FinalizationQueue',
+    'FinalizationJournal'
 ]
\ No newline at end of file
@@ -3,6 +3,7 @@
 
 import os
 from flask import current_app
+from ..upload_catalog import UploadCatalog
 
 class CleanupHandler:
     @classmethod
@@ -26,6 +27,7 @@ class CleanupHandler:
             if os.path.exists(upload_folder) and not os.listdir(upload_folder):
                 os.rmdir(upload_folder)
                 current_app.logger.info(f"Removed empty upload folder: {upload_folder}")
+            UploadCatalog.touch(upload_folder)
                 
         except Exception as e:
             current_app.logger.error(f"Error cleaning up failed upload: {str(e)}")
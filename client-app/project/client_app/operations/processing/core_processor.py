@@ -6,7 +6,7 @@ import os
 import time
 from threading import Lock
 from ..metadata_handler import MetadataHandler
-from ...file_utils import calculate_file_hash
+from ...file_utils import calculate_file_hash, calculate_file_hashes, PRIMARY_HASH_ALGORITHM
 
 class CoreProcessor:
     _processing_lock = Lock()
@@ -71,8 +71,10 @@ class CoreProcessor:
                              metadata: dict, upload_folder: str) -> dict:
         """Process a completed file upload."""
         try:
-            # Calculate final hash
-            final_hash = cls.calculate_file_hash(filepath)
+            # Calculate the final hash along with every other configured digest
+            current_app.logger.info(f"Calculating hashes for file: {filepath}")
+            file_hashes = calculate_file_hashes(filepath)
+            final_hash = file_hashes[PRIMARY_HASH_ALGORITHM]
             
             # Verify integrity
             is_verified = final_hash == original_hash
@@ -80,6 +82,7 @@ class CoreProcessor:
             # Update metadata
             metadata.update({
                 'finalFileHash': final_hash,
+                'fileHashes': file_hashes,
                 'fileVerified': is_verified,
                 'processingCompleted': True,
                 'completedAt': time.strftime('%Y-%m-%d %H:%M:%S'),
@@ -3,14 +3,15 @@
 import os
 import time
 import shutil
-from typing import Dict, Any, Optional, Tuple
+from typing import Callable, Dict, Any, Optional, Tuple
 from flask import current_app
 from ..metadata_handler import MetadataHandler
-from ...file_utils import calculate_file_hash
+from ...file_utils import calculate_file_hashes, HashCache, PRIMARY_HASH_ALGORITHM
 from .core_processor import CoreProcessor
 from .file_rename import FileRenameHandler
 from .cleanup_handler import CleanupHandler
 from .completion_handler import CompletionHandler
+from .finalization_journal import FinalizationJournal
 
 class FileProcessor:
     @staticmethod
@@ -19,29 +20,6 @@ class FileProcessor:
         if not os.path.exists(directory):
             os.makedirs(directory, exist_ok=True)
 
-    @staticmethod
-    def safe_rename(src: str, dst: str, max_retries: int = 3) -> bool:
-        """
-        Safely rename a file with retries.
-        Returns True if successful, False otherwise.
-        """
-        for attempt in range(max_retries):
-            try:
-                if os.path.exists(dst):
-                    current_app.logger.warning(f"Destination already exists: {dst}")
-                    return False
-                    
-                os.rename(src, dst)
-                current_app.logger.info(f"Successfully renamed: {src} -> {dst}")
-                return True
-                
-            except OSError as e:
-                current_app.logger.warning(f"Rename attempt {attempt + 1} failed: {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)  # Wait before retry
-                
-        return False
-
     @classmethod
     def validate_upload(cls, filepath: str, metadata: dict) -> Tuple[bool, str]:
         """
@@ -61,122 +39,92 @@ class FileProcessor:
 
     @classmethod
     def process_completed_upload(cls, filepath: str, upload_folder: str, 
-                               filename: str, metadata: dict) -> Dict[str, Any]:
+                               filename: str, metadata: dict,
+                               file_hash: Optional[str] = None,
+                               file_hashes: Optional[Dict[str, str]] = None,
+                               progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
         """
         Process completed file upload following exact sequence requirements.
         Handles all stages from initial verification through completion.
+        file_hash is the MD5 computed while the data was written, and file_hashes
+        every HASH_ALGORITHMS digest computed with it; when given, the file is not
+        read again to verify it. Otherwise all digests come from a single read.
+        progress(stage, percent=None) is told when each stage starts, and how far
+        a re-hash has got; the stage is also kept in metadata as processingStage.
+        Metadata is written once, when the verified file is committed under its
+        final name (see FinalizationJournal).
         """
+        def report(stage: str, percent: Optional[float] = None) -> None:
+            metadata['processingStage'] = stage
+            if progress:
+                progress(stage, percent)
+
         try:
             # Initial validation
             is_valid, error_msg = cls.validate_upload(filepath, metadata)
             if not is_valid:
                 raise ValueError(error_msg)
 
-            # 1. Create/update initial metadata
+            # 1. Record file details; nothing is written until the commit
+            original_hash = metadata['originalFileHash']  # From chunked upload
             metadata.update({
                 'processingStarted': time.strftime('%Y-%m-%d %H:%M:%S'),
                 'originalFilename': filename,
-                'uploadFolder': upload_folder
-            })
-            MetadataHandler.save_metadata(metadata, upload_folder, filename)
-            current_app.logger.info("Initial metadata created")
-
-            # 2. Calculate original hash and verify
-            current_app.logger.info(f"Calculating hash for file: {filepath}")
-            original_hash = metadata['originalFileHash']  # From chunked upload
-            file_size = os.path.getsize(filepath)
-
-            # 3. Update metadata with file details
-            metadata.update({
-                'fileSize': file_size,
-                'originalFileHash': original_hash,
+                'uploadFolder': upload_folder,
+                'fileSize': os.path.getsize(filepath),
                 'timestampVerified': time.strftime('%Y-%m-%d %H:%M:%S')
             })
-            MetadataHandler.save_metadata(metadata, upload_folder, filename)
-            current_app.logger.info("Metadata updated with file details")
 
-            # 4. Verify file integrity
-            current_app.logger.info("Verifying file integrity")
-            new_hash = calculate_file_hash(filepath)
+            # 2. Verify file integrity
+            current_app.logger.info(f"Verifying file integrity: {filepath}")
+            if file_hash:
+                current_app.logger.info(f"Using hash computed during upload: {file_hash}")
+                new_hash = file_hash
+                file_hashes = file_hashes or {PRIMARY_HASH_ALGORITHM: file_hash}
+                # The file is complete and synced, so later verification of it
+                # (after the rename below, too) can use these digests
+                cache = HashCache.from_config()
+                if cache is not None:
+                    cache.put(filepath, file_hashes)
+            else:
+                report('hashing', 0.0)
+                file_hashes = calculate_file_hashes(
+                    filepath, progress_callback=lambda percent: report('hashing', percent)
+                )
+                new_hash = file_hashes[PRIMARY_HASH_ALGORITHM]
+            report('verifying')
             is_verified = new_hash == original_hash
 
-            # 5. Update metadata with verification results
             metadata.update({
                 'newFileHash': new_hash,
+                'fileHashes': file_hashes,
                 'verified': is_verified,
                 'integrityVerified': time.strftime('%Y-%m-%d %H:%M:%S')
             })
-            MetadataHandler.save_metadata(metadata, upload_folder, filename)
             current_app.logger.info(f"File verification completed: {is_verified}")
 
             if not is_verified:
                 raise ValueError("File integrity verification failed - hashes do not match")
 
-            # 6. Handle file rename if requested
-            if metadata.get('rename_file'):
-                new_filename = metadata.get('new_filename')
-                if new_filename:
-                    current_app.logger.info(f"Renaming file to: {new_filename}")
-                    new_filepath = os.path.join(upload_folder, new_filename)
-                    
-                    # Rename both file and metadata
-                    if cls.safe_rename(filepath, new_filepath):
-                        old_meta = os.path.join(upload_folder, f"{filename}_metadata.json")
-                        new_meta = os.path.join(upload_folder, f"{new_filename}_metadata.json")
-                        cls.safe_rename(old_meta, new_meta)
-                        
-                        filepath = new_filepath
-                        filename = new_filename
-                        metadata.update({
-                            'newFilename': new_filename,
-                            'currentFilename': new_filename
-                        })
-                        MetadataHandler.save_metadata(metadata, upload_folder, filename)
-                        current_app.logger.info("File rename completed")
-                    else:
-                        raise OSError(f"Failed to rename file to {new_filename}")
-
-            # 7. Add _complete suffix
-            base_name, ext = os.path.splitext(filename)
-            if not base_name.endswith('_complete'):
-                complete_filename = f"{base_name}_complete{ext}"
-                complete_filepath = os.path.join(upload_folder, complete_filename)
-                
-                current_app.logger.info(f"Adding completion suffix: {complete_filename}")
-                
-                if cls.safe_rename(filepath, complete_filepath):
-                    # Rename metadata file
-                    old_meta = os.path.join(upload_folder, f"{filename}_metadata.json")
-                    new_meta = os.path.join(upload_folder, f"{complete_filename}_metadata.json")
-                    cls.safe_rename(old_meta, new_meta)
-                    
-                    filepath = complete_filepath
-                    filename = complete_filename
-                    metadata.update({
-                        'final_filename': complete_filename,
-                        'currentFilename': complete_filename
-                    })
-                    MetadataHandler.save_metadata(metadata, upload_folder, filename)
-                    current_app.logger.info("Completion suffix added")
-                else:
-                    raise OSError(f"Failed to add completion suffix")
-
-            # 8. Final metadata update
-            metadata.update({
-                'processingCompleted': True,
-                'completedAt': time.strftime('%Y-%m-%d %H:%M:%S')
-            })
-            MetadataHandler.save_metadata(metadata, upload_folder, filename)
+            # 3. Commit: one rename to the final name (custom name and _complete
+            # suffix at once) and one atomic metadata write, journaled so a crash
+            # in between is finished on the next start
+            report('renaming')
+            plan = FinalizationJournal.plan(filepath, upload_folder, filename, metadata)
+            current_app.logger.info(f"Finalizing as: {plan['target']}")
+            metadata.update(FinalizationJournal.commit(plan))
+            filepath = plan['target']
 
-            # 9. Return final status
+            # 4. Return final status
             return {
                 'status': 'success',
                 'filePath': filepath,
                 'originalFilename': metadata['originalFilename'],
-                'newFilename': filename,
+                'newFilename': metadata['final_filename'],
                 'originalHash': original_hash,
                 'newHash': new_hash,
-                'fileSize': file_size,
+                'fileHashes': file_hashes,
+                'fileSize': metadata['fileSize'],
                 'verified': is_verified,
                 'success': True,
                 'metadata': metadata
@@ -188,6 +136,7 @@ class FileProcessor:
             try:
                 # Update metadata with error
                 metadata.update({
+                    'processingStage': 'failed',
                     'processingError': str(e),
                     'processingCompleted': False,
                     'errorTimestamp': time.strftime('%Y-%m-%d %H:%M:%S')
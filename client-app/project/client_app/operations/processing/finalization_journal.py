@@ -0,0 +1,208 @@
+# project/client_app/operations/processing/finalization_journal.py
+"""Crash-safe commit of a verified upload: one data rename, one metadata write."""
+
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+from flask import current_app
+from ...utils import get_metadata_path
+from ..upload_journal import UploadJournal
+from ..metadata_store import MetadataStore
+
+class FinalizationJournal:
+    """
+    Once an upload has been verified, finalizing it is a small state machine:
+
+    planned    the final file and metadata names are computed once and the whole
+               plan, including the finished metadata, is written to
+               <UPLOAD_FOLDER>/.sessions/<txId>.finalize
+    renamed    the data file is moved to its final name (custom name and
+               _complete suffix together) with a single rename
+    done       the finished metadata replaces the upload's metadata file in one
+               atomic write, the old file is removed if the name changed, and
+               the journal is deleted
+
+    Every step can be repeated, so after a crash recover() replays leftover plans:
+    forward when the data file is still there under either name, back to a
+    failed upload's metadata when it has gone.
+    """
+    SUFFIX = '.finalize'
+
+    PLANNED = 'planned'
+    RENAMED = 'renamed'
+
+    @staticmethod
+    def final_filename(filename: str, metadata: Dict[str, Any]) -> str:
+        """The finished file's name: the custom name if one was asked for, with _complete."""
+        if metadata.get('rename_file') and metadata.get('new_filename'):
+            filename = metadata['new_filename']
+        base_name, ext = os.path.splitext(filename)
+        return filename if base_name.endswith('_complete') else f"{base_name}_complete{ext}"
+
+    @staticmethod
+    def metadata_path(upload_folder: str, filename: str) -> str:
+        # Metadata is named after the file without its _complete suffix, as
+        # MetadataHandler.save_metadata and load_metadata expect
+        return get_metadata_path(upload_folder, filename.replace('_complete', ''))
+
+    @classmethod
+    def plan(cls, filepath: str, upload_folder: str, filename: str,
+             metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Everything the commit will do, decided up front."""
+        final_filename = cls.final_filename(filename, metadata)
+        source_metadata = cls.metadata_path(upload_folder, filename)
+
+        # Keep fields other writers added to the metadata file since the upload began
+        finished = {}
+        try:
+            finished, _ = MetadataStore.read(source_metadata)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            current_app.logger.error(f"Error reading existing metadata: {str(e)}")
+        finished.update(metadata)
+        if metadata.get('rename_file') and metadata.get('new_filename'):
+            finished['newFilename'] = metadata['new_filename']
+        finished.update({
+            'final_filename': final_filename,
+            'currentFilename': final_filename,
+            'processingStage': 'done',
+            'processingCompleted': True,
+            'completedAt': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+
+        return {
+            'txId': uuid.uuid4().hex,
+            'state': cls.PLANNED,
+            'source': filepath,
+            'target': os.path.join(upload_folder, final_filename),
+            'sourceMetadata': source_metadata,
+            'targetMetadata': cls.metadata_path(upload_folder, final_filename),
+            'metadata': finished
+        }
+
+    @classmethod
+    def commit(cls, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Journal the plan, carry it out and clear the journal; returns the written metadata."""
+        if os.path.exists(plan['target']) and os.path.exists(plan['source']):
+            raise OSError(f"Destination already exists: {plan['target']}")
+        journal_path = cls._journal_path(current_app.config['UPLOAD_FOLDER'], plan['txId'])
+        cls._write_json(journal_path, plan)
+        cls._apply(plan, journal_path)
+        cls._remove(journal_path)
+        return plan['metadata']
+
+    @classmethod
+    def recover(cls, base_upload_folder: str) -> int:
+        """Finish or roll back every finalization a crash interrupted; returns how many."""
+        journal_dir = UploadJournal.get_journal_dir(base_upload_folder)
+        if not os.path.isdir(journal_dir):
+            return 0
+        recovered = 0
+        for entry in os.scandir(journal_dir):
+            if not (entry.is_file() and entry.name.endswith(cls.SUFFIX)):
+                continue
+            try:
+                with open(entry.path, 'r') as f:
+                    plan = json.load(f)
+            except (OSError, ValueError) as e:
+                # Written atomically, so unreadable means it never held a plan
+                current_app.logger.warning(f"Discarding unreadable finalization journal {entry.path}: {str(e)}")
+                cls._remove(entry.path)
+                continue
+
+            try:
+                if os.path.exists(plan['source']) or os.path.exists(plan['target']):
+                    cls._apply(plan, entry.path)
+                    current_app.logger.info(f"Completed interrupted finalization of {plan['target']}")
+                else:
+                    cls._roll_back(plan)
+                    current_app.logger.warning(f"Rolled back finalization of {plan['source']}: data file is gone")
+                cls._remove(entry.path)
+                recovered += 1
+            except OSError as e:
+                # Left in place for the next start
+                current_app.logger.error(f"Could not recover finalization {entry.path}: {str(e)}")
+        return recovered
+
+    @classmethod
+    def _apply(cls, plan: Dict[str, Any], journal_path: str) -> None:
+        # Each step checks whether it has already happened, so a replay (or two
+        # workers replaying the same journal) converges on the same result
+        if plan['state'] == cls.PLANNED:
+            if os.path.exists(plan['source']):
+                if os.path.exists(plan['target']):
+                    raise OSError(f"Destination already exists: {plan['target']}")
+                os.rename(plan['source'], plan['target'])
+                current_app.logger.info(f"Successfully renamed: {plan['source']} -> {plan['target']}")
+            elif not os.path.exists(plan['target']):
+                raise OSError(f"File not found: {plan['source']}")
+            cls._sync_dir(os.path.dirname(plan['target']))
+            plan['state'] = cls.RENAMED
+            cls._write_json(journal_path, plan)
+
+        MetadataStore.write(plan['targetMetadata'], plan['metadata'])
+        if plan['sourceMetadata'] != plan['targetMetadata']:
+            cls._remove(plan['sourceMetadata'])
+
+    @classmethod
+    def _roll_back(cls, plan: Dict[str, Any]) -> None:
+        metadata = dict(plan['metadata'])
+        metadata.update({
+            'processingStage': 'failed',
+            'processingError': 'Finalization was interrupted and the uploaded file is missing',
+            'processingCompleted': False,
+            'errorTimestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+        for key in ('final_filename', 'currentFilename', 'completedAt'):
+            metadata.pop(key, None)
+        MetadataStore.write(plan['sourceMetadata'], metadata)
+
+    @staticmethod
+    def _journal_path(base_upload_folder: str, tx_id: str) -> str:
+        return os.path.join(UploadJournal.get_journal_dir(base_upload_folder),
+                            f"{tx_id}{FinalizationJournal.SUFFIX}")
+
+    @classmethod
+    def _write_json(cls, path: str, data: Dict[str, Any]) -> None:
+        """Replace path with data in one step: readers see the old file or the new one."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp.{uuid.uuid4().hex}"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            cls._remove(temp_path)
+            raise
+        cls._sync_dir(os.path.dirname(path))
+
+    @staticmethod
+    def _sync_dir(directory: str) -> None:
+        # Makes a rename durable; directories can't be opened for fsync on Windows
+        if os.name == 'nt':
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,251 @@
+# project/client_app/operations/processing/finalization_queue.py
+"""Bounded background pool that finalizes completed uploads off the request thread."""
+
+import json
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+from flask import current_app
+from ..upload_journal import UploadJournal
+
+class FinalizationQueue:
+    """
+    Finalizing a large upload (hashing what the request threads could not, the
+    integrity check, metadata and renames) takes too long for one HTTP request.
+    The request that completes a file submits a job here and returns at once.
+
+    At most FINALIZE_WORKERS jobs run at a time per worker process, which bounds
+    how many multi-GB files are read back concurrently; the rest wait in order.
+    FINALIZE_WORKERS = 0 finalizes inline in the request, as before.
+
+    Each job is mirrored to <UPLOAD_FOLDER>/.sessions/<jobId>.job, so any worker
+    can answer a status poll, not just the one running the job. The file names
+    the process running the job; once that process is gone an unfinished job
+    reads as failed, and FileOperations.restore_sessions starts it again.
+    """
+    SUFFIX = '.job'
+    ACCEPTED = 'Finalizing'
+    INTERRUPTED = 'Finalization was interrupted before it finished'
+
+    QUEUED = 'queued'
+    SYNCING = 'syncing'
+    HASHING = 'hashing'
+    VERIFYING = 'verifying'
+    RENAMING = 'renaming'
+    DONE = 'done'
+    FAILED = 'failed'
+    FINISHED = (DONE, FAILED)
+
+    # Progress ticks rewrite the job file at most this often; stage changes always do
+    PERSIST_INTERVAL = 1.0
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _jobs: Dict[str, Dict[str, Any]] = {}
+    _persisted_at: Dict[str, float] = {}
+    _lock = Lock()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return current_app.config.get('FINALIZE_WORKERS', 2) > 0
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        # Created lazily so each forked worker process gets its own threads
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('FINALIZE_WORKERS', 2),
+                    thread_name_prefix='finalize'
+                )
+            return cls._executor
+
+    @staticmethod
+    def owner() -> str:
+        """This worker process, as recorded on the jobs and sessions it finalizes."""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def owner_alive(owner: Optional[str]) -> bool:
+        """
+        False once the process that claimed a finalization has exited. Processes
+        on other hosts can't be checked and count as alive until prune drops
+        their jobs.
+        """
+        if not owner:
+            return False
+        host, _, pid = owner.rpartition(':')
+        if host != socket.gethostname():
+            return True
+        try:
+            pid = int(pid)
+        except ValueError:
+            return False
+        return pid == os.getpid() or _process_exists(pid)
+
+    @classmethod
+    def is_orphaned(cls, job: Dict[str, Any]) -> bool:
+        """An unfinished job whose process has gone, e.g. in a crash or restart."""
+        return job['stage'] not in cls.FINISHED and not cls.owner_alive(job.get('owner'))
+
+    @staticmethod
+    def _job_path(base_upload_folder: str, job_id: str) -> str:
+        return os.path.join(UploadJournal.get_journal_dir(base_upload_folder),
+                            f"{job_id}{FinalizationQueue.SUFFIX}")
+
+    @classmethod
+    def submit(cls, job_id: str, description: Dict[str, Any],
+               work: Callable[[Callable[..., None]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Queue work(report) and return the job's initial status. work receives a
+        report(stage, progress=None) callback and returns the processing result;
+        a result without success=True, or an exception, fails the job.
+        """
+        app = current_app._get_current_object()
+        base_upload_folder = app.config['UPLOAD_FOLDER']
+        now = time.time()
+        job = dict(description, jobId=job_id, stage=cls.QUEUED, progress=None,
+                   result=None, error=None, owner=cls.owner(), queuedAt=now, updatedAt=now)
+        with cls._lock:
+            cls._jobs[job_id] = job
+        cls._persist(base_upload_folder, job)
+
+        def run():
+            with app.app_context():
+                report = lambda stage, progress=None: cls.update(job_id, stage, progress)
+                try:
+                    result = work(report)
+                    cls.update(job_id, cls.DONE if result.get('success') else cls.FAILED, 100.0,
+                               result=result, error=result.get('error'))
+                except Exception as e:
+                    app.logger.error(f"Finalization job {job_id} failed: {str(e)}")
+                    cls.update(job_id, cls.FAILED, error=str(e))
+
+        cls._get_executor().submit(run)
+        current_app.logger.info(f"Queued finalization job {job_id}")
+        return cls.snapshot(job)
+
+    @classmethod
+    def update(cls, job_id: str, stage: str, progress: Optional[float] = None, **fields) -> None:
+        """Record a job's stage and, for hashing, its percentage."""
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+            if job is None:
+                return
+            stage_changed = job['stage'] != stage
+            job.update(fields, stage=stage, progress=progress, updatedAt=time.time())
+            due = time.monotonic() - cls._persisted_at.get(job_id, 0) >= cls.PERSIST_INTERVAL
+            snapshot = dict(job)
+        if stage_changed or fields or due:
+            cls._persist(current_app.config['UPLOAD_FOLDER'], snapshot)
+        if stage in cls.FINISHED:
+            # Later polls are answered from the job file
+            with cls._lock:
+                cls._jobs.pop(job_id, None)
+                cls._persisted_at.pop(job_id, None)
+
+    @classmethod
+    def _persist(cls, base_upload_folder: str, job: Dict[str, Any]) -> None:
+        path = cls._job_path(base_upload_folder, job['jobId'])
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.tmp.{os.getpid()}"
+            with open(temp_path, 'w') as f:
+                json.dump(job, f)
+            os.replace(temp_path, path)
+            with cls._lock:
+                if job['jobId'] in cls._jobs:
+                    cls._persisted_at[job['jobId']] = time.monotonic()
+        except OSError as e:
+            # Only polls from other workers depend on the file
+            current_app.logger.warning(f"Could not save finalization job {job['jobId']}: {str(e)}")
+
+    @classmethod
+    def get(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current status of a job, from this process if it runs here, else from its file."""
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+            if job is not None:
+                return cls.snapshot(job)
+        try:
+            with open(cls._job_path(current_app.config['UPLOAD_FOLDER'], job_id), 'r') as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cls.is_orphaned(job):
+            # Nobody will ever finish it; resending the last range starts it again
+            job = dict(job, stage=cls.FAILED, error=cls.INTERRUPTED)
+        return cls.snapshot(job)
+
+    @classmethod
+    def orphaned(cls, base_upload_folder: str) -> List[Dict[str, Any]]:
+        """Every job left unfinished by a process that is no longer running."""
+        job_dir = UploadJournal.get_journal_dir(base_upload_folder)
+        if not os.path.isdir(job_dir):
+            return []
+        jobs = []
+        for entry in os.scandir(job_dir):
+            if entry.is_file() and entry.name.endswith(cls.SUFFIX):
+                try:
+                    with open(entry.path, 'r') as f:
+                        job = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if cls.is_orphaned(job):
+                    jobs.append(job)
+        return jobs
+
+    @classmethod
+    def fail_orphaned(cls, base_upload_folder: str, job: Dict[str, Any]) -> None:
+        """Record an orphaned job as failed, so its file no longer reads as running."""
+        cls._persist(base_upload_folder, dict(job, stage=cls.FAILED, error=cls.INTERRUPTED,
+                                              updatedAt=time.time()))
+
+    @classmethod
+    def snapshot(cls, job: Dict[str, Any]) -> Dict[str, Any]:
+        status = dict(job)
+        status['status'] = job['stage'] if job['stage'] in cls.FINISHED else cls.ACCEPTED
+        status['statusUrl'] = f"/upload/jobs/{job['jobId']}"
+        return status
+
+    @classmethod
+    def prune(cls, base_upload_folder: str, max_age: float) -> None:
+        """Drop job files nobody has updated for max_age seconds."""
+        job_dir = UploadJournal.get_journal_dir(base_upload_folder)
+        if not os.path.isdir(job_dir):
+            return
+        cutoff = time.time() - max_age
+        for entry in os.scandir(job_dir):
+            if entry.is_file() and entry.name.endswith(cls.SUFFIX):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+def _process_exists(pid: int) -> bool:
+    if os.name == 'nt':
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows; ask for a handle instead
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
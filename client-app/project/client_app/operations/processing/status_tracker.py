@@ -1,14 +1,36 @@
 # project/client_app/operations/processing/status_tracker.py
 """File processing status tracking."""
 
+from typing import Optional
 from flask import current_app
 from ..metadata_handler import MetadataHandler
+from .finalization_queue import FinalizationQueue
 
 class ProcessingStatusTracker:
     @classmethod
-    def get_processing_status(cls, upload_folder: str, filename: str) -> dict:
-        """Get current processing status from metadata."""
+    def get_job_status(cls, job_id: str) -> Optional[dict]:
+        """Get the stage of a finalization job, or None if there is no such job."""
+        return FinalizationQueue.get(job_id)
+
+    @classmethod
+    def get_processing_status(cls, upload_folder: str, filename: str,
+                              job_id: Optional[str] = None) -> dict:
+        """
+        Get current processing status from metadata. With job_id, a job that is
+        still queued or running reports its live stage and hashing progress.
+        """
         try:
+            job = cls.get_job_status(job_id) if job_id else None
+            if job and job['stage'] not in FinalizationQueue.FINISHED:
+                return {
+                    'completed': False,
+                    'error': None,
+                    'stage': job['stage'],
+                    'progress': job['progress'],
+                    'jobId': job_id,
+                    'status': 'processing'
+                }
+
             metadata = MetadataHandler.load_metadata(upload_folder, filename)
             return {
                 'completed': metadata.get('processingCompleted', False),
@@ -17,6 +39,7 @@ class ProcessingStatusTracker:
                 'originalHash': metadata.get('originalFileHash'),
                 'newHash': metadata.get('fileHash'),
                 'finalFilename': metadata.get('final_filename'),
+                'stage': metadata.get('processingStage'),
                 'status': 'error' if metadata.get('processingError') else 
                          'completed' if metadata.get('processingCompleted') else 
                          'processing'
@@ -0,0 +1,494 @@
+# project/client_app/operations/session_store.py
+"""Pluggable storage for upload session state, shared between worker processes."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app
+from .durability import Durability
+from .upload_journal import UploadJournal
+from .upload_ranges import ReceivedRanges
+
+class SessionStore:
+    """
+    Upload session state: the session header, the merged byte ranges received so
+    far and the digest of every acknowledged chunk. Every update that a concurrent
+    request could race on (recording a range, claiming finalization) is atomic
+    inside the store, so requests for one upload may land on any worker.
+
+    get() returns a snapshot dict: the header fields plus 'received'
+    (ReceivedRanges), 'last_chunk_time', 'finalizing' and 'finalizer' (the
+    process that claimed finalization, see FinalizationQueue.owner).
+
+    The store also tracks the server-side hash passes, keyed by hash id: which
+    chunk comes next and how many bytes came before it. They are not upload
+    sessions and list_sessions() leaves them out.
+    """
+    # True when other processes see the same sessions
+    shared = False
+
+    _instances: Dict[Tuple[str, str], 'SessionStore'] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'SessionStore':
+        """The store selected by SESSION_STORE for the configured upload folder."""
+        backend = current_app.config.get('SESSION_STORE', 'memory')
+        base_upload_folder = current_app.config.get('UPLOAD_FOLDER')
+        if not base_upload_folder:
+            raise ValueError("UPLOAD_FOLDER not set in configuration")
+
+        key = (backend, base_upload_folder)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                if backend == 'memory':
+                    store = MemorySessionStore(base_upload_folder)
+                elif backend == 'sqlite':
+                    db_path = current_app.config.get('SESSION_DB_PATH') or os.path.join(
+                        UploadJournal.get_journal_dir(base_upload_folder), 'sessions.db'
+                    )
+                    store = SqliteSessionStore(db_path)
+                else:
+                    raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
+                cls._instances[key] = store
+            return store
+
+    def create(self, upload_id: str, header: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def record_range(self, upload_id: str, start: int, end: int,
+                     algorithm: str, digest: str) -> ReceivedRanges:
+        """Add a verified range and return the merged ranges after the update."""
+        raise NotImplementedError
+
+    def claim_finalize(self, upload_id: str, owner: Optional[str] = None) -> bool:
+        """True for exactly one caller once every byte has been received."""
+        raise NotImplementedError
+
+    def release_finalize(self, upload_id: str, owner: Optional[str]) -> bool:
+        """Give up a claim held by owner, e.g. a process that died; False if someone else holds it."""
+        raise NotImplementedError
+
+    def chunks(self, upload_id: str) -> Dict[int, Tuple[int, str, str]]:
+        """offset -> (size, checksum algorithm, digest) of every acknowledged chunk."""
+        raise NotImplementedError
+
+    def remove(self, upload_id: str) -> None:
+        raise NotImplementedError
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def restore(self) -> int:
+        """Reload sessions left over from a previous run; returns how many are live."""
+        raise NotImplementedError
+
+    def create_calculation(self, hash_id: str, header: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def get_calculation(self, hash_id: str) -> Optional[Dict[str, Any]]:
+        """The header fields plus 'next_chunk', 'bytes_hashed' and 'last_used'."""
+        raise NotImplementedError
+
+    def advance_calculation(self, hash_id: str, chunk: int, size: int) -> bool:
+        """Count chunk as hashed; False if it no longer is the next chunk."""
+        raise NotImplementedError
+
+    def remove_calculation(self, hash_id: str) -> bool:
+        """True for exactly one caller if the calculation existed."""
+        raise NotImplementedError
+
+    def idle_calculations(self, cutoff: float) -> List[str]:
+        """Hash ids of calculations last used before cutoff."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _syncs_per_chunk(header: Dict[str, Any]) -> bool:
+        return header.get('durability', Durability.PER_CHUNK) == Durability.PER_CHUNK
+
+    @staticmethod
+    def _is_intact(header: Dict[str, Any]) -> bool:
+        """A session can only resume if its preallocated data file is still there."""
+        filepath = header.get('filepath')
+        if not filepath:
+            return True
+        try:
+            return os.path.getsize(filepath) == header['file_size']
+        except OSError:
+            return False
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Sessions held in this process, with the on-disk journal for crash recovery.
+    Only correct when every request reaches the same process (a single worker).
+    """
+
+    def __init__(self, base_upload_folder: str):
+        self.base_upload_folder = base_upload_folder
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._calculations: Dict[str, Dict[str, Any]] = {}
+
+    def _new_entry(self, header: Dict[str, Any], journal: UploadJournal) -> Dict[str, Any]:
+        return {
+            'header': header,
+            'received': ReceivedRanges(),
+            'chunks': {},
+            'journal': journal,
+            'last_chunk_time': time.time(),
+            'finalizing': False,
+            'finalizer': None
+        }
+
+    def create(self, upload_id: str, header: Dict[str, Any]) -> None:
+        journal = UploadJournal.for_session(
+            self.base_upload_folder, upload_id, sync_appends=self._syncs_per_chunk(header)
+        )
+        journal.create(header)
+        with self._lock:
+            previous = self._sessions.get(upload_id)
+            self._sessions[upload_id] = self._new_entry(header, journal)
+        if previous is not None:
+            previous['journal'].close()
+
+    def _snapshot(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(entry['header'],
+                    received=ReceivedRanges(entry['received'].to_list()),
+                    last_chunk_time=entry['last_chunk_time'],
+                    finalizing=entry['finalizing'],
+                    finalizer=entry['finalizer'])
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(upload_id)
+            return self._snapshot(entry) if entry is not None else None
+
+    def record_range(self, upload_id: str, start: int, end: int,
+                     algorithm: str, digest: str) -> ReceivedRanges:
+        with self._lock:
+            entry = self._sessions.get(upload_id)
+            if entry is None:
+                raise ValueError("Upload not properly initialized")
+            entry['received'].add(start, end)
+            if end > start:
+                entry['chunks'][start] = (end - start, algorithm, digest)
+            entry['last_chunk_time'] = time.time()
+            received = ReceivedRanges(entry['received'].to_list())
+
+        # The data is on disk; journal the range so a restart can resume here
+        if end > start:
+            entry['journal'].append_range(start, end, algorithm, digest)
+        return received
+
+    def claim_finalize(self, upload_id: str, owner: Optional[str] = None) -> bool:
+        with self._lock:
+            entry = self._sessions.get(upload_id)
+            if entry is None or entry['finalizing']:
+                return False
+            if not entry['received'].is_complete(entry['header']['file_size']):
+                return False
+            entry['finalizing'] = True
+            entry['finalizer'] = owner
+            return True
+
+    def release_finalize(self, upload_id: str, owner: Optional[str]) -> bool:
+        with self._lock:
+            entry = self._sessions.get(upload_id)
+            if entry is None or not entry['finalizing'] or entry['finalizer'] != owner:
+                return False
+            entry['finalizing'] = False
+            entry['finalizer'] = None
+            return True
+
+    def chunks(self, upload_id: str) -> Dict[int, Tuple[int, str, str]]:
+        with self._lock:
+            entry = self._sessions.get(upload_id)
+            return dict(entry['chunks']) if entry is not None else {}
+
+    def remove(self, upload_id: str) -> None:
+        with self._lock:
+            entry = self._sessions.pop(upload_id, None)
+        if entry is not None:
+            entry['journal'].remove()
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._snapshot(entry) for entry in self._sessions.values()]
+
+    def restore(self) -> int:
+        """Replay the journals; the MD5 of a restored upload is rebuilt from disk later."""
+        restored = 0
+        for journal in UploadJournal.load_all(self.base_upload_folder):
+            try:
+                header, records = journal.read()
+                if not header or not self._is_intact(header):
+                    raise ValueError("journal header missing or data file changed")
+                journal.sync_appends = self._syncs_per_chunk(header)
+
+                entry = self._new_entry(header, journal)
+                # Every append touches the journal, so its mtime is the last chunk's time
+                entry['last_chunk_time'] = os.path.getmtime(journal.path)
+                for start, end, algorithm, digest in records:
+                    entry['received'].add(start, end)
+                    entry['chunks'][start] = (end - start, algorithm, digest)
+
+                with self._lock:
+                    self._sessions[header['upload_id']] = entry
+                restored += 1
+            except (OSError, ValueError, KeyError) as e:
+                current_app.logger.warning(f"Discarding upload journal {journal.path}: {str(e)}")
+                journal.remove()
+        return restored
+
+    def create_calculation(self, hash_id: str, header: Dict[str, Any]) -> None:
+        with self._lock:
+            self._calculations[hash_id] = dict(header, next_chunk=0, bytes_hashed=0, last_used=time.time())
+
+    def get_calculation(self, hash_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            calculation = self._calculations.get(hash_id)
+            return dict(calculation) if calculation is not None else None
+
+    def advance_calculation(self, hash_id: str, chunk: int, size: int) -> bool:
+        with self._lock:
+            calculation = self._calculations.get(hash_id)
+            if calculation is None or calculation['next_chunk'] != chunk:
+                return False
+            calculation['next_chunk'] += 1
+            calculation['bytes_hashed'] += size
+            calculation['last_used'] = time.time()
+            return True
+
+    def remove_calculation(self, hash_id: str) -> bool:
+        with self._lock:
+            return self._calculations.pop(hash_id, None) is not None
+
+    def idle_calculations(self, cutoff: float) -> List[str]:
+        with self._lock:
+            return [hash_id for hash_id, calculation in self._calculations.items()
+                    if calculation['last_used'] < cutoff]
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Sessions in a local SQLite database (WAL mode), so any number of worker
+    processes on the host share them. Range updates run in an IMMEDIATE
+    transaction, which serializes the read-merge-write of the received ranges.
+    """
+    shared = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS upload_sessions (
+            upload_id TEXT PRIMARY KEY,
+            header TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            received TEXT NOT NULL DEFAULT '[]',
+            last_chunk_time REAL NOT NULL,
+            finalizing INTEGER NOT NULL DEFAULT 0,
+            finalizer TEXT
+        );
+        CREATE TABLE IF NOT EXISTS upload_chunks (
+            upload_id TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            algorithm TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            PRIMARY KEY (upload_id, offset)
+        );
+        CREATE TABLE IF NOT EXISTS hash_calculations (
+            hash_id TEXT PRIMARY KEY,
+            header TEXT NOT NULL,
+            next_chunk INTEGER NOT NULL DEFAULT 0,
+            bytes_hashed INTEGER NOT NULL DEFAULT 0,
+            last_used REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+        with self._transaction() as conn:
+            # Databases created before finalization claims recorded their owner
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(upload_sessions)')]
+            if 'finalizer' not in columns:
+                conn.execute('ALTER TABLE upload_sessions ADD COLUMN finalizer TEXT')
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, reopened after a fork (gunicorn workers)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connect())
+
+    def create(self, upload_id: str, header: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM upload_chunks WHERE upload_id = ?', (upload_id,))
+            conn.execute(
+                'INSERT OR REPLACE INTO upload_sessions (upload_id, header, file_size, last_chunk_time) '
+                'VALUES (?, ?, ?, ?)',
+                (upload_id, json.dumps(header), header['file_size'], time.time())
+            )
+
+    def _snapshot(self, row) -> Dict[str, Any]:
+        header, received, last_chunk_time, finalizing, finalizer = row
+        return dict(json.loads(header),
+                    received=ReceivedRanges(json.loads(received)),
+                    last_chunk_time=last_chunk_time,
+                    finalizing=bool(finalizing),
+                    finalizer=finalizer)
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            'SELECT header, received, last_chunk_time, finalizing, finalizer '
+            'FROM upload_sessions WHERE upload_id = ?',
+            (upload_id,)
+        ).fetchone()
+        return self._snapshot(row) if row is not None else None
+
+    def record_range(self, upload_id: str, start: int, end: int,
+                     algorithm: str, digest: str) -> ReceivedRanges:
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT received FROM upload_sessions WHERE upload_id = ?', (upload_id,)
+            ).fetchone()
+            if row is None:
+                raise ValueError("Upload not properly initialized")
+            received = ReceivedRanges(json.loads(row[0]))
+            received.add(start, end)
+            conn.execute(
+                'UPDATE upload_sessions SET received = ?, last_chunk_time = ? WHERE upload_id = ?',
+                (json.dumps(received.to_list()), time.time(), upload_id)
+            )
+            if end > start:
+                conn.execute(
+                    'INSERT OR REPLACE INTO upload_chunks (upload_id, offset, size, algorithm, digest) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (upload_id, start, end - start, algorithm, digest)
+                )
+        return received
+
+    def claim_finalize(self, upload_id: str, owner: Optional[str] = None) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT received, file_size, finalizing FROM upload_sessions WHERE upload_id = ?',
+                (upload_id,)
+            ).fetchone()
+            if row is None or row[2]:
+                return False
+            if not ReceivedRanges(json.loads(row[0])).is_complete(row[1]):
+                return False
+            conn.execute(
+                'UPDATE upload_sessions SET finalizing = 1, finalizer = ? WHERE upload_id = ?',
+                (owner, upload_id)
+            )
+            return True
+
+    def release_finalize(self, upload_id: str, owner: Optional[str]) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE upload_sessions SET finalizing = 0, finalizer = NULL '
+                'WHERE upload_id = ? AND finalizing = 1 AND finalizer IS ?',
+                (upload_id, owner)
+            )
+            return cursor.rowcount == 1
+
+    def chunks(self, upload_id: str) -> Dict[int, Tuple[int, str, str]]:
+        rows = self._connect().execute(
+            'SELECT offset, size, algorithm, digest FROM upload_chunks WHERE upload_id = ?',
+            (upload_id,)
+        )
+        return {offset: (size, algorithm, digest) for offset, size, algorithm, digest in rows}
+
+    def remove(self, upload_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM upload_chunks WHERE upload_id = ?', (upload_id,))
+            conn.execute('DELETE FROM upload_sessions WHERE upload_id = ?', (upload_id,))
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            'SELECT header, received, last_chunk_time, finalizing, finalizer FROM upload_sessions'
+        ).fetchall()
+        return [self._snapshot(row) for row in rows]
+
+    def restore(self) -> int:
+        """
+        Sessions are already durable here; just drop the ones whose data file is
+        gone. Every worker runs this at startup, so it must not touch live state.
+        """
+        live = 0
+        for session in self.list_sessions():
+            if not self._is_intact(session):
+                current_app.logger.warning(f"Discarding upload session {session['upload_id']}: data file changed")
+                self.remove(session['upload_id'])
+                continue
+            live += 1
+        return live
+
+    def create_calculation(self, hash_id: str, header: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO hash_calculations (hash_id, header, last_used) VALUES (?, ?, ?)',
+                (hash_id, json.dumps(header), time.time())
+            )
+
+    def get_calculation(self, hash_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            'SELECT header, next_chunk, bytes_hashed, last_used FROM hash_calculations WHERE hash_id = ?',
+            (hash_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        header, next_chunk, bytes_hashed, last_used = row
+        return dict(json.loads(header), next_chunk=next_chunk, bytes_hashed=bytes_hashed, last_used=last_used)
+
+    def advance_calculation(self, hash_id: str, chunk: int, size: int) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE hash_calculations SET next_chunk = next_chunk + 1, bytes_hashed = bytes_hashed + ?, '
+                'last_used = ? WHERE hash_id = ? AND next_chunk = ?',
+                (size, time.time(), hash_id, chunk)
+            )
+            return cursor.rowcount == 1
+
+    def remove_calculation(self, hash_id: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute('DELETE FROM hash_calculations WHERE hash_id = ?', (hash_id,))
+            return cursor.rowcount == 1
+
+    def idle_calculations(self, cutoff: float) -> List[str]:
+        rows = self._connect().execute(
+            'SELECT hash_id FROM hash_calculations WHERE last_used < ?', (cutoff,)
+        )
+        return [hash_id for hash_id, in rows]
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
@@ -0,0 +1,643 @@
+# project/client_app/operations/upload_catalog.py
+"""SQLite index of the upload folders, so listings and lookups don't rescan the share."""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import current_app
+from .change_feed import ChangeFeed, FolderWatcher
+from .chunk_manifest import ChunkManifest
+from .folder_crawler import FolderCrawler
+from .metadata_store import MetadataStore
+from .session_store import _ImmediateTransaction
+from .upload_journal import UploadJournal
+
+class UploadCatalog:
+    """
+    One row per upload folder under UPLOAD_FOLDER: its metadata file, filenames,
+    the fields the history views show, size, status, digests and the parsed
+    chunk inventory. Listing uploads, finding one by filename or upload id and
+    reading its status are index queries instead of directory walks.
+
+    The client's own write paths record a folder as soon as they change it.
+    Everything else (the admin portal, the external inventory tool, folders
+    moved by hand) arrives through the ChangeFeed, whose events re-read just
+    the folders concerned. Without a feed, reconcile() at most every
+    CATALOG_REFRESH_SECONDS lists UPLOAD_FOLDER once and re-reads only folders
+    whose modification time moved. Atomic metadata writes, new inventory files
+    and renames all touch the folder's mtime. The catalog is only an index:
+    deleting the database (or rebuild()) recreates it from disk.
+
+    Every change to the index bumps a generation counter, which together with
+    the database's epoch (new on every rebuild from scratch) versions the
+    listings for conditional GETs.
+
+    Where SQLite has FTS5, uploads_fts indexes the folder name and every
+    metadata value under the uploads rowid, so q searches are an index
+    lookup rather than a scan; without it q falls back to a LIKE.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS uploads (
+            folder TEXT PRIMARY KEY,
+            folder_mtime_ns INTEGER NOT NULL,
+            metadata_file TEXT,
+            upload_id TEXT,
+            original_filename TEXT,
+            new_filename TEXT,
+            final_filename TEXT,
+            operation TEXT,
+            item_number TEXT,
+            sub_number TEXT,
+            date_of_collection TEXT,
+            device_type TEXT,
+            platform TEXT,
+            system TEXT,
+            file_size INTEGER NOT NULL DEFAULT 0,
+            status TEXT,
+            verified INTEGER NOT NULL DEFAULT 0,
+            approved TEXT,
+            file_hashes TEXT,
+            completed_at TEXT,
+            updated_at TEXT,
+            metadata TEXT,
+            inventory_file TEXT
+        );
+        CREATE INDEX IF NOT EXISTS uploads_by_mtime ON uploads (folder_mtime_ns);
+        CREATE INDEX IF NOT EXISTS uploads_by_upload_id ON uploads (upload_id);
+        CREATE INDEX IF NOT EXISTS uploads_by_metadata_file ON uploads (metadata_file);
+        CREATE INDEX IF NOT EXISTS uploads_by_final_filename ON uploads (final_filename);
+        CREATE INDEX IF NOT EXISTS uploads_by_date ON uploads (date_of_collection);
+        CREATE INDEX IF NOT EXISTS uploads_by_operation ON uploads (operation COLLATE NOCASE, metadata_file);
+        CREATE INDEX IF NOT EXISTS uploads_by_device_type ON uploads (device_type, metadata_file);
+        CREATE INDEX IF NOT EXISTS uploads_by_platform ON uploads (platform, metadata_file);
+        CREATE INDEX IF NOT EXISTS uploads_by_system ON uploads (system, metadata_file);
+        CREATE INDEX IF NOT EXISTS uploads_by_approved ON uploads (COALESCE(approved, 'No'), metadata_file);
+        CREATE TABLE IF NOT EXISTS upload_inventories (
+            folder TEXT PRIMARY KEY,
+            inventory_file TEXT NOT NULL,
+            file_key TEXT NOT NULL,
+            chunks TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS catalog_info (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS catalog_state (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            epoch TEXT NOT NULL,
+            generation INTEGER NOT NULL,
+            changed_at REAL NOT NULL
+        );
+    """
+
+    # Bump when the schema changes: the catalog is rebuilt from disk, not migrated
+    SCHEMA_VERSION = 4
+
+    # Prefix indexes make the "term*" queries search() builds cheap for short terms
+    FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS uploads_fts USING fts5(body, prefix='2 3')"
+
+    COLUMNS = ('folder', 'folder_mtime_ns', 'metadata_file', 'upload_id', 'original_filename',
+               'new_filename', 'final_filename', 'operation', 'item_number', 'sub_number', 'date_of_collection',
+               'device_type', 'platform', 'system', 'file_size', 'status', 'verified', 'approved', 'file_hashes',
+               'completed_at', 'updated_at', 'metadata', 'inventory_file')
+
+    # Listing sort keys; NULLs sort as empty so keyset pagination can compare them
+    SORTS = {
+        'modified': 'folder_mtime_ns',
+        'date': "COALESCE(date_of_collection, '')",
+        'operation': "COALESCE(operation, '')",
+        'item': "COALESCE(item_number, '')",
+        'filename': "COALESCE(original_filename, '')",
+        'size': 'file_size'
+    }
+
+    # Facet name -> column; approval is counted with missing values as 'No'. The
+    # facet indexes carry metadata_file so counts never touch the table rows.
+    # The admin portal sees these as the columns of the upload_facets view
+    FACETS = {
+        'operation': 'operation COLLATE NOCASE',
+        'device_type': 'device_type',
+        'platform': 'platform',
+        'system': 'system',
+        'approved': "COALESCE(approved, 'No')"
+    }
+    FACET_LIMIT = 50
+
+    # What the admin portal's searches rely on: upload_facets (id, folder, then
+    # one column per facet) and uploads_fts keyed by the uploads rowid. Bump it
+    # when either changes shape; the admin refuses to search another version
+    SEARCH_API = 1
+
+    # Upload states derived from metadata
+    UPLOADING = 'uploading'
+    PROCESSING = 'processing'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+
+    _instances: Dict[str, 'UploadCatalog'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path: str, base_upload_folder: str):
+        self.db_path = db_path
+        self.base_upload_folder = base_upload_folder
+        self._local = threading.local()
+        self._reconcile_lock = threading.Lock()
+        self._reconciled_at: Optional[float] = None
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._connect()
+        if conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+            conn.executescript('DROP TABLE IF EXISTS uploads; DROP TABLE IF EXISTS upload_inventories; '
+                               'DROP TABLE IF EXISTS catalog_state; DROP TABLE IF EXISTS uploads_fts; '
+                               'DROP TABLE IF EXISTS catalog_info; DROP VIEW IF EXISTS upload_facets;')
+            conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        conn.executescript(self.SCHEMA)
+        try:
+            conn.execute(self.FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5
+            self.fts = False
+        conn.execute('INSERT OR IGNORE INTO catalog_state (id, epoch, generation, changed_at) VALUES (0, ?, 0, ?)',
+                     (uuid.uuid4().hex, time.time()))
+        self._publish_search(conn)
+
+    def _publish_search(self, conn: sqlite3.Connection) -> None:
+        """
+        Recreate upload_facets from FACETS and record SEARCH_API (0 without
+        FTS5), so the admin portal reads the facets from here instead of
+        keeping its own copy.
+        """
+        columns = ', '.join(f"{column} AS {facet}" for facet, column in self.FACETS.items())
+        with _ImmediateTransaction(conn):
+            conn.execute('DROP VIEW IF EXISTS upload_facets')
+            conn.execute(f"CREATE VIEW upload_facets AS SELECT rowid AS id, folder, {columns} "
+                         f"FROM uploads WHERE metadata_file IS NOT NULL")
+            conn.execute("INSERT OR REPLACE INTO catalog_info (key, value) VALUES ('search_api', ?)",
+                         (str(self.SEARCH_API if self.fts else 0),))
+
+    @classmethod
+    def from_config(cls) -> 'UploadCatalog':
+        """The catalog of the configured upload folder (CATALOG_DB_PATH, default .sessions/catalog.db)."""
+        base_upload_folder = current_app.config.get('UPLOAD_FOLDER')
+        if not base_upload_folder:
+            raise ValueError("UPLOAD_FOLDER not set in configuration")
+        db_path = current_app.config.get('CATALOG_DB_PATH') or os.path.join(
+            UploadJournal.get_journal_dir(base_upload_folder), 'catalog.db'
+        )
+        with cls._instances_lock:
+            catalog = cls._instances.get(db_path)
+            if catalog is None:
+                catalog = cls._instances[db_path] = cls(db_path, base_upload_folder)
+            return catalog
+
+    @classmethod
+    def touch(cls, folder_path: str) -> None:
+        """
+        Re-index one folder after a write path changed it. The catalog is only
+        an index, so a failure here is logged and never fails the caller.
+        """
+        try:
+            cls.from_config().record_folder(folder_path)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            current_app.logger.warning(f"Could not update upload catalog for {folder_path}: {str(e)}")
+
+    @classmethod
+    def locate_metadata(cls, base_upload_folder: str, filename: str) -> Optional[str]:
+        """Path of the metadata file for filename if the catalog knows it, else None."""
+        if os.path.abspath(base_upload_folder) != os.path.abspath(current_app.config.get('UPLOAD_FOLDER') or ''):
+            return None
+        try:
+            row = cls.from_config().find_by_filename(filename)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            current_app.logger.warning(f"Upload catalog lookup failed for {filename}: {str(e)}")
+            return None
+        if row is None:
+            return None
+        metadata_path = os.path.join(base_upload_folder, row['folder'], row['metadata_file'])
+        return metadata_path if os.path.exists(metadata_path) else None
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, reopened after a fork (gunicorn workers)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _folder_name(self, folder_path: str) -> str:
+        return os.path.relpath(os.path.abspath(folder_path), os.path.abspath(self.base_upload_folder))
+
+    @classmethod
+    def status_of(cls, metadata: Dict[str, Any]) -> str:
+        if metadata.get('processingError'):
+            return cls.FAILED
+        if metadata.get('processingCompleted'):
+            return cls.COMPLETE
+        if metadata.get('processingStage'):
+            return cls.PROCESSING
+        return cls.UPLOADING
+
+    def record_folder(self, folder_path: str, folder_mtime_ns: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Read one folder from disk into the catalog; returns its row, or None if the folder is gone."""
+        folder = self._folder_name(folder_path)
+        read = self._read_folder(folder_path, folder_mtime_ns)
+        if read is None:
+            self.remove_folder(folder)
+            return None
+        with _ImmediateTransaction(self._connect()) as conn:
+            self._store(conn, *read)
+        return read[0]
+
+    def _read_folder(self, folder_path: str, folder_mtime_ns: Optional[int] = None):
+        """
+        Everything record_folder needs from disk: (row, inventory), where
+        inventory is as _inventory_row returns it; None if the folder is gone.
+        Only reads, so many folders can be read at once (see reconcile).
+        """
+        folder = self._folder_name(folder_path)
+        try:
+            if folder_mtime_ns is None:
+                folder_mtime_ns = os.stat(folder_path).st_mtime_ns
+            names = sorted(os.listdir(folder_path))
+        except FileNotFoundError:
+            return None
+
+        row = dict.fromkeys(self.COLUMNS)
+        row.update(folder=folder, folder_mtime_ns=folder_mtime_ns, file_size=0, verified=0)
+        # The listing just taken saves the metadata store a second one
+        found = MetadataStore.load_folder(folder_path, listing=(folder_mtime_ns, names))
+        if found:
+            metadata_path, metadata, _ = found
+            row.update(self._metadata_columns(metadata), metadata_file=os.path.basename(metadata_path),
+                       metadata=json.dumps(metadata))
+
+        # Folders may also hold the external tool's inventory; the first one is used
+        inventory_file = next((f for f in names if f.endswith('_inventory.csv')), None)
+        row['inventory_file'] = inventory_file
+        return row, self._inventory_row(folder, folder_path, inventory_file)
+
+    def _store(self, conn: sqlite3.Connection, row: Dict[str, Any], inventory) -> None:
+        """Write a folder read by _read_folder, inside the caller's transaction."""
+        folder = row['folder']
+        stored = conn.execute('SELECT * FROM uploads WHERE folder = ?', (folder,)).fetchone()
+        if stored is not None and dict(stored) == row and inventory in (True, None):
+            # Nothing changed, so the generation (and every ETag) stays put
+            return
+        if self.fts:
+            conn.execute('DELETE FROM uploads_fts WHERE rowid = (SELECT rowid FROM uploads WHERE folder = ?)',
+                         (folder,))
+        cursor = conn.execute(
+            f"INSERT OR REPLACE INTO uploads ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+            [row[column] for column in self.COLUMNS]
+        )
+        if self.fts:
+            conn.execute('INSERT INTO uploads_fts (rowid, body) VALUES (?, ?)',
+                         (cursor.lastrowid, self._search_text(row)))
+        if inventory is None:
+            conn.execute('DELETE FROM upload_inventories WHERE folder = ?', (folder,))
+        elif inventory is not True:
+            conn.execute(
+                'INSERT OR REPLACE INTO upload_inventories (folder, inventory_file, file_key, chunks) '
+                'VALUES (?, ?, ?, ?)', inventory
+            )
+        self._bump(conn)
+
+    @classmethod
+    def _search_text(cls, row: Dict[str, Any]) -> str:
+        """The folder name and every metadata value, one per line, for the FTS index."""
+        values = [row['folder']]
+        pending = [json.loads(row['metadata'])] if row['metadata'] else []
+        while pending:
+            value = pending.pop()
+            if isinstance(value, dict):
+                pending.extend(value.values())
+            elif isinstance(value, list):
+                pending.extend(value)
+            elif value is not None and not isinstance(value, bool):
+                values.append(str(value))
+        return '\n'.join(values)
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection) -> None:
+        conn.execute('UPDATE catalog_state SET generation = generation + 1, changed_at = ? WHERE id = 0',
+                     (time.time(),))
+
+    def generation(self) -> Tuple[str, int, float]:
+        """(epoch, generation, changed_at): changes whenever any listing could."""
+        row = self._connect().execute(
+            'SELECT epoch, generation, changed_at FROM catalog_state WHERE id = 0'
+        ).fetchone()
+        return row['epoch'], row['generation'], row['changed_at']
+
+    @classmethod
+    def _metadata_columns(cls, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            file_size = int(metadata.get('fileSize') or 0)
+        except (TypeError, ValueError):
+            file_size = 0
+        return {
+            'upload_id': metadata.get('uploadId'),
+            'original_filename': metadata.get('originalFilename') or metadata.get('original_filename'),
+            'new_filename': metadata.get('newFilename') or metadata.get('new_filename'),
+            'final_filename': metadata.get('final_filename') or metadata.get('currentFilename'),
+            'operation': metadata.get('operation'),
+            'item_number': metadata.get('itemNumber'),
+            'sub_number': metadata.get('subNumber'),
+            'date_of_collection': metadata.get('dateOfCollection'),
+            'device_type': metadata.get('deviceType'),
+            'platform': metadata.get('platform'),
+            'system': metadata.get('system'),
+            'file_size': file_size,
+            'status': cls.status_of(metadata),
+            'verified': 1 if metadata.get('verified') else 0,
+            'approved': metadata.get('approved'),
+            'file_hashes': json.dumps(metadata['fileHashes']) if metadata.get('fileHashes') else None,
+            'completed_at': metadata.get('completedAt'),
+            'updated_at': metadata.get('last_updated')
+        }
+
+    def _inventory_row(self, folder: str, folder_path: str, inventory_file: Optional[str]):
+        """The upload_inventories row to write, True if the stored one is current, None to drop it."""
+        if inventory_file is None:
+            return None
+        inventory_path = os.path.join(folder_path, inventory_file)
+        try:
+            stat = os.stat(inventory_path)
+        except FileNotFoundError:
+            return None
+        file_key = f"{inventory_file}:{stat.st_size}:{stat.st_mtime_ns}"
+        stored = self._connect().execute(
+            'SELECT file_key FROM upload_inventories WHERE folder = ?', (folder,)
+        ).fetchone()
+        if stored is not None and stored['file_key'] == file_key:
+            return True
+        try:
+            chunks = ChunkManifest.read(inventory_path)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            current_app.logger.error(f"Error reading CSV file {inventory_path}: {str(e)}")
+            chunks = []
+        return (folder, inventory_file, file_key, json.dumps(chunks))
+
+    @classmethod
+    def apply_change(cls, event: Dict[str, Any]) -> None:
+        """ChangeFeed subscriber: re-index the folders an event names."""
+        catalog = cls.from_config()
+        if event['type'] == FolderWatcher.RESYNC:
+            catalog.reconcile(force=False, now=True)
+            return
+        if event['type'] == FolderWatcher.RENAMED:
+            catalog.remove_folder(event['previous'])
+        if event['type'] == FolderWatcher.DELETED:
+            catalog.remove_folder(event['folder'])
+        else:
+            catalog.record_folder(os.path.join(catalog.base_upload_folder, event['folder']))
+
+    def remove_folder(self, folder: str) -> None:
+        with _ImmediateTransaction(self._connect()) as conn:
+            conn.execute('DELETE FROM upload_inventories WHERE folder = ?', (folder,))
+            if self.fts:
+                conn.execute('DELETE FROM uploads_fts WHERE rowid = (SELECT rowid FROM uploads WHERE folder = ?)',
+                             (folder,))
+            if conn.execute('DELETE FROM uploads WHERE folder = ?', (folder,)).rowcount:
+                self._bump(conn)
+
+    # Folders stored per transaction while reconciling
+    BATCH_SIZE = 500
+
+    def reconcile(self, force: bool = False, now: bool = False,
+                  progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+        """
+        Bring the catalog in line with UPLOAD_FOLDER, re-reading only folders
+        whose mtime changed (every folder with force). Unless force or now is
+        given this runs at most once per CATALOG_REFRESH_SECONDS per process,
+        and not at all while a ChangeFeed keeps the catalog current. Returns how
+        many folders were re-read or dropped.
+
+        Folders are stat'ed and read by a FolderCrawler, in parallel and
+        throttled as configured, and stored in batches as the reads finish;
+        progress is passed on to the crawler.
+        """
+        refresh = current_app.config.get('CATALOG_REFRESH_SECONDS', 30)
+        feed_running = ChangeFeed.start()
+        with self._reconcile_lock:
+            started = time.monotonic()
+            if (not (force or now) and self._reconciled_at is not None
+                    and (feed_running or started - self._reconciled_at < refresh)):
+                return 0
+            self._reconciled_at = started
+
+        if not os.path.isdir(self.base_upload_folder):
+            return 0
+        known = {row['folder']: row['folder_mtime_ns'] for row in
+                 self._connect().execute('SELECT folder, folder_mtime_ns FROM uploads')}
+        # Dot folders (.sessions) hold internal state, not uploads
+        entries = [entry for entry in os.scandir(self.base_upload_folder)
+                   if not entry.name.startswith('.') and entry.is_dir()]
+        seen = {entry.name for entry in entries}
+
+        def read(entry):
+            # On a network share the stat is a round trip too, so it runs on the crawler's threads
+            mtime_ns = entry.stat().st_mtime_ns
+            if not force and known.get(entry.name) == mtime_ns:
+                return False
+            return self._read_folder(entry.path, mtime_ns)
+
+        changed = 0
+        batch = []
+        for entry, result in FolderCrawler(progress=progress).crawl(entries, read):
+            if result is False:
+                continue
+            changed += 1
+            if result is None:
+                seen.discard(entry.name)
+                continue
+            batch.append(result)
+            if len(batch) >= self.BATCH_SIZE:
+                self._store_batch(batch)
+        self._store_batch(batch)
+        for folder in set(known) - seen:
+            self.remove_folder(folder)
+            changed += 1
+        if changed:
+            current_app.logger.info(f"Upload catalog reconciled: {changed} folder(s) updated")
+        return changed
+
+    def _store_batch(self, batch: List[tuple]) -> None:
+        if not batch:
+            return
+        with _ImmediateTransaction(self._connect()) as conn:
+            for row, inventory in batch:
+                self._store(conn, row, inventory)
+        batch.clear()
+
+    def rebuild(self, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+        """Re-read every folder from disk."""
+        return self.reconcile(force=True, progress=progress)
+
+    def _uploads(self, where: str = '', params=()) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            f"SELECT * FROM uploads WHERE metadata_file IS NOT NULL {where} "
+            f"ORDER BY folder_mtime_ns DESC", params
+        )
+        return [dict(row, metadata=json.loads(row['metadata'])) for row in rows]
+
+    def list_uploads(self) -> List[Dict[str, Any]]:
+        """Every folder with metadata, newest first."""
+        return self._uploads()
+
+    def _filter_sql(self, filters: Dict[str, Any], exclude: Optional[str] = None) -> Tuple[str, list]:
+        """
+        WHERE clause for listing filters: operation, device_type, platform,
+        system, approved ('Yes' / 'No'), item_number, status, verified (bool),
+        date_from / date_to (ISO dates, inclusive) and q, words that must all
+        start some metadata value (a substring of any metadata field without
+        FTS5). exclude leaves out one facet's own filter (see facets).
+        """
+        clauses = ['metadata_file IS NOT NULL']
+        params = []
+        for facet, column in self.FACETS.items():
+            if filters.get(facet) and exclude != facet:
+                clauses.append(f"{column} = ?")
+                params.append(filters[facet])
+        if filters.get('item_number'):
+            clauses.append('item_number = ?')
+            params.append(filters['item_number'])
+        if filters.get('status'):
+            clauses.append('status = ?')
+            params.append(filters['status'])
+        if filters.get('verified') is not None:
+            clauses.append('verified = ?')
+            params.append(1 if filters['verified'] else 0)
+        if filters.get('date_from'):
+            clauses.append('date_of_collection >= ?')
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            clauses.append('date_of_collection <= ?')
+            params.append(filters['date_to'])
+        if filters.get('q') and self.fts:
+            match = self._match_query(filters['q'])
+            if match:
+                clauses.append('rowid IN (SELECT rowid FROM uploads_fts WHERE uploads_fts MATCH ?)')
+                params.append(match)
+        elif filters.get('q'):
+            escaped = filters['q'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("(metadata LIKE ? ESCAPE '\\' OR folder LIKE ? ESCAPE '\\')")
+            params += [f"%{escaped}%", f"%{escaped}%"]
+        return ' AND '.join(clauses), params
+
+    @staticmethod
+    def _match_query(q: str) -> str:
+        """An FTS5 query matching rows with every word of q as a token prefix."""
+        # Each word is quoted so FTS5 syntax (AND, NEAR, column:, ...) in user input is just text
+        terms = ['"' + term.replace('"', '""') + '"*' for term in q.split()]
+        return ' '.join(terms)
+
+    def facets(self, filters: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        For each of FACETS, the most common values among uploads matching
+        filters, as [{value, count}] (at most FACET_LIMIT). A facet's own
+        filter is left out of its counts so the other choices stay visible.
+        """
+        conn = self._connect()
+        result = {}
+        for facet, column in self.FACETS.items():
+            where, params = self._filter_sql(filters, exclude=facet)
+            rows = conn.execute(
+                f"SELECT {column} AS value, COUNT(*) AS count FROM uploads "
+                f"WHERE {where} AND {column} IS NOT NULL AND {column} != '' "
+                f"GROUP BY {column} ORDER BY count DESC, value LIMIT ?", params + [self.FACET_LIMIT]
+            )
+            result[facet] = [dict(row) for row in rows]
+        return result
+
+    def count_uploads(self, filters: Dict[str, Any]) -> int:
+        where, params = self._filter_sql(filters)
+        return self._connect().execute(f"SELECT COUNT(*) FROM uploads WHERE {where}", params).fetchone()[0]
+
+    def query_uploads(self, filters: Dict[str, Any], sort: str = 'modified', descending: bool = True,
+                      limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of uploads matching filters, ordered by sort (see SORTS) with
+        the folder name breaking ties. cursor is the value returned with the
+        previous page; the returned cursor is None after the last page. Rows
+        carry the catalog columns only, not the metadata or inventory.
+        """
+        if sort not in self.SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        key = self.SORTS[sort]
+        where, params = self._filter_sql(filters)
+        if cursor:
+            last_value, last_folder = self._decode_cursor(cursor, sort, descending)
+            where += f" AND ({key}, folder) {'<' if descending else '>'} (?, ?)"
+            params += [last_value, last_folder]
+        direction = 'DESC' if descending else 'ASC'
+        columns = ', '.join(column for column in self.COLUMNS if column != 'metadata')
+        rows = [dict(row) for row in self._connect().execute(
+            f"SELECT {columns}, {key} AS sort_value FROM uploads WHERE {where} "
+            f"ORDER BY {key} {direction}, folder {direction} LIMIT ?", params + [limit + 1]
+        )]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(sort, descending, rows[-1]['sort_value'], rows[-1]['folder'])
+        for row in rows:
+            del row['sort_value']
+        return rows, next_cursor
+
+    @staticmethod
+    def _encode_cursor(sort: str, descending: bool, value: Any, folder: str) -> str:
+        raw = json.dumps([sort, descending, value, folder]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            cursor_sort, cursor_descending, value, folder = json.loads(raw)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        if cursor_sort != sort or cursor_descending != descending:
+            raise ValueError("Cursor belongs to a different sort order")
+        return value, folder
+
+    def get(self, folder: str) -> Optional[Dict[str, Any]]:
+        rows = self._uploads('AND folder = ?', (folder,))
+        return rows[0] if rows else None
+
+    def find_by_upload_id(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._uploads('AND upload_id = ?', (upload_id,))
+        return rows[0] if rows else None
+
+    def find_by_filename(self, filename: str) -> Optional[Dict[str, Any]]:
+        """The upload whose metadata file belongs to filename, with or without _complete."""
+        base_filename = filename.replace('_complete', '')
+        rows = self._uploads(
+            'AND (metadata_file IN (?, ?) OR final_filename = ? OR original_filename = ?)',
+            (f"{base_filename}_metadata.json", f"{base_filename}_complete_metadata.json",
+             filename, filename)
+        )
+        return rows[0] if rows else None
+
+    def inventory_key(self, folder: str) -> Optional[str]:
+        """Name, size and mtime of the inventory file the stored chunks were parsed from."""
+        row = self._connect().execute(
+            'SELECT file_key FROM upload_inventories WHERE folder = ?', (folder,)
+        ).fetchone()
+        return row['file_key'] if row else None
+
+    def inventory(self, folder: str) -> List[Dict[str, str]]:
+        row = self._connect().execute(
+            'SELECT chunks FROM upload_inventories WHERE folder = ?', (folder,)
+        ).fetchone()
+        return json.loads(row['chunks']) if row else []
@@ -0,0 +1,109 @@
+# project/client_app/operations/upload_journal.py
+"""Append-only on-disk journal that lets upload sessions survive a restart."""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from flask import current_app
+
+class UploadJournal:
+    """
+    One file per session under <UPLOAD_FOLDER>/.sessions. The first line holds the
+    session header; every acknowledged range appends one short record, so an update
+    is a single small append no matter how many chunks the file has.
+    Appends from concurrent requests are serialized by the journal's own lock,
+    so records never interleave, and none land after close() or remove().
+    """
+    DIRNAME = '.sessions'
+    SUFFIX = '.journal'
+
+    def __init__(self, path: str, sync_appends: bool = True):
+        self.path = path
+        # Without it records are flushed but not fsynced; losing the tail of the
+        # journal in a crash only means those ranges get sent again
+        self.sync_appends = sync_appends
+        self._file = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @classmethod
+    def get_journal_dir(cls, base_upload_folder: str) -> str:
+        return os.path.join(base_upload_folder, cls.DIRNAME)
+
+    @classmethod
+    def for_session(cls, base_upload_folder: str, upload_id: str,
+                    sync_appends: bool = True) -> 'UploadJournal':
+        return cls(os.path.join(cls.get_journal_dir(base_upload_folder), f"{upload_id}{cls.SUFFIX}"),
+                   sync_appends)
+
+    def create(self, header: Dict[str, Any]) -> None:
+        """Start a fresh journal with the session header, replacing any old one."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(json.dumps({'session': header}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def append_range(self, start: int, end: int, algorithm: str, digest: str) -> None:
+        """Record an acknowledged range; durable once this returns if sync_appends is set."""
+        record = json.dumps({'r': [start, end, algorithm, digest]}, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._closed:
+                return
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write(record)
+            self._file.flush()
+            if self.sync_appends:
+                os.fsync(self._file.fileno())
+
+    def _close(self) -> None:
+        self._closed = True
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def remove(self) -> None:
+        """Drop the journal once the session is finished or abandoned."""
+        with self._lock:
+            self._close()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def read(self) -> Tuple[Optional[Dict[str, Any]], List[List[Any]]]:
+        """Return (header, range records). A torn final line from a crash is ignored."""
+        header = None
+        records = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    current_app.logger.warning(f"Ignoring damaged journal line in {self.path}")
+                    break
+                if 'session' in entry:
+                    header = entry['session']
+                elif 'r' in entry:
+                    records.append(entry['r'])
+        return header, records
+
+    @classmethod
+    def load_all(cls, base_upload_folder: str) -> Iterator['UploadJournal']:
+        """Yield every journal left behind in the upload folder."""
+        journal_dir = cls.get_journal_dir(base_upload_folder)
+        if not os.path.isdir(journal_dir):
+            return
+        for entry in os.scandir(journal_dir):
+            if entry.is_file() and entry.name.endswith(cls.SUFFIX):
+                yield cls(entry.path)
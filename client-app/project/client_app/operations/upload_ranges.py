@@ -0,0 +1,66 @@
+# project/client_app/operations/upload_ranges.py
+"""Compact tracking of the byte ranges an upload session has received."""
+
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Tuple
+
+class ReceivedRanges:
+    """Sorted set of merged, half-open byte ranges [start, end)."""
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]] = ()):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for start, end in ranges:
+            self.add(start, end)
+
+    def add(self, start: int, end: int) -> None:
+        """Record [start, end), merging it with any overlapping or touching ranges."""
+        if end <= start:
+            return
+        first = bisect_left(self._ends, start)
+        last = bisect_right(self._starts, end)
+        if first < last:
+            start = min(start, self._starts[first])
+            end = max(end, self._ends[last - 1])
+        self._starts[first:last] = [start]
+        self._ends[first:last] = [end]
+
+    def covers(self, start: int, end: int) -> bool:
+        """True if every byte of [start, end) has been received."""
+        index = bisect_right(self._starts, start) - 1
+        return index >= 0 and self._ends[index] >= end
+
+    def total(self) -> int:
+        """Number of bytes received."""
+        return sum(end - start for start, end in zip(self._starts, self._ends))
+
+    def contiguous_end(self) -> int:
+        """End of the received prefix that starts at byte 0."""
+        if self._starts and self._starts[0] == 0:
+            return self._ends[0]
+        return 0
+
+    def is_complete(self, size: int) -> bool:
+        """True once [0, size) has been received."""
+        return size == 0 or self.covers(0, size)
+
+    def missing(self, size: int) -> List[List[int]]:
+        """Gaps in [0, size) as [start, end) pairs."""
+        gaps = []
+        position = 0
+        for start, end in zip(self._starts, self._ends):
+            if start > position:
+                gaps.append([position, min(start, size)])
+            position = max(position, end)
+            if position >= size:
+                break
+        if position < size:
+            gaps.append([position, size])
+        return gaps
+
+    def to_list(self) -> List[List[int]]:
+        """Serializable form, accepted back by the constructor."""
+        return [[start, end] for start, end in zip(self._starts, self._ends)]
+
+    def __len__(self) -> int:
+        return len(self._starts)
@@ -3,44 +3,40 @@ import os
 import shutil
 from flask import Blueprint, jsonify, request, current_app, render_template
 import json
-import csv
 from datetime import datetime
+from ..operations.metadata_store import MetadataStore
+from ..operations.chunk_manifest import ChunkManifest
+from ..operations.upload_catalog import UploadCatalog
+from ..utils import cacheable, make_etag, not_modified
 
 history_routes = Blueprint('history_routes', __name__)
 
 def get_metadata_from_folder(folder_path):
     """Extract metadata from a folder's metadata.json file."""
     try:
-        # Look for both regular and _complete metadata files
-        metadata_files = [f for f in os.listdir(folder_path) 
-                         if f.endswith('_metadata.json')]
-        
-        if not metadata_files:
+        # Prefers the completed metadata file; unchanged files come from the cache
+        found = MetadataStore.load_folder(folder_path)
+        if not found:
             return None
-            
-        # Prefer the completed metadata file if it exists
-        completed_metadata = next((f for f in metadata_files if '_complete_metadata.json' in f), None)
-        metadata_path = os.path.join(folder_path, 
-                                   completed_metadata if completed_metadata else metadata_files[0])
-        
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-            
-        # Ensure required fields exist
-        metadata.setdefault('originalFilename', 'Unknown File')
-        metadata.setdefault('newFilename', 'N/A')
-        metadata.setdefault('operation', 'Unknown Operation')
-        metadata.setdefault('dateOfCollection', 'N/A')
-        metadata.setdefault('itemNumber', 'N/A')
-        metadata.setdefault('subNumber', 'N/A')
-        metadata.setdefault('fileSize', 0)
-        
-        return metadata
+        return with_metadata_defaults(found[1])
         
     except Exception as e:
         current_app.logger.error(f"Error reading metadata: {str(e)}")
         return None
 
+def with_metadata_defaults(metadata):
+    """Fill in the fields the history views expect on every upload."""
+    # Ensure required fields exist
+    metadata.setdefault('originalFilename', 'Unknown File')
+    metadata.setdefault('newFilename', 'N/A')
+    metadata.setdefault('operation', 'Unknown Operation')
+    metadata.setdefault('dateOfCollection', 'N/A')
+    metadata.setdefault('itemNumber', 'N/A')
+    metadata.setdefault('subNumber', 'N/A')
+    metadata.setdefault('fileSize', 0)
+    
+    return metadata
+
 def get_inventory_from_folder(folder_path):
     """Extract chunk inventory from any *_inventory.csv files in the folder."""
     try:
@@ -55,32 +51,10 @@ def get_inventory_from_folder(folder_path):
         inventory_path = os.path.join(folder_path, inventory_files[0])
         current_app.logger.info(f"Found inventory file: {inventory_path}")
 
-        chunks = []
         try:
-            with open(inventory_path, 'r') as f:
-                # Skip empty lines and handle potential BOM
-                csv_content = f.read().strip()
-                if csv_content.startswith('\ufeff'):
-                    csv_content = csv_content[1:]
-                
-                if not csv_content:
-                    return []
-
-                # Create a CSV reader from the content
-                reader = csv.DictReader(csv_content.splitlines())
-                
-                # Map CSV columns to expected names
-                for row in reader:
-                    chunk_data = {
-                        'file': row.get('filename', row.get('file', '')),
-                        'chunk': row.get('chunk', ''),
-                        'hash': row.get('hash', ''),
-                        'size': row.get('size', '0')
-                    }
-                    chunks.append(chunk_data)
-                
-                current_app.logger.info(f"Successfully read {len(chunks)} chunks from inventory")
-                return chunks
+            chunks = ChunkManifest.read(inventory_path)
+            current_app.logger.info(f"Successfully read {len(chunks)} chunks from inventory")
+            return chunks
         except Exception as e:
             current_app.logger.error(f"Error reading CSV file {inventory_path}: {str(e)}")
             return []
@@ -93,46 +67,178 @@ def get_inventory_from_folder(folder_path):
 def history():
     """Render the history page."""
     return render_template('history.html')
+
+def parse_bool(value):
+    """'true'/'false' style query parameter; None when absent."""
+    if value is None or value == '':
+        return None
+    if value.lower() in ('true', '1', 'yes'):
+        return True
+    if value.lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean: {value}")
+
+def resolve_upload_folder(folder_name):
+    """Path of an upload folder directly under UPLOAD_FOLDER; ValueError for anything else."""
+    if not folder_name or folder_name.startswith('.') or os.path.basename(folder_name) != folder_name:
+        raise ValueError(f"Invalid folder name: {folder_name}")
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], folder_name)
+
+def folder_summary(upload):
+    """The listing row for one catalog entry: what a history card shows, nothing more."""
+    file_size = upload['file_size'] or 0
+    return {
+        'name': upload['folder'],
+        'operation': upload['operation'] or 'Unknown Operation',
+        'dateOfCollection': upload['date_of_collection'] or 'N/A',
+        'originalFilename': upload['original_filename'] or 'Unknown File',
+        'newFilename': upload['new_filename'] or 'N/A',
+        'itemNumber': upload['item_number'] or 'N/A',
+        'subNumber': upload['sub_number'] or 'N/A',
+        'deviceType': upload['device_type'],
+        'platform': upload['platform'],
+        'system': upload['system'],
+        'fileSize': file_size,
+        'formatted_file_size': f"{file_size / (1024 * 1024 * 1024):.2f} GB",
+        'fileHashes': json.loads(upload['file_hashes']) if upload['file_hashes'] else {},
+        'verified': bool(upload['verified']),
+        'status': upload['status'],
+        'approved': upload['approved'],
+        'completedAt': upload['completed_at'],
+        'has_inventory': upload['inventory_file'] is not None,
+        'upload_folder': os.path.join(current_app.config['UPLOAD_FOLDER'], upload['folder'])
+    }
+
 @history_routes.route('/api/folders')
 def get_folders():
-    """Get all folders with their metadata and inventory."""
+    """
+    One page of upload summaries from the upload catalog.
+
+    Query parameters:
+        limit      page size, default 50, at most 500
+        cursor     nextCursor of the previous page
+        sort       modified (default), date, operation, item, filename or size
+        order      desc (default) or asc
+        operation, device_type, platform, system, approved, item_number,
+        status, verified, date_from, date_to
+                   filters; dates are inclusive YYYY-MM-DD
+        q          words to search for in any metadata field (serial number,
+                   notes, passwords, ...); each matches as a word prefix
+        facets     true to add value counts for operation, device_type,
+                   platform, system and approved under "facets"
+
+    Full metadata and the chunk inventory of a folder come from
+    /api/folders/<name> and /api/folders/<name>/inventory.
+
+    The ETag is the catalog generation plus the query, so a repeat request
+    with If-None-Match is answered 304 without running the query.
+    """
     try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        folders_data = []
-
-        # Get folders and sort by modification time (newest first)
-        folders = [(f.path, f.name) for f in os.scandir(upload_folder) if f.is_dir()]
-        folders.sort(key=lambda x: os.path.getmtime(x[0]), reverse=True)
-
-        for folder_path, folder_name in folders:
-            metadata = get_metadata_from_folder(folder_path)
-            if metadata:
-                # Get inventory and log its presence
-                inventory = get_inventory_from_folder(folder_path)
-                has_inventory = bool(inventory)
-                
-                # Format file size for display
-                file_size_gb = metadata.get('fileSize', 0) / (1024 * 1024 * 1024)
-                
-                folder_info = {
-                    'name': folder_name,
-                    'metadata': {
-                        **metadata,
-                        'formatted_file_size': f"{file_size_gb:.2f} GB",
-                        'formatted_item_sub': f"Item NO: {metadata.get('itemNumber', 'N/A')} " +
-                                            f"Sub {metadata.get('subNumber', 'N/A')}"
-                    },
-                    'inventory': inventory,
-                    'has_inventory': has_inventory
-                }
-                folders_data.append(folder_info)
-
-        return jsonify(folders_data)
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        order = request.args.get('order', 'desc').lower()
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Invalid order: {order}")
+        filters = {
+            'operation': request.args.get('operation'),
+            'device_type': request.args.get('device_type'),
+            'platform': request.args.get('platform'),
+            'system': request.args.get('system'),
+            'approved': request.args.get('approved'),
+            'item_number': request.args.get('item_number'),
+            'status': request.args.get('status'),
+            'verified': parse_bool(request.args.get('verified')),
+            'date_from': request.args.get('date_from'),
+            'date_to': request.args.get('date_to'),
+            'q': request.args.get('q', '').strip()
+        }
+        with_facets = parse_bool(request.args.get('facets'))
+
+        catalog = UploadCatalog.from_config()
+        catalog.reconcile()
+        epoch, generation, changed_at = catalog.generation()
+        etag = make_etag('folders', epoch, generation, current_app.config['UPLOAD_FOLDER'],
+                         request.query_string)
+        cached = not_modified(etag, changed_at)
+        if cached:
+            return cached
+
+        uploads, next_cursor = catalog.query_uploads(
+            filters, sort=request.args.get('sort', 'modified'), descending=order == 'desc',
+            limit=limit, cursor=request.args.get('cursor')
+        )
+        listing = {
+            'folders': [folder_summary(upload) for upload in uploads],
+            'nextCursor': next_cursor,
+            'total': catalog.count_uploads(filters)
+        }
+        if with_facets:
+            listing['facets'] = catalog.facets(filters)
+        return cacheable(jsonify(listing), etag, changed_at)
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error getting folders: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@history_routes.route('/api/folders/<folder_name>')
+def get_folder(folder_name):
+    """Full metadata of one upload folder, for the Info and Resend dialogs; versioned by the metadata ETag."""
+    try:
+        found = MetadataStore.load_folder(resolve_upload_folder(folder_name))
+        if not found:
+            return jsonify({'error': 'Folder not found'}), 404
+        metadata_path, metadata, metadata_etag = found
+        etag = make_etag('folder', metadata_path, metadata_etag)
+        last_modified = os.stat(metadata_path).st_mtime
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+
+        metadata = with_metadata_defaults(metadata)
+        file_size_gb = (metadata.get('fileSize') or 0) / (1024 * 1024 * 1024)
+        return cacheable(jsonify({
+            'name': folder_name,
+            'metadata': {
+                **metadata,
+                'formatted_file_size': f"{file_size_gb:.2f} GB",
+                'formatted_item_sub': f"Item NO: {metadata.get('itemNumber', 'N/A')} " +
+                                    f"Sub {metadata.get('subNumber', 'N/A')}"
+            }
+        }), etag, last_modified)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error getting folder {folder_name}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@history_routes.route('/api/folders/<folder_name>/inventory')
+def get_folder_inventory(folder_name):
+    """Chunk inventory of one upload folder, parsed once per version of its CSV."""
+    try:
+        folder_path = resolve_upload_folder(folder_name)
+        if not os.path.isdir(folder_path):
+            return jsonify({'error': 'Folder not found'}), 404
+
+        # Picks up an inventory the external tool dropped since the last listing
+        UploadCatalog.touch(folder_path)
+        catalog = UploadCatalog.from_config()
+        # The CSV's name, size and mtime identify the parsed chunks
+        etag = make_etag('inventory', folder_name, catalog.inventory_key(folder_name))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        inventory = catalog.inventory(folder_name)
+        return cacheable(jsonify({'name': folder_name, 'inventory': inventory}), etag)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error getting inventory of {folder_name}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @history_routes.route('/api/delete-folder', methods=['POST'])
 def delete_folder():
     """Handle folder deletion requests"""
@@ -153,6 +259,7 @@ def delete_folder():
 
         # Remove the directory and all its contents
         shutil.rmtree(folder_path)
+        UploadCatalog.touch(folder_path)
         
         current_app.logger.info(f"Successfully deleted folder: {folder_path}")
         return jsonify({
@@ -1,11 +1,10 @@
 # project/client_app/routes/main_routes.py
 
-import os
 import json
 from flask import Blueprint, render_template, request, jsonify, current_app
 from datetime import datetime
 from ..utils import get_temp_dir
-from .history_routes import get_metadata_from_folder
+from ..file_utils import supported_chunk_algorithms
 
 main_routes = Blueprint('main_routes', __name__)
 
@@ -17,39 +16,33 @@ def home():
 
 @main_routes.route('/history')
 def history():
-    """Render the history page."""
-    try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        folder_data = []
-        
-        # Get all folders and sort by modification time (newest first)
-        folders = [(f.path, f.name) for f in os.scandir(upload_folder) if f.is_dir()]
-        folders.sort(key=lambda x: os.path.getmtime(x[0]), reverse=True)
-
-        for folder_path, folder_name in folders:
-            metadata = get_metadata_from_folder(folder_path)
-            if metadata:
-                folder_data.append({
-                    "name": metadata.get("operation", "Unknown Operation"),
-                    "date": metadata.get("dateOfCollection", "Unknown Date"),
-                    "folder": folder_name,
-                    "verified": metadata.get("verified", False),
-                    "metadata": metadata
-                })
-
-        current_app.logger.info(f"Found {len(folder_data)} folders with metadata")
-        return render_template('history.html', folder_data=folder_data)
-        
-    except Exception as e:
-        current_app.logger.error(f"Error loading history page: {str(e)}")
-        return render_template('history.html', folder_data=[])
+    """Render the history page; its folders are loaded page by page from /api/folders."""
+    return render_template('history.html')
 
 @main_routes.route('/config')
 def get_config():
-    """Get application configuration."""
+    """Get application configuration, including the upload capabilities clients negotiate against."""
+    min_chunk_size = current_app.config.get('MIN_CHUNK_SIZE', 1024 * 1024)
+    max_chunk_size = current_app.config.get('MAX_CHUNK_SIZE', 256 * 1024 * 1024)
+    default_chunk_size = current_app.config.get('DEFAULT_CHUNK_SIZE', 10 * 1024 * 1024)
     config = {
         'UPLOAD_FOLDER': current_app.config.get('UPLOAD_FOLDER', '/tmp/uploads'),
         'MAX_FILE_SIZE': current_app.config.get('MAX_FILE_SIZE', 200 * 1024 * 1024 * 1024),
-        'SYSTEM_NAME': current_app.config.get('SYSTEM_NAME', 'Unknown')
+        'SYSTEM_NAME': current_app.config.get('SYSTEM_NAME', 'Unknown'),
+        'CLIENT_HASH_MODE': current_app.config.get('CLIENT_HASH_MODE', 'local'),
+        'UPLOAD_CAPABILITIES': {
+            'chunkSize': {
+                'min': min_chunk_size,
+                'default': min(max(default_chunk_size, min_chunk_size), max_chunk_size),
+                'max': max_chunk_size
+            },
+            'parallelStreams': current_app.config.get('PARALLEL_STREAMS', 4),
+            'maxParallelStreams': current_app.config.get('MAX_PARALLEL_STREAMS', 8),
+            'targetChunkMs': current_app.config.get('TARGET_CHUNK_MS', 2000),
+            'hashAlgorithms': supported_chunk_algorithms(),
+            'durability': current_app.config.get('DURABILITY_MODE', 'per-chunk'),
+            # Chunk responses carry timing: {writeMs, syncMs}
+            'timingHints': True
+        }
     }
     return jsonify(config)
\ No newline at end of file
@@ -5,6 +5,7 @@ from flask import Blueprint, request
 from .upload_controller import upload_routes
 from .verification_controller import verification_routes
 from .hash_controller import hash_routes
+from .session_controller import session_routes
 
 def create_upload_blueprint():
     """Create and configure the upload blueprint with all routes."""
@@ -14,5 +15,6 @@ def create_upload_blueprint():
     upload_blueprint.register_blueprint(upload_routes)
     upload_blueprint.register_blueprint(verification_routes)
     upload_blueprint.register_blueprint(hash_routes)
+    upload_blueprint.register_blueprint(session_routes)
     
     return upload_blueprint
\ No newline at end of file
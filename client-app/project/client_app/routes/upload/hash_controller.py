@@ -1,31 +1,120 @@
 # project/client_app/routes/upload/hash_controller.py
 from flask import Blueprint, request, jsonify, current_app
-import os
 import hashlib
-import tempfile
+import os
+import threading
+import time
+import uuid
 from werkzeug.utils import secure_filename
+from ...operations import ChunkWriter, SessionStore, UploadJournal
 
 hash_routes = Blueprint('hash_routes', __name__)
 
 class ChunkedHashCalculator:
+    """
+    This process's running MD5 of a server-side hash pass, over its first
+    bytes_hashed bytes. Which chunk comes next is kept in the SessionStore,
+    keyed by hash id, so with a shared store any worker can take any chunk:
+    every chunk is also written to a spool file in .sessions, and a worker
+    whose MD5 is behind (other workers took the chunks before) catches up from
+    that file first. With the in-process store every chunk reaches this
+    worker, so chunks are only hashed, straight from the request.
+    """
+    READ_SIZE = 1024 * 1024
+    SPOOL_SUFFIX = '.hashdata'
+
     def __init__(self):
         self.md5_hash = hashlib.md5()
-        self.chunks_received = set()
-        self.total_chunks = 0
-        self.temp_dir = None
-        
-    def update_hash(self, chunk_data):
-        self.md5_hash.update(chunk_data)
-        
-    def get_hash(self):
-        return self.md5_hash.hexdigest()
-
-# Store active hash calculations
-active_calculations = {}
+        self.bytes_hashed = 0
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def spool_path(cls, hash_id):
+        return os.path.join(UploadJournal.get_journal_dir(current_app.config['UPLOAD_FOLDER']),
+                            f"{hash_id}{cls.SPOOL_SUFFIX}")
+
+    def hash_chunk(self, stream, offset, limit, spool_path=None):
+        """
+        Read the chunk starting at offset from stream, spooling it if spool_path
+        is given, and return its size and the MD5 it leads to. The MD5 itself
+        only moves when the caller commits the chunk.
+        """
+        if spool_path:
+            self.catch_up(spool_path, offset)
+        if self.bytes_hashed != offset:
+            # This worker lost the MD5 and nothing was spooled to rebuild it
+            raise ValueError("Hash calculation session not found")
+        md5_hash = self.md5_hash.copy()
+        received = 0
+        while True:
+            block = stream.read(self.READ_SIZE)
+            if not block:
+                break
+            if received + len(block) > limit:
+                raise ValueError("Chunk is outside the declared file size")
+            if spool_path:
+                ChunkWriter.write_at(spool_path, block, offset + received, fsync=False)
+            md5_hash.update(block)
+            received += len(block)
+        return received, md5_hash
+
+    def catch_up(self, spool_path, end):
+        """Hash the spooled bytes from where this MD5 ends up to end."""
+        if end > self.bytes_hashed:
+            md5_hash = self.md5_hash.copy()
+            ChunkWriter.digest_range(spool_path, self.bytes_hashed, end, md5_hash.update)
+            self.md5_hash = md5_hash
+            self.bytes_hashed = end
+
+def _calculators():
+    """This process's MD5s by hashId, per app."""
+    return current_app.extensions.setdefault('hash_calculations', {})
+
+calculations_lock = threading.Lock()
+
+def _get_calculator(hash_id):
+    with calculations_lock:
+        calculators = _calculators()
+        if hash_id not in calculators:
+            calculators[hash_id] = ChunkedHashCalculator()
+        return calculators[hash_id]
+
+def _drop_local_state(hash_id):
+    """Forget this process's MD5 and delete the spool file of a calculation."""
+    with calculations_lock:
+        _calculators().pop(hash_id, None)
+    try:
+        os.remove(ChunkedHashCalculator.spool_path(hash_id))
+    except FileNotFoundError:
+        pass
+
+def _discard_calculation(store, hash_id):
+    if store.remove_calculation(hash_id):
+        _drop_local_state(hash_id)
+
+# Calculations nobody has sent a chunk to for this long are dropped
+CALCULATION_TIMEOUT = 15 * 60
+
+def _expire_calculations(store):
+    cutoff = time.time() - CALCULATION_TIMEOUT
+    for hash_id in store.idle_calculations(cutoff):
+        current_app.logger.info(f"Dropping idle hash calculation {hash_id}")
+        _discard_calculation(store, hash_id)
+    # MD5s of calculations another worker finished or dropped
+    with calculations_lock:
+        calculators = _calculators()
+        for hash_id in [hash_id for hash_id, calculator in calculators.items()
+                        if calculator.last_used < cutoff]:
+            del calculators[hash_id]
 
 @hash_routes.route('/calculate-hash-chunk', methods=['POST'])
 def calculate_hash_chunk():
-    """Handle chunked hash calculation"""
+    """
+    Handle chunked hash calculation. Chunks must come in order; a resent chunk
+    that was already hashed is acknowledged again, one from further ahead gets
+    409 with the chunk expected next.
+    """
     try:
         chunk = request.files.get('file')
         if not chunk:
@@ -34,51 +123,79 @@ def calculate_hash_chunk():
         chunk_number = int(request.form.get('chunk', 0))
         total_chunks = int(request.form.get('totalChunks', 1))
         file_size = int(request.form.get('fileSize', 0))
+        chunk_size = int(request.form.get('chunkSize', 0))
 
-        # Create unique ID for this file
-        file_id = f"{secure_filename(chunk.filename)}_{file_size}"
+        if chunk_size > current_app.config.get('MAX_CHUNK_SIZE', 256 * 1024 * 1024):
+            return jsonify({'error': 'Chunk size exceeds the maximum chunk size'}), 400
 
-        # Initialize hash calculator if needed
-        if chunk_number == 0:
-            active_calculations[file_id] = ChunkedHashCalculator()
-            active_calculations[file_id].total_chunks = total_chunks
-            active_calculations[file_id].temp_dir = tempfile.mkdtemp()
+        # Chunk 0 opens the calculation; later chunks send its hashId back
+        store = SessionStore.from_config()
+        if chunk_number == 0 and not request.form.get('hashId'):
+            _expire_calculations(store)
+            hash_id = uuid.uuid4().hex
+            if store.shared:
+                spool_path = ChunkedHashCalculator.spool_path(hash_id)
+                os.makedirs(os.path.dirname(spool_path), exist_ok=True)
+                ChunkWriter.preallocate(spool_path, file_size)
+            store.create_calculation(hash_id, {
+                'filename': secure_filename(chunk.filename or ''),
+                'file_size': file_size,
+                'total_chunks': total_chunks
+            })
+        else:
+            hash_id = request.form.get('hashId', '')
 
-        calculator = active_calculations.get(file_id)
-        if not calculator:
+        state = store.get_calculation(hash_id)
+        if state is None:
             return jsonify({'error': 'Hash calculation session not found'}), 400
+        if chunk_number > state['next_chunk']:
+            return jsonify({
+                'error': f"Chunk {chunk_number} arrived before chunk {state['next_chunk']}",
+                'hashId': hash_id,
+                'expectedChunk': state['next_chunk']
+            }), 409
+
+        spool_path = ChunkedHashCalculator.spool_path(hash_id) if store.shared else None
+        calculator = _get_calculator(hash_id)
+        with calculator.lock:
+            if chunk_number == state['next_chunk']:
+                offset = state['bytes_hashed']
+                received, md5_hash = calculator.hash_chunk(
+                    chunk.stream, offset, state['file_size'] - offset, spool_path
+                )
+                if store.advance_calculation(hash_id, chunk_number, received):
+                    calculator.md5_hash = md5_hash
+                    calculator.bytes_hashed = offset + received
+                state = store.get_calculation(hash_id) or state
+            calculator.last_used = time.time()
+
+            complete = (state['next_chunk'] == state['total_chunks']
+                        and state['bytes_hashed'] == state['file_size'])
+            # Exactly one request reports the result, whichever worker it reaches
+            finished = complete and store.remove_calculation(hash_id)
+            if finished:
+                if spool_path:
+                    calculator.catch_up(spool_path, state['file_size'])
+                final_hash = calculator.md5_hash.hexdigest()
 
-        # Process chunk
-        if chunk_number not in calculator.chunks_received:
-            chunk_data = chunk.read()
-            calculator.update_hash(chunk_data)
-            calculator.chunks_received.add(chunk_number)
-
-        # Check if all chunks received
-        is_complete = len(calculator.chunks_received) == calculator.total_chunks
-
-        if is_complete:
-            final_hash = calculator.get_hash()
-            
-            # Cleanup
-            if calculator.temp_dir and os.path.exists(calculator.temp_dir):
-                try:
-                    os.rmdir(calculator.temp_dir)
-                except:
-                    pass
-            del active_calculations[file_id]
-            
+        if finished:
+            _drop_local_state(hash_id)
             return jsonify({
                 'status': 'complete',
+                'hashId': hash_id,
                 'finalHash': final_hash
             })
 
         return jsonify({
             'status': 'processing',
-            'chunksReceived': len(calculator.chunks_received),
-            'totalChunks': calculator.total_chunks
+            'hashId': hash_id,
+            'bytesReceived': state['bytes_hashed'],
+            'totalChunks': state['total_chunks']
         })
 
+    except ValueError as e:
+        current_app.logger.error(f"Rejected hash chunk: {str(e)}")
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error in hash calculation: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -88,19 +205,12 @@ def cancel_hash_calculation():
     """Cancel an ongoing hash calculation"""
     try:
         data = request.json
-        file_id = data.get('fileId')
-        
-        if file_id in active_calculations:
-            calculator = active_calculations[file_id]
-            if calculator.temp_dir and os.path.exists(calculator.temp_dir):
-                try:
-                    os.rmdir(calculator.temp_dir)
-                except:
-                    pass
-            del active_calculations[file_id]
-            
+        hash_id = data.get('hashId') or data.get('fileId')
+        if hash_id:
+            _discard_calculation(SessionStore.from_config(), hash_id)
+
         return jsonify({'status': 'cancelled'})
-        
+
     except Exception as e:
         current_app.logger.error(f"Error cancelling hash calculation: {str(e)}")
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,132 @@
+# project/client_app/routes/upload/session_controller.py
+"""Controller for raw-body upload sessions addressed by Content-Range."""
+
+from flask import Blueprint, jsonify, current_app, request
+import traceback
+import uuid
+from werkzeug.http import parse_content_range_header
+from werkzeug.utils import secure_filename
+from ...operations.file_operations import FileOperations
+from ...operations.processing import FinalizationQueue, ProcessingStatusTracker
+from ...utils import cacheable, make_etag, not_modified
+
+session_routes = Blueprint('session_routes', __name__)
+
+@session_routes.route('/session', methods=['POST'])
+def create_session():
+    """Open an upload session from a small JSON description of the file."""
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'error': 'No session data provided'}), 400
+
+        filename = secure_filename(data.get('filename', ''))
+        if not filename:
+            current_app.logger.error("Invalid filename provided")
+            return jsonify({'error': 'Invalid filename'}), 400
+
+        try:
+            file_size = int(data.get('fileSize'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid file size'}), 400
+
+        metadata = data.get('metadata')
+        if not isinstance(metadata, dict):
+            return jsonify({'error': 'Missing metadata'}), 400
+
+        base_upload_folder = current_app.config.get('UPLOAD_FOLDER')
+        if not base_upload_folder:
+            current_app.logger.error("Upload folder not configured")
+            return jsonify({'error': 'Upload folder not configured'}), 500
+
+        upload_id = uuid.uuid4().hex
+        session = FileOperations.create_session(
+            upload_id, filename, file_size, metadata, base_upload_folder
+        )
+
+        return jsonify({
+            'uploadId': upload_id,
+            'fileSize': file_size,
+            'uploadFolder': session['upload_folder']
+        }), 201
+
+    except ValueError as e:
+        current_app.logger.error(f"Invalid upload session request: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error creating upload session: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+        return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
+
+@session_routes.route('/session/<upload_id>', methods=['PUT'])
+def upload_range(upload_id):
+    """Write an application/octet-stream body at the offset given by Content-Range."""
+    try:
+        content_range = parse_content_range_header(request.headers.get('Content-Range'))
+        if content_range is None or content_range.units != 'bytes':
+            return jsonify({'error': 'Missing or invalid Content-Range header'}), 400
+
+        # "bytes */N" carries no data: it is the body of an empty file, or a request
+        # to finalize a session whose ranges have all been received
+        if content_range.start is None:
+            offset, length = 0, 0
+        else:
+            offset, length = content_range.start, content_range.stop - content_range.start
+
+        if (request.content_length or 0) != length:
+            return jsonify({'error': 'Content-Length does not match Content-Range'}), 400
+
+        # Read request.stream directly: no form parsing and no Werkzeug spooling
+        result = FileOperations.write_range(
+            upload_id, request.stream, offset, length,
+            total_size=content_range.length,
+            checksum=request.headers.get('X-Chunk-Checksum')
+        )
+        # The range that completes the file only queues finalization: 202 with
+        # the job, which the client polls at statusUrl
+        if result.get('status') == FinalizationQueue.ACCEPTED:
+            return jsonify(result), 202
+        return jsonify(result)
+
+    except ValueError as e:
+        current_app.logger.error(f"Rejected range for upload {upload_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error writing range for upload {upload_id}: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+        return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
+
+@session_routes.route('/session/<upload_id>', methods=['GET'])
+def session_status(upload_id):
+    """Report received bytes and missing ranges so a client can resume an upload."""
+    try:
+        status = FileOperations.get_status(upload_id)
+        # Ranges only ever grow, so the byte count versions the whole status
+        etag = make_etag('session', upload_id, status['bytesReceived'], status['complete'])
+        return not_modified(etag) or cacheable(jsonify(status), etag)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        current_app.logger.error(f"Error reading status for upload {upload_id}: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+        return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
+
+@session_routes.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Report the stage of a finalization job: queued, syncing, hashing (with
+    progress), verifying, renaming, then done or failed with the result.
+    """
+    try:
+        job = ProcessingStatusTracker.get_job_status(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown finalization job'}), 404
+        # Every stage or progress change stamps updatedAt
+        etag = make_etag('job', job_id, job.get('updatedAt'), job.get('stage'))
+        return not_modified(etag) or cacheable(jsonify(job), etag)
+
+    except Exception as e:
+        current_app.logger.error(f"Error reading finalization job {job_id}: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+        return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
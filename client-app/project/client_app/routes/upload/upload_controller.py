@@ -5,6 +5,7 @@ from flask import Blueprint, jsonify, current_app, request  # Added request impo
 import traceback
 from werkzeug.utils import secure_filename
 from ...operations.file_operations import FileOperations
+from ...operations.processing import FinalizationQueue
 
 upload_routes = Blueprint('upload_routes', __name__)
 
@@ -53,11 +54,19 @@ def upload_chunk():
                 total_chunks=total_chunks,
                 chunk_size=chunk_size,
                 filename=filename,
-                base_upload_folder=base_upload_folder
+                base_upload_folder=base_upload_folder,
+                upload_id=request.form.get('uploadId')
             )
             current_app.logger.info(f"Chunk processed successfully: {result}")
+            # The last chunk only queues finalization; the client polls the job
+            if result.get('status') == FinalizationQueue.ACCEPTED:
+                return jsonify(result), 202
             return result
 
+        except ValueError as e:
+            # A rejected chunk leaves the session intact so it can be resent
+            current_app.logger.error(f"Rejected chunk {chunk + 1}/{total_chunks} of {filename}: {str(e)}")
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             current_app.logger.error(f"Error in chunk processing: {str(e)}")
             current_app.logger.error(traceback.format_exc())
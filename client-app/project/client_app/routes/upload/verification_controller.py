@@ -3,8 +3,8 @@
 
 from flask import Blueprint, request, jsonify, current_app
 import os
-import json
 import traceback
+from ...operations.metadata_store import MetadataStore
 
 verification_routes = Blueprint('verification_routes', __name__)
 
@@ -44,9 +44,9 @@ def verify_file():
                 'newHash': 'Verification Failed'
             }), 200
 
-        # Find metadata file in the directory
-        metadata_files = [f for f in os.listdir(dir_path) if f.endswith('_metadata.json')]
-        if not metadata_files:
+        # Find and read the metadata file in the directory
+        found = MetadataStore.load_folder(dir_path)
+        if not found:
             current_app.logger.error(f"No metadata file found in {dir_path}")
             return jsonify({
                 'verified': False,
@@ -55,10 +55,7 @@ def verify_file():
                 'newHash': 'Verification Failed'
             }), 200
 
-        # Read metadata file
-        metadata_path = os.path.join(dir_path, metadata_files[0])
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
+        _, metadata, _ = found
 
         # Get verification information from metadata
         result = {
@@ -22,6 +22,7 @@ from .path_utils import (
 )
 from .format_utils import format_file_size
 from .cleanup_utils import clean_temp_files
+from .http_cache import make_etag, not_modified, cacheable, compress
 
 __all__ = [
     'ensure_dir_exists',
@@ -36,5 +37,9 @@ __all__ = [
     'get_folder_path',
     'generate_unique_filename',
     'format_file_size',
-    'clean_temp_files'
+    'clean_temp_files',
+    'make_etag',
+    'not_modified',
+    'cacheable',
+    'compress'
 ]
\ No newline at end of file
@@ -0,0 +1,79 @@
+# project/client_app/utils/http_cache.py
+"""Conditional GET and gzip helpers for JSON endpoints."""
+
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional, Union
+from flask import Response, current_app, request
+
+# The gzip-encoded body is a different representation and gets its own strong ETag
+GZIP_SUFFIX = '-gz'
+
+def make_etag(*parts) -> str:
+    """
+    An ETag from version counters, file keys, query strings and the like.
+    Callers pass what identifies the version, never the response body.
+    """
+    raw = '|'.join(str(part) for part in parts).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+def _as_datetime(last_modified: Union[datetime, float, None]) -> Optional[datetime]:
+    if last_modified is None or isinstance(last_modified, datetime):
+        return last_modified
+    return datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+
+def not_modified(etag: str, last_modified: Union[datetime, float, None] = None) -> Optional[Response]:
+    """
+    A 304 response if the request's If-None-Match (or, without one,
+    If-Modified-Since) shows the client already has this version; else None.
+    Call it before building the response so a match costs nothing more.
+    """
+    if_none_match = request.if_none_match
+    if if_none_match:
+        for candidate in (etag, etag + GZIP_SUFFIX):
+            if if_none_match.contains_weak(candidate):
+                response = Response(status=304)
+                response.set_etag(candidate)
+                return _validators(response, last_modified)
+        return None
+
+    last_modified = _as_datetime(last_modified)
+    if_modified_since = request.if_modified_since
+    if last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return _validators(response, last_modified)
+    return None
+
+def cacheable(response: Response, etag: str, last_modified: Union[datetime, float, None] = None) -> Response:
+    """Add the validators to a full response, gzip-compressing it when worthwhile."""
+    if compress(response):
+        etag += GZIP_SUFFIX
+    response.set_etag(etag)
+    return _validators(response, last_modified)
+
+def compress(response: Response) -> bool:
+    """
+    gzip the body in place if the client accepts it and the body is at least
+    COMPRESS_MIN_BYTES (0 turns compression off). Returns whether it did.
+    """
+    min_bytes = current_app.config.get('COMPRESS_MIN_BYTES', 1024)
+    if (not min_bytes or response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or not request.accept_encodings['gzip']):
+        return False
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return False
+    response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    return True
+
+def _validators(response: Response, last_modified: Union[datetime, float, None]) -> Response:
+    last_modified = _as_datetime(last_modified)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Browsers keep the response but revalidate it on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -1,8 +1,256 @@
 // chunked-upload.js
+async function parseUploadResponse(response) {
+    const responseText = await response.text();
+    let result;
+
+    try {
+        result = JSON.parse(responseText);
+    } catch (e) {
+        console.error('Invalid JSON response:', responseText);
+        throw new Error(`Invalid JSON response: ${responseText}`);
+    }
+
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}, body: ${JSON.stringify(result, null, 2)}`);
+    }
+
+    if (result.error) {
+        throw new Error(result.error);
+    }
+
+    return result;
+}
+
+async function createUploadSession(file, metadata, abortSignal) {
+    const response = await fetch('/upload/session', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            filename: file.name,
+            fileSize: file.size,
+            metadata: metadata
+        }),
+        signal: abortSignal
+    });
+
+    return parseUploadResponse(response);
+}
+
+async function getUploadStatus(uploadId, abortSignal) {
+    const response = await fetch(`/upload/session/${uploadId}`, { signal: abortSignal });
+    // A 404 just means the session is gone (finished, expired or cancelled)
+    return response.ok ? response.json() : null;
+}
+
+// Sessions outlive the page, so remember them per file to resume after a reload
+function resumeKey(file) {
+    return `upload:${file.name}:${file.size}:${file.lastModified}`;
+}
+
+// What the user chose for an upload. A session is only resumed for the same
+// choices: its folder and metadata were fixed when it was opened. The
+// submission timestamp and the time suffix of the generated folder name
+// change on every attempt, so they don't count.
+function metadataFingerprint(metadata) {
+    const { timestamp, ...chosen } = metadata;
+    if (typeof chosen.folder_name === 'string') {
+        chosen.folder_name = chosen.folder_name.replace(/_\d{4}$/, '');
+    }
+    return JSON.stringify(Object.keys(chosen).sort().map(name => [name, chosen[name]]));
+}
+
+function savedSession(key) {
+    try {
+        return JSON.parse(localStorage.getItem(key)) || null;
+    } catch (e) {
+        return null;
+    }
+}
+
+// Take the next piece, at most `size` bytes, off the front of a list of
+// [start, end) ranges that still need sending
+function takePiece(ranges, size) {
+    while (ranges.length && ranges[0][0] >= ranges[0][1]) {
+        ranges.shift();
+    }
+    if (!ranges.length) {
+        return null;
+    }
+    const start = ranges[0][0];
+    const end = Math.min(start + size, ranges[0][1]);
+    ranges[0][0] = end;
+    return [start, end];
+}
+
+// Steers the chunk size, and the number of chunks worth keeping in flight,
+// toward the server's target time per chunk. The timing hints in each
+// response tell a slow link (writeMs includes receiving the body) apart from
+// slow stable storage (syncMs).
+class ChunkSizer {
+    constructor(capabilities) {
+        this.min = capabilities.chunkSize.min;
+        this.max = capabilities.chunkSize.max;
+        this.size = capabilities.chunkSize.default;
+        this.targetMs = capabilities.targetChunkMs;
+        this.maxWindow = Math.max(1, capabilities.maxParallelStreams);
+        this.window = Math.min(this.maxWindow, Math.max(1, capabilities.parallelStreams || 1));
+    }
+
+    record(bytes, elapsedMs, timing) {
+        // Short tail pieces say little about the link
+        if (bytes < this.min) {
+            return;
+        }
+
+        // Scale to what a full chunk at the current size would have taken
+        const projectedMs = elapsedMs * (this.size / bytes);
+        if (projectedMs < this.targetMs / 2) {
+            this.size = Math.min(this.max, this.size * 2);
+        } else if (projectedMs > this.targetMs * 1.5) {
+            this.size = Math.max(this.min, Math.floor(this.size / 2));
+        }
+
+        if (timing) {
+            // Time spent waiting on fsync leaves the link idle, which more
+            // streams can fill; a link that is already slow gets fewer
+            if (timing.syncMs > elapsedMs / 3) {
+                this.window = Math.min(this.maxWindow, this.window + 1);
+            } else if (projectedMs > this.targetMs * 2) {
+                this.window = Math.max(1, this.window - 1);
+            }
+        }
+    }
+
+    // A failed chunk is most likely a link that can't carry this size in time
+    backOff() {
+        this.size = Math.max(this.min, Math.floor(this.size / 2));
+        this.window = 1;
+    }
+}
+
+const CRC32_TABLE = (() => {
+    const table = new Int32Array(256);
+    for (let n = 0; n < 256; n++) {
+        let c = n;
+        for (let k = 0; k < 8; k++) {
+            c = (c & 1) ? (0xedb88320 ^ (c >>> 1)) : (c >>> 1);
+        }
+        table[n] = c;
+    }
+    return table;
+})();
+
+// Bytes read into memory at a time while checksumming a chunk
+const CRC32_SLICE_BYTES = 4 * 1024 * 1024;
+
+// CRC32 of a Blob, read a slice at a time so a large chunk never sits in
+// memory whole; the request body is the Blob itself, streamed by the browser
+async function crc32(blob) {
+    let crc = -1;
+    for (let offset = 0; offset < blob.size; offset += CRC32_SLICE_BYTES) {
+        const bytes = new Uint8Array(await blob.slice(offset, offset + CRC32_SLICE_BYTES).arrayBuffer());
+        for (let i = 0; i < bytes.length; i++) {
+            crc = CRC32_TABLE[(crc ^ bytes[i]) & 0xff] ^ (crc >>> 8);
+        }
+    }
+    return ((crc ^ -1) >>> 0).toString(16).padStart(8, '0');
+}
+
+async function uploadRange(uploadId, file, start, end, abortSignal) {
+    // An empty range carries no data: it uploads an empty file or asks the
+    // server to finalize a session that already has every byte
+    const contentRange = start === end ? `bytes */${file.size}` : `bytes ${start}-${end - 1}/${file.size}`;
+
+    // The server verifies this checksum before acknowledging, so a corrupted
+    // chunk is rejected and resent on its own instead of failing the whole file
+    const body = file.slice(start, end);
+    const checksum = await crc32(body);
+    const response = await fetch(`/upload/session/${uploadId}`, {
+        method: 'PUT',
+        headers: {
+            'Content-Type': 'application/octet-stream',
+            'Content-Range': contentRange,
+            'X-Chunk-Checksum': `crc32:${checksum}`
+        },
+        body: body,
+        signal: abortSignal
+    });
+
+    return parseUploadResponse(response);
+}
+
+// Send one piece, retrying it on its own with exponential backoff
+async function sendPiece(uploadId, file, start, end, sizer, abortSignal) {
+    const MAX_RETRIES = 3;
+    for (let attempt = 1; ; attempt++) {
+        // Check for cancellation before each attempt
+        if (abortSignal?.aborted) {
+            throw new DOMException('Upload cancelled by user', 'AbortError');
+        }
+
+        try {
+            const sentAt = performance.now();
+            const result = await uploadRange(uploadId, file, start, end, abortSignal);
+            sizer.record(end - start, performance.now() - sentAt, result.timing);
+            return result;
+        } catch (error) {
+            if (error.name === 'AbortError') {
+                console.log('Upload aborted by user');
+                throw error; // Re-throw abort errors
+            }
+
+            console.error(`Chunk ${start}-${end} failed (attempt ${attempt}/${MAX_RETRIES}):`, error);
+            if (attempt === MAX_RETRIES) {
+                console.error('Max retries reached for chunk upload');
+                throw error;
+            }
+
+            // Later pieces go out smaller and with fewer streams
+            sizer.backOff();
+            await new Promise(resolve => setTimeout(resolve, 1000 * Math.pow(2, attempt)));
+        }
+    }
+}
+
+function isFinalResponse(result) {
+    return result.status !== 'Chunk received' && result.status !== 'Chunk already processed';
+}
+
+async function getFinalizationJob(jobId, abortSignal) {
+    const response = await fetch(`/upload/jobs/${jobId}`, { signal: abortSignal });
+    return response.ok ? response.json() : null;
+}
+
+// The range that completes a file only queues finalization (202, status
+// "Finalizing"); poll the job until it is done and return its result
+async function waitForFinalization(job, abortSignal) {
+    const POLL_INTERVAL_MS = 1000;
+    let lastStage = null;
+    while (job.status === 'Finalizing') {
+        if (job.stage !== lastStage) {
+            console.log(`Finalizing upload ${job.jobId}: ${job.stage}`);
+            lastStage = job.stage;
+        }
+        await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+        if (abortSignal?.aborted) {
+            throw new DOMException('Upload cancelled by user', 'AbortError');
+        }
+        const next = await getFinalizationJob(job.jobId, abortSignal);
+        if (!next) {
+            throw new Error(`Finalization job ${job.jobId} not found`);
+        }
+        job = next;
+    }
+
+    if (job.status === 'failed') {
+        throw new Error(job.error || 'File processing failed');
+    }
+    return job.status === 'done' ? job.result : job;
+}
+
 async function uploadFile(file, metadata, progressCallback, abortSignal) {
-    const CHUNK_SIZE = 10 * 1024 * 1024; // 10MB chunks
-    const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
-    let uploadedChunks = 0;
+    const sizer = new ChunkSizer(config.state.uploadCapabilities);
+    let sentChunks = 0;
     let finalResponse = null;
 
     // Handle abort signal
@@ -16,110 +264,105 @@ async function uploadFile(file, metadata, progressCallback, abortSignal) {
         });
     }
 
+    if (!metadata) {
+        throw new Error('Metadata is required for upload');
+    }
+
     // Log metadata for debugging
     console.log('Upload starting with metadata:', metadata);
 
-    for (let start = 0; start < file.size; start += CHUNK_SIZE) {
-        // Check for cancellation before each chunk
-        if (abortSignal?.aborted) {
-            throw new DOMException('Upload cancelled by user', 'AbortError');
-        }
+    // Resume an earlier session for this file and these form values if the
+    // server still has it, sending only the ranges it is missing; otherwise
+    // open a new one
+    const key = resumeKey(file);
+    const fingerprint = metadataFingerprint(metadata);
+    const saved = savedSession(key);
+    let uploadId = saved && saved.fingerprint === fingerprint ? saved.uploadId : null;
+    const status = uploadId ? await getUploadStatus(uploadId, abortSignal) : null;
+    let remaining;
+    let bytesAcknowledged = 0;
 
-        const chunk = file.slice(start, start + CHUNK_SIZE);
-        const formData = new FormData();
-        formData.append('file', chunk, file.name);
-        formData.append('chunk', uploadedChunks.toString());
-        formData.append('totalChunks', totalChunks.toString());
-        formData.append('chunkSize', CHUNK_SIZE.toString());
-        
-        // Always append metadata for first chunk
-        if (uploadedChunks === 0) {
-            if (!metadata) {
-                throw new Error('Metadata is required for upload');
-            }
-            formData.append('metadata', JSON.stringify(metadata));
-            console.log('Sending first chunk with metadata:', metadata);
-        }
-
-        let retries = 0;
-        const MAX_RETRIES = 3;
-        
-        while (retries < MAX_RETRIES) {
-            try {
-                // Check for cancellation before each retry
-                if (abortSignal?.aborted) {
-                    throw new DOMException('Upload cancelled by user', 'AbortError');
-                }
-
-                console.log(`Uploading chunk ${uploadedChunks + 1}/${totalChunks}`);
-                const response = await fetch('/upload/upload-chunk', {
-                    method: 'POST',
-                    body: formData,
-                    signal: abortSignal
-                });
-
-                const responseText = await response.text();
-                let result;
-                
-                try {
-                    result = JSON.parse(responseText);
-                } catch (e) {
-                    console.error('Invalid JSON response:', responseText);
-                    throw new Error(`Invalid JSON response: ${responseText}`);
-                }
+    if (status) {
+        console.log(`Resuming upload ${uploadId}: ${status.bytesReceived}/${file.size} bytes on server`);
+        remaining = status.missing;
+        bytesAcknowledged = status.bytesReceived;
+    } else {
+        const session = await createUploadSession(file, metadata, abortSignal);
+        uploadId = session.uploadId;
+        localStorage.setItem(key, JSON.stringify({ uploadId, fingerprint }));
+        console.log('Upload session created:', uploadId);
+        remaining = [[0, file.size]];
+    }
 
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}, body: ${JSON.stringify(result, null, 2)}`);
-                }
+    // Keep up to sizer.window pieces in flight. The server accepts ranges in any
+    // order and finalizes on whichever one completes the file.
+    const inFlight = new Set();
+    let failure = null;
 
-                if (result.error) {
-                    throw new Error(result.error);
+    const launch = (start, end) => {
+        const task = sendPiece(uploadId, file, start, end, sizer, abortSignal)
+            .then(result => {
+                sentChunks++;
+                bytesAcknowledged += end - start;
+                if (progressCallback) {
+                    progressCallback(file.size ? (bytesAcknowledged / file.size) * 100 : 100);
                 }
-
-                // Store the final response when it's the last chunk
-                if (uploadedChunks === totalChunks - 1) {
+                if (isFinalResponse(result)) {
                     finalResponse = result;
                 }
+            })
+            .catch(error => {
+                failure = failure || error;
+            })
+            .finally(() => inFlight.delete(task));
+        inFlight.add(task);
+    };
 
-                uploadedChunks++;
-                if (progressCallback) {
-                    progressCallback((uploadedChunks / totalChunks) * 100);
-                }
-                
-                break; // Successful upload, break the retry loop
-
-            } catch (error) {
-                if (error.name === 'AbortError') {
-                    console.log('Upload aborted by user');
-                    throw error; // Re-throw abort errors
-                }
-                
-                retries++;
-                console.error(`Chunk upload failed (attempt ${retries}/${MAX_RETRIES}):`, error);
-                
-                if (retries === MAX_RETRIES) {
-                    console.error('Max retries reached for chunk upload');
-                    throw error;
-                }
-                
-                // Wait before retrying (exponential backoff)
-                await new Promise(resolve => setTimeout(resolve, 1000 * Math.pow(2, retries)));
+    for (;;) {
+        while (!failure && inFlight.size < sizer.window) {
+            const piece = takePiece(remaining, sizer.size);
+            if (!piece) {
+                break;
             }
+            console.log(`Uploading bytes ${piece[0]}-${piece[1]} of ${file.size} (${inFlight.size + 1} in flight)`);
+            launch(piece[0], piece[1]);
+        }
+        if (inFlight.size === 0) {
+            break;
         }
+        await Promise.race(inFlight);
     }
 
+    if (failure) {
+        throw failure;
+    }
+
+    // Nothing was left to send (empty file, or every byte arrived before an
+    // interruption), or the response that finalized was lost: pick up the job
+    // if finalization is under way, otherwise an empty PUT completes the session.
+    // A failed job of a session the server still has was cut off by a restart,
+    // and the empty PUT starts it again.
+    if (!finalResponse) {
+        const job = await getFinalizationJob(uploadId, abortSignal);
+        finalResponse = job && !(status && job.status === 'failed')
+            ? job
+            : await sendPiece(uploadId, file, file.size, file.size, sizer, abortSignal);
+    }
+    finalResponse = await waitForFinalization(finalResponse, abortSignal);
+
     // Final cancellation check
     if (abortSignal?.aborted) {
         throw new DOMException('Upload cancelled by user', 'AbortError');
     }
 
-    if (!finalResponse) {
+    if (!isFinalResponse(finalResponse)) {
         throw new Error('No final response received from server');
     }
+    localStorage.removeItem(key);
 
     return {
         status: 'Upload completed',
-        totalChunks: totalChunks,
+        totalChunks: sentChunks,
         filePath: finalResponse.filePath,
         success: true,
         ...finalResponse
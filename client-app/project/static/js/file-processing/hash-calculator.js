@@ -1,11 +1,58 @@
 // file-processing/hash-calculator.js
 const hashCalculator = {
-    // Calculate hash in chunks client-side
+    // Reference hash for the upload. By default it is computed in the browser so the
+    // file only crosses the network once; the server round trip is an opt-in fallback.
+    async calculateReferenceHash(file, abortSignal) {
+        const mode = window.config?.state?.clientHashMode || 'local';
+        if (mode === 'server' || typeof Worker === 'undefined') {
+            return this.calculateFileHash(file);
+        }
+        return this.calculateFileHashLocally(file, abortSignal);
+    },
+
+    // Incremental MD5 in a Web Worker; no file data is sent anywhere
+    calculateFileHashLocally(file, abortSignal) {
+        return new Promise((resolve, reject) => {
+            const worker = new Worker('/static/js/file-processing/md5-worker.js');
+            const onAbort = () => {
+                worker.terminate();
+                reject(new DOMException('Upload cancelled by user', 'AbortError'));
+            };
+            abortSignal?.addEventListener('abort', onAbort, { once: true });
+
+            worker.onmessage = (event) => {
+                const message = event.data;
+                if (message.type === 'progress') {
+                    const progress = message.total ? (message.loaded / message.total) * 100 : 100;
+                    modalHandlers.updateProgress('Calculating file hash...', progress);
+                    return;
+                }
+
+                worker.terminate();
+                abortSignal?.removeEventListener('abort', onAbort);
+                if (message.type === 'done') {
+                    resolve(message.hash);
+                } else {
+                    reject(new Error(message.message || 'Hash calculation failed'));
+                }
+            };
+            worker.onerror = (event) => {
+                worker.terminate();
+                abortSignal?.removeEventListener('abort', onAbort);
+                reject(new Error(event.message || 'Hash worker failed'));
+            };
+
+            worker.postMessage({ file: file });
+        });
+    },
+
+    // Calculate hash in chunks on the server (sends the whole file an extra time)
     async calculateFileHash(file) {
         try {
-            const CHUNK_SIZE = 5 * 1024 * 1024; // 5MB chunks
+            const CHUNK_SIZE = config.state.uploadCapabilities.chunkSize.default;
             const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
             let currentChunk = 0;
+            let hashId = null;
 
             while (currentChunk < totalChunks) {
                 const start = currentChunk * CHUNK_SIZE;
@@ -17,6 +64,10 @@ const hashCalculator = {
                 formData.append('chunk', currentChunk);
                 formData.append('totalChunks', totalChunks);
                 formData.append('fileSize', file.size);
+                formData.append('chunkSize', CHUNK_SIZE);
+                if (hashId) {
+                    formData.append('hashId', hashId);
+                }
                 
                 const response = await fetch('/upload/calculate-hash-chunk', {
                     method: 'POST',
@@ -38,6 +89,7 @@ const hashCalculator = {
                 if (result.finalHash) {
                     return result.finalHash;
                 }
+                hashId = result.hashId;
 
                 currentChunk++;
             }
@@ -0,0 +1,132 @@
+// file-processing/md5-worker.js
+// Incremental MD5 of a File, computed off the main thread so the reference
+// hash never requires sending the file to the server.
+class IncrementalMD5 {
+    constructor() {
+        this.state = new Int32Array([0x67452301, 0xefcdab89 | 0, 0x98badcfe | 0, 0x10325476]);
+        this.tail = new Uint8Array(64);
+        this.tailLength = 0;
+        this.length = 0;
+        this.words = new Int32Array(16);
+    }
+
+    update(bytes) {
+        let offset = 0;
+        this.length += bytes.length;
+
+        // Complete a block left over from the previous update first
+        if (this.tailLength > 0) {
+            const take = Math.min(64 - this.tailLength, bytes.length);
+            this.tail.set(bytes.subarray(0, take), this.tailLength);
+            this.tailLength += take;
+            offset = take;
+            if (this.tailLength < 64) {
+                return;
+            }
+            this.processBlock(new Int32Array(this.tail.buffer), 0);
+            this.tailLength = 0;
+        }
+
+        // Read message words straight out of the data when it is 4-byte aligned
+        // (browsers run little-endian, as MD5 expects); copy block by block otherwise
+        const blocksEnd = offset + Math.floor((bytes.length - offset) / 64) * 64;
+        if ((bytes.byteOffset + offset) % 4 === 0) {
+            const words = new Int32Array(bytes.buffer, bytes.byteOffset + offset, (blocksEnd - offset) / 4);
+            for (let base = 0; base < words.length; base += 16) {
+                this.processBlock(words, base);
+            }
+        } else {
+            const block = new Uint8Array(this.words.buffer);
+            for (let base = offset; base < blocksEnd; base += 64) {
+                block.set(bytes.subarray(base, base + 64));
+                this.processBlock(this.words, 0);
+            }
+        }
+        offset = blocksEnd;
+
+        this.tail.set(bytes.subarray(offset), 0);
+        this.tailLength = bytes.length - offset;
+    }
+
+    hexdigest() {
+        const bitLength = this.length * 8;
+        const padding = new Uint8Array(this.tailLength < 56 ? 64 - this.tailLength : 128 - this.tailLength);
+        padding[0] = 0x80;
+        const lengthView = new DataView(padding.buffer, padding.length - 8);
+        lengthView.setUint32(0, bitLength % 0x100000000, true);
+        lengthView.setUint32(4, Math.floor(bitLength / 0x100000000), true);
+
+        const length = this.length;
+        this.update(padding);
+        this.length = length;
+
+        let hex = '';
+        for (let i = 0; i < 4; i++) {
+            for (let shift = 0; shift < 32; shift += 8) {
+                hex += ((this.state[i] >>> shift) & 0xff).toString(16).padStart(2, '0');
+            }
+        }
+        return hex;
+    }
+
+    processBlock(x, base) {
+        let a = this.state[0], b = this.state[1], c = this.state[2], d = this.state[3];
+        let t;
+        // One loop per round keeps the hot path branch-free
+        for (let i = 0; i < 16; i++) {
+            t = (a + ((b & c) | (~b & d)) + MD5_K[i] + x[base + i]) | 0;
+            a = d; d = c; c = b;
+            b = (b + rotateLeft(t, MD5_S[i & 3])) | 0;
+        }
+        for (let i = 16; i < 32; i++) {
+            t = (a + ((d & b) | (~d & c)) + MD5_K[i] + x[base + ((5 * i + 1) & 15)]) | 0;
+            a = d; d = c; c = b;
+            b = (b + rotateLeft(t, MD5_S[4 + (i & 3)])) | 0;
+        }
+        for (let i = 32; i < 48; i++) {
+            t = (a + (b ^ c ^ d) + MD5_K[i] + x[base + ((3 * i + 5) & 15)]) | 0;
+            a = d; d = c; c = b;
+            b = (b + rotateLeft(t, MD5_S[8 + (i & 3)])) | 0;
+        }
+        for (let i = 48; i < 64; i++) {
+            t = (a + (c ^ (b | ~d)) + MD5_K[i] + x[base + ((7 * i) & 15)]) | 0;
+            a = d; d = c; c = b;
+            b = (b + rotateLeft(t, MD5_S[12 + (i & 3)])) | 0;
+        }
+
+        this.state[0] = (this.state[0] + a) | 0;
+        this.state[1] = (this.state[1] + b) | 0;
+        this.state[2] = (this.state[2] + c) | 0;
+        this.state[3] = (this.state[3] + d) | 0;
+    }
+}
+
+function rotateLeft(value, shift) {
+    return (value << shift) | (value >>> (32 - shift));
+}
+
+const MD5_S = [7, 12, 17, 22, 5, 9, 14, 20, 4, 11, 16, 23, 6, 10, 15, 21];
+const MD5_K = new Int32Array(64);
+for (let i = 0; i < 64; i++) {
+    MD5_K[i] = Math.floor(Math.abs(Math.sin(i + 1)) * 0x100000000) | 0;
+}
+
+const READ_SIZE = 8 * 1024 * 1024;
+
+self.onmessage = (event) => {
+    const { file } = event.data;
+    try {
+        const reader = new FileReaderSync();
+        const md5 = new IncrementalMD5();
+
+        for (let start = 0; start < file.size; start += READ_SIZE) {
+            const end = Math.min(start + READ_SIZE, file.size);
+            md5.update(new Uint8Array(reader.readAsArrayBuffer(file.slice(start, end))));
+            self.postMessage({ type: 'progress', loaded: end, total: file.size });
+        }
+
+        self.postMessage({ type: 'done', hash: md5.hexdigest() });
+    } catch (error) {
+        self.postMessage({ type: 'error', message: error.message });
+    }
+};
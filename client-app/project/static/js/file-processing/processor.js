@@ -25,7 +25,9 @@ const fileProcessor = {
             checkCancellation();
             modalHandlers.updateProgress('Calculating original file hash...', 'calculating');
             try {
-                const fileHash = await hashCalculator.calculateFileHash(file);
+                const fileHash = await hashCalculator.calculateReferenceHash(
+                    file, fileProcessingState.state.abortController.signal
+                );
                 if (!fileHash) {
                     modalHandlers.updateProgress('Failed to calculate file hash', 'error');
                     return { success: false, error: 'Hash calculation failed' };
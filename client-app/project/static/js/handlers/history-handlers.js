@@ -2,6 +2,10 @@
 const historyHandlers = {
     folders: [],
     currentMetadata: null,
+    pageSize: 50,
+    nextCursor: null,
+    searchTerm: '',
+    searchTimer: null,
 
     init() {
         this.bindEventListeners();
@@ -12,28 +16,45 @@ const historyHandlers = {
         // Search box handler
         $('#searchBox').on('input', (e) => this.handleSearch(e.target.value));
 
-        // Event delegation for dynamically created elements
-        $(document).on('click', '.info-button', (e) => {
+        $('#loadMoreButton').on('click', (e) => {
+            e.preventDefault();
+            this.loadMore();
+        });
+
+        // Event delegation for dynamically created elements; full metadata and
+        // inventories are fetched only when a card asks for them
+        $(document).on('click', '.info-button', async (e) => {
             e.preventDefault();
             const $card = $(e.target).closest('.folder-card');
-            const metadata = $card.data('metadata');
-            this.showMetadataInfo(metadata);
+            try {
+                const metadata = await this.fetchFolderMetadata($card.data('folder'));
+                this.showMetadataInfo(metadata);
+            } catch (error) {
+                this.handleError(error);
+            }
         });
 
-        $(document).on('click', '.resend-button', (e) => {
+        $(document).on('click', '.resend-button', async (e) => {
             e.preventDefault();
             const $card = $(e.target).closest('.folder-card');
-            const inventory = $card.data('inventory');
-            this.handleResendClick(inventory, $card.data('metadata'));
+            try {
+                const [metadata, inventory] = await Promise.all([
+                    this.fetchFolderMetadata($card.data('folder')),
+                    this.fetchFolderInventory($card.data('folder'))
+                ]);
+                this.handleResendClick(inventory, metadata);
+            } catch (error) {
+                this.handleError(error);
+            }
         });
 
         // Delete button handler
         $(document).on('click', '.delete-button', (e) => {
             e.preventDefault();
             const $card = $(e.target).closest('.folder-card');
-            const metadata = $card.data('metadata');
-            const folderPath = metadata.upload_folder;
-            deleteHandler.showDeleteConfirmation(folderPath, metadata);
+            const summary = $card.data('summary');
+            const folderPath = summary.upload_folder;
+            deleteHandler.showDeleteConfirmation(folderPath, summary);
         });
 
         // Close modal handlers
@@ -43,64 +64,114 @@ const historyHandlers = {
     },
 
     async loadFolders() {
+        // Starts over from the first page, e.g. after a search or a delete
+        this.folders = [];
+        this.nextCursor = null;
+        $('#folderList').empty();
+        await this.fetchPage();
+    },
+
+    async loadMore() {
+        if (this.nextCursor) {
+            await this.fetchPage();
+        }
+    },
+
+    async fetchPage() {
         try {
-            const response = await fetch('/api/folders');
+            const params = new URLSearchParams({ limit: this.pageSize });
+            if (this.nextCursor) {
+                params.set('cursor', this.nextCursor);
+            }
+            if (this.searchTerm) {
+                params.set('q', this.searchTerm);
+            }
+
+            $('#loadMoreButton').prop('disabled', true);
+            const response = await fetch(`/api/folders?${params}`);
             if (!response.ok) {
                 throw new Error('Failed to fetch folders');
             }
-            
-            this.folders = await response.json();
-            console.log('Loaded folders:', this.folders);
-            this.displayFolders(this.folders);
+
+            const page = await response.json();
+            this.folders = this.folders.concat(page.folders);
+            this.nextCursor = page.nextCursor;
+            console.log(`Loaded ${this.folders.length} of ${page.total} folders`);
+            this.displayFolders(page.folders);
+            $('#folderCount').text(`Showing ${this.folders.length} of ${page.total}`);
+            $('#loadMoreButton').prop('disabled', false).toggle(Boolean(this.nextCursor));
         } catch (error) {
             console.error('Error loading folders:', error);
+            $('#loadMoreButton').prop('disabled', false);
             this.handleError(error);
         }
     },
 
+    async fetchFolderMetadata(folderName) {
+        const response = await fetch(`/api/folders/${encodeURIComponent(folderName)}`);
+        if (!response.ok) {
+            throw new Error('Failed to fetch folder metadata');
+        }
+        return (await response.json()).metadata;
+    },
+
+    async fetchFolderInventory(folderName) {
+        const response = await fetch(`/api/folders/${encodeURIComponent(folderName)}/inventory`);
+        if (!response.ok) {
+            throw new Error('Failed to fetch folder inventory');
+        }
+        return (await response.json()).inventory;
+    },
+
     displayFolders(folders) {
+        // Appends one page of cards; loadFolders() clears the list
         const folderList = $('#folderList');
-        folderList.empty();
     
         folders.forEach(folder => {
-            const hasInventory = folder.inventory && folder.inventory.length > 0;
-            const verified = folder.metadata.verified;
+            const hasInventory = folder.has_inventory;
+            const verified = folder.verified;
             const verificationTooltip = verified ? 
                 "Files were copied successfully and hash matched" : 
                 "File verification failed or pending";
+            const fileHashes = folder.fileHashes || {};
             
             const folderHtml = `
                 <div class="folder-card" data-folder="${folder.name}">
                     <div class="folder-content">
                         <div class="section operation-section">
-                            <div class="operation-name">${folder.metadata.operation || 'Unknown Operation'}</div>
-                            <div class="operation-date">${folder.metadata.dateOfCollection || 'Unknown Date'}</div>
+                            <div class="operation-name">${folder.operation || 'Unknown Operation'}</div>
+                            <div class="operation-date">${folder.dateOfCollection || 'Unknown Date'}</div>
                         </div>
     
                         <div class="section filenames-section">
                             <div class="filename-container">
                                 <div class="filename-label">Original Filename:</div>
-                                <div class="filename-value" title="${folder.metadata.originalFilename || 'Unknown File'}">
-                                    ${folder.metadata.originalFilename || 'Unknown File'}
+                                <div class="filename-value" title="${folder.originalFilename || 'Unknown File'}">
+                                    ${folder.originalFilename || 'Unknown File'}
                                 </div>
                             </div>
                             <div class="filename-container">
                                 <div class="filename-label">Changed Filename:</div>
-                                <div class="filename-value" title="${folder.metadata.newFilename || 'N/A'}">
-                                    ${folder.metadata.newFilename || 'N/A'}
+                                <div class="filename-value" title="${folder.newFilename || 'N/A'}">
+                                    ${folder.newFilename || 'N/A'}
                                 </div>
                             </div>
                         </div>
     
                         <div class="section status-section">
                             <div class="file-size">
-                                FILE SIZE: ${folder.metadata.fileSize ? 
-                                    `${(folder.metadata.fileSize / (1024 * 1024 * 1024)).toFixed(2)} GB` : 
+                                FILE SIZE: ${folder.fileSize ? 
+                                    `${(folder.fileSize / (1024 * 1024 * 1024)).toFixed(2)} GB` : 
                                     'N/A'}
                             </div>
                             <div class="item-number">
-                                Item NO: ${folder.metadata.itemNumber || ''} Sub ${folder.metadata.subNumber || ''}
+                                Item NO: ${folder.itemNumber || ''} Sub ${folder.subNumber || ''}
                             </div>
+                            ${Object.entries(fileHashes).map(([algorithm, digest]) => `
+                                <div class="file-digest" title="${algorithm.toUpperCase()}: ${digest}">
+                                    ${algorithm.toUpperCase()}: <span class="font-monospace">${digest}</span>
+                                </div>
+                            `).join('')}
                         </div>
     
                         <div class="section buttons-section">
@@ -119,22 +190,19 @@ const historyHandlers = {
             `;
     
             const $card = $(folderHtml);
-            $card.data({
-                metadata: folder.metadata,
-                inventory: folder.inventory
-            });
+            $card.data('summary', folder);
     
             folderList.append($card);
         });
     },
 
     handleSearch(searchTerm) {
-        const filteredFolders = searchTerm ? 
-            this.folders.filter(folder => 
-                JSON.stringify(folder.metadata).toLowerCase().includes(searchTerm.toLowerCase())
-            ) : this.folders;
-        
-        this.displayFolders(filteredFolders);
+        // Searched on the server so pages not yet loaded are included
+        clearTimeout(this.searchTimer);
+        this.searchTimer = setTimeout(() => {
+            this.searchTerm = searchTerm.trim();
+            this.loadFolders();
+        }, 300);
     },
 
     showMetadataInfo(metadata) {
@@ -4,6 +4,16 @@ const config = {
         fileSaveLocation: null,
         maxFileSizeGB: null,
         systemName: null,
+        clientHashMode: 'local',
+        // Replaced by what the server advertises in /config
+        uploadCapabilities: {
+            chunkSize: { min: 1024 * 1024, default: 10 * 1024 * 1024, max: 10 * 1024 * 1024 },
+            parallelStreams: 1,
+            maxParallelStreams: 1,
+            targetChunkMs: 2000,
+            hashAlgorithms: ['crc32'],
+            timingHints: false
+        },
         initialized: false
     },
 
@@ -18,6 +28,10 @@ const config = {
             this.state.fileSaveLocation = config.UPLOAD_FOLDER;
             this.state.maxFileSizeGB = config.MAX_FILE_SIZE / (1024 * 1024 * 1024);
             this.state.systemName = config.SYSTEM_NAME;
+            this.state.clientHashMode = config.CLIENT_HASH_MODE || 'local';
+            if (config.UPLOAD_CAPABILITIES) {
+                this.state.uploadCapabilities = config.UPLOAD_CAPABILITIES;
+            }
             this.state.initialized = true;
             
             return this.state;
@@ -0,0 +1,53 @@
+# tests/helpers.py
+"""Upload helpers shared by the tests."""
+
+import hashlib
+import time
+import zlib
+
+from project.client_app.operations import FileOperations, FinalizationQueue, SessionStore
+
+
+def open_session(client, data, filename='data.bin', folder='tests'):
+    """Open a Content-Range upload session for data; returns its upload id."""
+    metadata = {'folder_name': folder, 'originalFileHash': hashlib.md5(data).hexdigest(), 'fileSize': len(data)}
+    response = client.post('/upload/session', json={'filename': filename, 'fileSize': len(data), 'metadata': metadata})
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()['uploadId']
+
+
+def put_range(client, upload_id, data, start, end):
+    """PUT data[start:end] with its CRC32, as the browser does; returns the JSON answer."""
+    body = data[start:end]
+    content_range = f'bytes {start}-{end - 1}/{len(data)}' if end > start else f'bytes */{len(data)}'
+    response = client.put(
+        f'/upload/session/{upload_id}', data=body, content_type='application/octet-stream',
+        headers={'Content-Range': content_range,
+                 'X-Chunk-Checksum': f'crc32:{zlib.crc32(body):08x}'}
+    )
+    assert response.status_code in (200, 202), response.get_data(as_text=True)
+    return response.get_json()
+
+
+def wait_for_job(client, upload_id, timeout=30):
+    """The result of an upload's finalization job, once it is done."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get(f'/upload/jobs/{upload_id}')
+        if response.status_code == 200:
+            job = response.get_json()
+            if job['status'] in ('done', 'failed'):
+                return job['result'] or {'success': False, 'error': job['error']}
+        time.sleep(0.02)
+    raise AssertionError(f"Upload {upload_id} did not finalize within {timeout} seconds")
+
+
+def restart(app):
+    """Forget this process's sessions, as a restart would, and restore them from disk."""
+    SessionStore._instances.clear()
+    FileOperations._digests.clear()
+    FileOperations._chunk_locks.clear()
+    FinalizationQueue._jobs.clear()
+    FinalizationQueue._persisted_at.clear()
+    with app.app_context():
+        return FileOperations.restore_sessions()
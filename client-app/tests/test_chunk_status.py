@@ -0,0 +1,41 @@
+# tests/test_chunk_status.py
+"""Chunk bitmaps kept as an upload's ranges are acknowledged."""
+
+import os
+import sqlite3
+
+from helpers import open_session, put_range
+
+BLOCK = 64 * 1024
+
+
+def upload_row(app):
+    path = os.path.join(app.config['UPLOAD_FOLDER'], '.sessions', 'chunk_status.db')
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 2
+        return conn.execute("SELECT total, received, verified, chunk_size FROM chunk_status "
+                            "WHERE source = 'upload'").fetchone()
+    finally:
+        conn.close()
+
+
+def test_bits_follow_acknowledged_ranges(app, client):
+    app.config['MIN_CHUNK_SIZE'] = BLOCK
+    data = os.urandom(6 * BLOCK + 10)
+    upload_id = open_session(client, data)
+
+    # Ranges that don't line up with blocks: block 1 is only whole once both are in
+    put_range(client, upload_id, data, 0, BLOCK + 100)
+    assert upload_row(app)[:2] == (7, bytes([0b00000001]))
+    put_range(client, upload_id, data, BLOCK + 100, 3 * BLOCK)
+    assert upload_row(app)[1] == bytes([0b00000111])
+
+    # A range sent without a checksum is received but not verified
+    body = data[3 * BLOCK:4 * BLOCK]
+    response = client.put(f'/upload/session/{upload_id}', data=body, content_type='application/octet-stream',
+                          headers={'Content-Range': f'bytes {3 * BLOCK}-{4 * BLOCK - 1}/{len(data)}'})
+    assert response.status_code == 200
+    total, received, verified, chunk_size = upload_row(app)
+    assert (total, received, chunk_size) == (7, bytes([0b00001111]), BLOCK)
+    assert received[0] & ~verified[0] == 0b00001000
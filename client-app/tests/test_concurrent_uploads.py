@@ -0,0 +1,56 @@
+# tests/test_concurrent_uploads.py
+"""Uploads of different files proceed side by side."""
+
+import hashlib
+import os
+import threading
+
+from helpers import open_session, put_range, wait_for_job
+
+CHUNK_SIZE = 64 * 1024
+CHUNKS = 8
+
+
+def test_two_uploads_interleave(app, client):
+    files = [os.urandom(CHUNKS * CHUNK_SIZE), os.urandom(CHUNKS * CHUNK_SIZE)]
+    upload_ids = [open_session(client, data, filename=f'file{index}.bin', folder=f'interleave{index}')
+                  for index, data in enumerate(files)]
+
+    # Both threads wait at the barrier after every chunk, so each chunk of one
+    # upload is sent while the other upload is part way through. If one upload
+    # held the other off until it finished, the barrier would time out.
+    barrier = threading.Barrier(2, timeout=30)
+    progress = []
+    progress_lock = threading.Lock()
+    errors = []
+
+    def upload(index):
+        thread_client = app.test_client()
+        data = files[index]
+        try:
+            for start in range(0, len(data), CHUNK_SIZE):
+                result = put_range(thread_client, upload_ids[index], data, start, start + CHUNK_SIZE)
+                with progress_lock:
+                    progress.append((index, result.get('bytesReceived', len(data))))
+                barrier.wait()
+        except Exception as e:
+            barrier.abort()
+            errors.append(e)
+
+    threads = [threading.Thread(target=upload, args=(index,)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+    # Before either upload had all its bytes, both had some
+    first_done = min(i for i, (index, received) in enumerate(progress) if received == CHUNKS * CHUNK_SIZE)
+    before = progress[:first_done]
+    for index in range(2):
+        assert any(entry[0] == index and 0 < entry[1] < CHUNKS * CHUNK_SIZE for entry in before)
+
+    for index, data in enumerate(files):
+        result = wait_for_job(client, upload_ids[index])
+        assert result['success'], result
+        assert result['newHash'] == hashlib.md5(data).hexdigest()
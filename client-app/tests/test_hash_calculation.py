@@ -0,0 +1,61 @@
+# tests/test_hash_calculation.py
+"""The server-side hash pass used when the browser can't hash a file itself."""
+
+import hashlib
+import io
+import os
+
+from config import Config
+from project import create_app
+from project.client_app.operations import SessionStore, UploadJournal
+
+CHUNK_SIZE = 64 * 1024
+
+
+def post_chunk(client, data, chunk, hash_id=None):
+    form = {'file': (io.BytesIO(data[chunk * CHUNK_SIZE:(chunk + 1) * CHUNK_SIZE]), 'data.bin'),
+            'chunk': str(chunk), 'totalChunks': str(-(-len(data) // CHUNK_SIZE)),
+            'fileSize': str(len(data)), 'chunkSize': str(CHUNK_SIZE)}
+    if hash_id:
+        form['hashId'] = hash_id
+    return client.post('/upload/calculate-hash-chunk', data=form, content_type='multipart/form-data')
+
+
+def test_hash_in_order_with_a_resent_chunk(app, client):
+    data = os.urandom(5 * CHUNK_SIZE + 100)
+    hash_id = post_chunk(client, data, 0).get_json()['hashId']
+    assert post_chunk(client, data, 1, hash_id).get_json()['bytesReceived'] == 2 * CHUNK_SIZE
+    assert post_chunk(client, data, 1, hash_id).get_json()['bytesReceived'] == 2 * CHUNK_SIZE
+
+    response = post_chunk(client, data, 3, hash_id)
+    assert response.status_code == 409
+    assert response.get_json()['expectedChunk'] == 2
+
+    # Hash state stays out of the upload sessions
+    with app.app_context():
+        assert SessionStore.from_config().list_sessions() == []
+
+    for chunk in range(2, 6):
+        result = post_chunk(client, data, chunk, hash_id).get_json()
+    assert result == {'status': 'complete', 'hashId': hash_id, 'finalHash': hashlib.md5(data).hexdigest()}
+    assert post_chunk(client, data, 1, hash_id).status_code == 400
+
+
+def test_chunks_spread_over_two_workers(app, client, monkeypatch):
+    # A second app on the same folder and session database stands in for another worker
+    monkeypatch.setattr(Config, 'SESSION_STORE', 'sqlite')
+    app.config['SESSION_STORE'] = 'sqlite'
+    workers = [client, create_app().test_client()]
+    data = os.urandom(7 * CHUNK_SIZE + 100)
+
+    hash_id = post_chunk(workers[0], data, 0).get_json()['hashId']
+    for chunk in range(1, 7):
+        assert post_chunk(workers[chunk % 2], data, chunk, hash_id).status_code == 200
+    # A resent chunk and one from ahead are answered the same by either worker
+    assert post_chunk(workers[1], data, 5, hash_id).get_json()['bytesReceived'] == 7 * CHUNK_SIZE
+    assert post_chunk(workers[0], data, 8, hash_id).get_json()['expectedChunk'] == 7
+
+    result = post_chunk(workers[1], data, 7, hash_id).get_json()
+    assert result == {'status': 'complete', 'hashId': hash_id, 'finalHash': hashlib.md5(data).hexdigest()}
+    assert not [name for name in os.listdir(UploadJournal.get_journal_dir(app.config['UPLOAD_FOLDER']))
+                if name.startswith(hash_id)]
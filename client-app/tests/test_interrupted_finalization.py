@@ -0,0 +1,90 @@
+# tests/test_interrupted_finalization.py
+"""A worker that dies while finalizing an upload: restarts and retries finish it."""
+
+import hashlib
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from project.client_app.operations import FinalizationQueue, SessionStore
+from helpers import open_session, put_range, restart, wait_for_job
+
+
+class StalledExecutor:
+    """Accepts jobs and never runs them, like a worker killed mid-finalize."""
+
+    def submit(self, fn):
+        pass
+
+
+def dead_owner():
+    """An owner string naming a process on this host that has exited."""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return f"{socket.gethostname()}:{process.pid}"
+
+
+def crash_while_finalizing(app, client, monkeypatch, data):
+    """Upload data and leave its finalization claimed and stuck at hashing by a dead process."""
+    upload_id = open_session(client, data)
+    with monkeypatch.context() as crashed:
+        owner = dead_owner()
+        crashed.setattr(FinalizationQueue, 'owner', staticmethod(lambda: owner))
+        crashed.setattr(FinalizationQueue, '_get_executor', classmethod(lambda cls: StalledExecutor()))
+        assert put_range(client, upload_id, data, 0, len(data))['status'] == 'Finalizing'
+        with app.app_context():
+            FinalizationQueue.update(upload_id, FinalizationQueue.HASHING, 40.0)
+    return upload_id
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_restart_resumes_interrupted_finalization(app, client, monkeypatch, backend):
+    app.config['SESSION_STORE'] = backend
+    data = os.urandom(300 * 1024)
+    upload_id = crash_while_finalizing(app, client, monkeypatch, data)
+
+    restart(app)
+    result = wait_for_job(client, upload_id)
+    assert result['success'], result
+    assert result['newHash'] == hashlib.md5(data).hexdigest()
+    with app.app_context():
+        assert SessionStore.from_config().list_sessions() == []
+
+
+def test_retry_finalizes_after_restart_mid_finalize(app, client, monkeypatch):
+    app.config['SESSION_STORE'] = 'sqlite'
+    data = os.urandom(300 * 1024)
+    upload_id = crash_while_finalizing(app, client, monkeypatch, data)
+
+    # Inline finalization leaves the restart to the client's retry
+    app.config['FINALIZE_WORKERS'] = 0
+    assert restart(app) == 1
+    with app.app_context():
+        session = SessionStore.from_config().get(upload_id)
+    assert not session['finalizing']
+    job = client.get(f'/upload/jobs/{upload_id}').get_json()
+    assert job['status'] == 'failed'
+
+    result = put_range(client, upload_id, data, len(data), len(data))
+    assert result['success'], result
+    assert result['newHash'] == hashlib.md5(data).hexdigest()
+
+
+def test_poll_ends_when_finalizing_worker_dies(app, client, monkeypatch):
+    app.config['SESSION_STORE'] = 'sqlite'
+    data = os.urandom(300 * 1024)
+    upload_id = crash_while_finalizing(app, client, monkeypatch, data)
+    # Another worker answers the poll from the job file
+    FinalizationQueue._jobs.clear()
+
+    job = client.get(f'/upload/jobs/{upload_id}').get_json()
+    assert job['status'] == 'failed'
+    assert job['error'] == FinalizationQueue.INTERRUPTED
+
+    # The retry takes over the dead worker's claim
+    put_range(client, upload_id, data, len(data), len(data))
+    result = wait_for_job(client, upload_id)
+    assert result['success'], result
@@ -0,0 +1,109 @@
+# tests/test_upload_journal.py
+"""Concurrent streams into one upload, and the journal they leave behind."""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+
+from project.client_app.operations import UploadJournal
+from helpers import open_session, put_range, restart, wait_for_job
+
+STREAMS = 8
+CHUNK_SIZE = 64 * 1024
+
+
+def send_concurrently(app, upload_id, data, starts):
+    """PUT the chunks at starts over STREAMS threads, each taking the next chunk as it frees up."""
+    pending = queue.Queue()
+    for start in starts:
+        pending.put(start)
+    errors = []
+
+    def stream():
+        client = app.test_client()
+        try:
+            while True:
+                try:
+                    start = pending.get_nowait()
+                except queue.Empty:
+                    return
+                put_range(client, upload_id, data, start, min(start + CHUNK_SIZE, len(data)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=stream) for _ in range(STREAMS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+
+def test_concurrent_appends_read_back_whole(app, tmp_path):
+    journal = UploadJournal.for_session(str(tmp_path), 'concurrent', sync_appends=False)
+    journal.create({'upload_id': 'concurrent'})
+
+    def append(stream):
+        for index in range(500):
+            start = (stream * 500 + index) * 10
+            journal.append_range(start, start + 10, 'crc32', f'{index:08x}')
+
+    threads = [threading.Thread(target=append, args=(stream,)) for stream in range(STREAMS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+
+    with app.app_context():
+        header, records = UploadJournal(journal.path).read()
+    assert header == {'upload_id': 'concurrent'}
+    assert sorted(record[0] for record in records) == list(range(0, STREAMS * 500 * 10, 10))
+
+
+def test_no_append_after_remove(tmp_path):
+    journal = UploadJournal.for_session(str(tmp_path), 'removed')
+    journal.create({'upload_id': 'removed'})
+    journal.remove()
+    journal.append_range(0, 10, 'crc32', '00000000')
+    assert not os.path.exists(journal.path)
+
+
+def test_eight_streams_upload_one_file(app, client):
+    data = os.urandom(96 * CHUNK_SIZE + 1234)
+    upload_id = open_session(client, data)
+
+    send_concurrently(app, upload_id, data, range(0, len(data), CHUNK_SIZE))
+
+    result = wait_for_job(client, upload_id)
+    assert result['success'], result
+    assert result['newHash'] == hashlib.md5(data).hexdigest()
+    with open(result['filePath'], 'rb') as f:
+        assert hashlib.md5(f.read()).hexdigest() == hashlib.md5(data).hexdigest()
+
+
+def test_restore_after_concurrent_writes(app, client):
+    data = os.urandom(96 * CHUNK_SIZE + 1234)
+    starts = list(range(0, len(data), CHUNK_SIZE))
+    upload_id = open_session(client, data)
+
+    # Everything but the last chunk, so the session stays open
+    send_concurrently(app, upload_id, data, starts[:-1])
+
+    # Every append landed as one whole line
+    journal = UploadJournal.for_session(app.config['UPLOAD_FOLDER'], upload_id)
+    with open(journal.path, 'r') as f:
+        lines = [json.loads(line) for line in f]
+    assert 'session' in lines[0]
+    assert sorted(line['r'][0] for line in lines[1:]) == starts[:-1]
+
+    assert restart(app) == 1
+    status = client.get(f'/upload/session/{upload_id}').get_json()
+    assert status['missing'] == [[starts[-1], len(data)]]
+
+    put_range(client, upload_id, data, starts[-1], len(data))
+    result = wait_for_job(client, upload_id)
+    assert result['success'], result
+    assert result['newHash'] == hashlib.md5(data).hexdigest()